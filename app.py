@@ -22,23 +22,46 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-from parsers.wholefoods_parser import WholeFoodsParser
-from parsers.unfi_west_parser import UNFIWestParser
-from parsers.unfi_east_parser import UNFIEastParser
-from parsers.kehe_parser import KEHEParser
-from parsers.tkmaxx_parser import TKMaxxParser
-from parsers.vmc_parser import VMCParser
-from parsers.davidson_parser import DavidsonParser
-from parsers.ross_parser import ROSSParser
-from utils.xoro_template import XoroTemplate
-from utils.mapping_utils import MappingUtils
-from database.service import DatabaseService
+# Start connecting to the database while the parsers and the UI load
+from database.connection import warm_up_database_engine
+warm_up_database_engine()
+
+from parsers.registry import ORDER_SOURCES, SUPPORTED_FILE_TYPES
+from parsers.source_detection import detect_order_source
+from utils.mapping_utils import MappingUtils, get_shared_mapping_utils
+from utils.mapping_sheet import build_mappings_payload
+from utils.order_batch import iter_converted_files
+from utils.pdf_text_cache import content_digest
+from database.service import DatabaseService, get_shared_database_service
 
 # Import for database initialization
 from database.models import Base
 from database.connection import get_database_engine
 from sqlalchemy import inspect
 
+@st.cache_resource
+def get_db_service() -> DatabaseService:
+    """Process-wide DatabaseService, created once and reused across reruns and sessions"""
+    return get_shared_database_service()
+
+@st.cache_resource
+def get_mapping_utils() -> MappingUtils:
+    """Process-wide MappingUtils backed by the shared DatabaseService"""
+    return get_shared_mapping_utils()
+
+def build_order_sources(db_service: DatabaseService, mapping_utils: MappingUtils) -> dict:
+    """
+    Create the parser for each order source
+    
+    Parsers are cheap to build because the database service and mapping
+    provider are injected. They are built per run (not cached) because some
+    parsers, e.g. TKMaxxParser, keep per-upload state between files.
+    """
+    return {
+        source.display_name: source.build_parser(db_service, mapping_utils)
+        for source in ORDER_SOURCES.values()
+    }
+
 # Health check for deployment
 def health_check():
     """Health check endpoint for deployment readiness"""
@@ -99,12 +122,18 @@ def initialize_database_if_needed():
             from database.migration import migrate_item_mapping_table
             success, msg = migrate_item_mapping_table()
             if success:
+                # The migration refreshes the schema capability registry itself
                 print(f"✅ Migration check: {msg}")
-                # Clear the case_qty column existence cache so it gets re-checked
-                from database.service import DatabaseService
-                DatabaseService._case_qty_column_exists = None
             else:
                 print(f"⚠️ Migration issue: {msg}")
+            # Versioned index migration; a no-op once recorded in schema_migrations and
+            # attempted once per process while it fails. The unique active mapping
+            # indexes are left to "Initialize Database" (duplicates can block them).
+            from database.migration import migrate_order_and_mapping_indexes, migrate_conversion_history_content_hash
+            success, msg = migrate_order_and_mapping_indexes()
+            print(f"{'✅' if success else '⚠️'} Index migration: {msg}")
+            success, msg = migrate_conversion_history_content_hash()
+            print(f"{'✅' if success else '⚠️'} Content hash migration: {msg}")
         except Exception as migration_err:
             print(f"⚠️ Migration check skipped: {migration_err}")
             
@@ -254,10 +283,10 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
-    # Initialize database service once - all order processors and mappings use this instance
+    # Shared database service - created once per process, not on every rerun
     # DatabaseService uses database/connection.py which creates a single database engine
     # This ensures all components (KEHE, UNFI East, Whole Foods, etc.) use the same Render database
-    db_service = DatabaseService()
+    db_service = get_db_service()
     
     # Sidebar navigation system
     with st.sidebar:
@@ -373,13 +402,24 @@ def main():
                 # Re-initialize database tables
                 engine = get_database_engine()
                 Base.metadata.create_all(bind=engine)
-                # Run migrations to add any new columns (like case_qty) to existing tables
-                from database.migration import migrate_item_mapping_table
-                success, msg = migrate_item_mapping_table()
-                # Clear the case_qty column existence cache so it gets re-checked
-                # DatabaseService is already imported at module level (line 35)
-                DatabaseService._case_qty_column_exists = None
-                st.success(f"✅ Database initialized! Migration: {msg}")
+                # Run migrations to add any new columns (like case_qty) to existing tables;
+                # this also refreshes the schema capability registry
+                from database.migration import (migrate_item_mapping_table, migrate_order_and_mapping_indexes,
+                                                migrate_conversion_history_content_hash, migrate_unique_active_mappings)
+                results = [
+                    migrate_item_mapping_table(),
+                    migrate_order_and_mapping_indexes(retry=True),
+                    migrate_conversion_history_content_hash(),
+                    # Only run here: duplicate active mappings block it until cleaned up
+                    migrate_unique_active_mappings(),
+                ]
+                if all(success for success, _ in results):
+                    st.success(f"✅ Database initialized! Migration: {' '.join(msg for _, msg in results)}")
+                else:
+                    st.warning("⚠️ Database initialized, but some migrations did not complete:")
+                    for success, msg in results:
+                        if not success:
+                            st.warning(msg)
             except Exception as e:
                 st.error(f"❌ Database init failed: {e}")
     
@@ -619,47 +659,12 @@ def process_orders_page(db_service: DatabaseService, selected_source: str = "all
         
         st.markdown('</div>', unsafe_allow_html=True)
         
-        # Initialize mapping utils (all parsers use same database via MappingUtils)
-        # MappingUtils uses DatabaseService which uses the same database connection
-        mapping_utils = MappingUtils(use_database=True)
-        
-        # Order source selection with modern styling
-        # All parsers use the same database:
-        # - WholeFoodsParser: uses db_service directly (same database)
-        # - Other parsers: use mapping_utils which uses DatabaseService (same database)
-        order_sources = {
-            "Whole Foods": WholeFoodsParser(db_service),
-            "UNFI West": UNFIWestParser(),
-            "UNFI East": UNFIEastParser(mapping_utils),
-            "KEHE - SPS": KEHEParser(),
-            "TJ Maxx": TKMaxxParser(),
-            "VMC": VMCParser(),
-            "Davidson": DavidsonParser()
-        }
-        
         # Source already selected, use it directly
         selected_order_source = selected_source_name
     
-    # Initialize mapping utils once (all parsers share the same database connection)
-    # MappingUtils internally uses DatabaseService which uses database/connection.py
-    # This ensures all order processors use the same Render database
-    mapping_utils = MappingUtils(use_database=True)
-    
-    # Order source selection for parsers
-    # All parsers use the same database connection:
-    # - WholeFoodsParser: receives db_service directly (same DatabaseService instance)
-    # - UNFIWestParser, KEHEParser, TKMaxxParser: use mapping_utils (same DatabaseService via MappingUtils)
-    # - UNFIEastParser: receives mapping_utils (same DatabaseService via MappingUtils)
-    order_sources = {
-        "Whole Foods": WholeFoodsParser(db_service),
-        "UNFI West": UNFIWestParser(),
-        "UNFI East": UNFIEastParser(mapping_utils),
-        "KEHE - SPS": KEHEParser(),
-        "TJ Maxx": TKMaxxParser(),
-        "VMC": VMCParser(),
-        "Davidson": DavidsonParser(),
-        "ROSS": ROSSParser()
-    }
+    # Shared mapping provider (same DatabaseService) injected into every parser
+    mapping_utils = get_mapping_utils()
+    order_sources = build_order_sources(db_service, mapping_utils)
     
     # Determine accepted file types based on selected source
     clean_source_name = selected_order_source.replace("🌐 ", "").replace("🛒 ", "").replace("📦 ", "").replace("🏭 ", "").replace("📋 ", "").replace("🏬 ", "").replace("🏪 ", "")
@@ -697,8 +702,8 @@ def process_orders_page(db_service: DatabaseService, selected_source: str = "all
         help_text = "📋 Upload PDF files from ROSS Dress for Less purchase orders"
         file_icon = "📄"
     else:
-        accepted_types = ['html', 'csv', 'xlsx', 'pdf']
-        help_text = f"📁 Upload order files for conversion"
+        accepted_types = SUPPORTED_FILE_TYPES
+        help_text = f"📁 Upload order files from any source; each file's source is detected automatically"
         file_icon = "📁"
     
     st.markdown("---")
@@ -722,84 +727,168 @@ def process_orders_page(db_service: DatabaseService, selected_source: str = "all
         st.info("TJ Maxx requires both PDFs for a complete order: upload the Distribution PDF (qty + DCs) and the PO PDF (prices + state).")
     
     if uploaded_files:
+        # Source of each file: the selected one, or detected per file under All Sources
+        detections = None
+        if clean_source_name in order_sources:
+            file_source_names = [clean_source_name] * len(uploaded_files)
+        elif clean_source_name == "All Sources":
+            detections = [detect_order_source(file.name, file.getvalue()) for file in uploaded_files]
+            file_source_names = [detection.source.display_name if detection.source else None for detection in detections]
+        else:
+            file_source_names = [None] * len(uploaded_files)
+        
+        # Recognize files converted before (same content, same source) with one lookup per source
+        file_hashes = [content_digest(file.getvalue()) for file in uploaded_files]
+        previous_conversions = {}
+        for source_name in dict.fromkeys(name for name in file_source_names if name):
+            source_hashes = [file_hash for file_hash, name in zip(file_hashes, file_source_names) if name == source_name]
+            previous_conversions.update(db_service.find_previous_conversions(source_hashes, source_name))
+        
         # Show uploaded files with better styling
         st.markdown("#### ✅ Files Ready for Processing")
         
         for i, file in enumerate(uploaded_files):
             file_size = len(file.getvalue()) / 1024  # KB
+            previous = previous_conversions.get(file_hashes[i])
+            previous_note = ""
+            if previous:
+                processed_on = previous['conversion_date'].strftime('%Y-%m-%d %H:%M') if previous['conversion_date'] else "an earlier run"
+                previous_note = f" — ♻️ already processed on {processed_on} as <em>{previous['filename']}</em>"
+            source_note = ""
+            if detections is not None:
+                source_note = f" → {file_source_names[i]}" if file_source_names[i] else f" — ⚠️ source not recognized ({detections[i].reason})"
             st.markdown(f"""
             <div style="background-color: #e8f5e8; padding: 0.5rem 1rem; border-radius: 5px; margin: 0.2rem 0; border-left: 3px solid #28a745;">
-                📁 <strong>{file.name}</strong> ({file_size:.1f} KB)
+                📁 <strong>{file.name}</strong> ({file_size:.1f} KB){source_note}{previous_note}
             </div>
             """, unsafe_allow_html=True)
         
+        undetected = [file.name for file, name in zip(uploaded_files, file_source_names) if not name]
+        if detections is not None and undetected:
+            st.warning(f"⚠️ The source of {len(undetected)} file(s) could not be recognized; they will be skipped. Select their source in the sidebar to process them.")
+        
+        reuse_previous = False
+        if previous_conversions:
+            reusable = sum(1 for previous in previous_conversions.values() if previous['has_output'])
+            if reusable:
+                reuse_previous = st.checkbox(
+                    f"♻️ Reuse the previous Xoro output for {reusable} already processed file(s) instead of parsing and saving them again",
+                    value=True
+                )
+            else:
+                st.warning("⚠️ Some files were already processed before this version stored conversion output; they will be parsed and saved again.")
+        
         st.markdown("---")
         
         # Process files button with better styling
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
             if st.button("🚀 Process Orders", type="primary", use_container_width=True):
-                if clean_source_name == "All Sources":
-                    st.error("⚠️ Please select a specific source before processing files. Auto-detection is not yet supported.")
-                elif clean_source_name in order_sources:
-                    process_orders(uploaded_files, order_sources[clean_source_name], clean_source_name, db_service)
+                if clean_source_name == "All Sources" or clean_source_name in order_sources:
+                    selected = [(file, name) for file, name in zip(uploaded_files, file_source_names) if name]
+                    if selected:
+                        process_orders([file for file, _ in selected],
+                                       [(name, order_sources[name]) for _, name in selected], db_service,
+                                       previous_conversions=previous_conversions if reuse_previous else None)
+                    else:
+                        st.error("⚠️ The source of the uploaded files could not be recognized. Please select the source in the sidebar.")
                 else:
                     st.error(f"⚠️ Unknown source: {clean_source_name}. Please select a valid source.")
 
-def process_orders(uploaded_files, parser, source_name, db_service: DatabaseService):
-    """Process uploaded files and convert to Xoro format"""
+def process_orders(uploaded_files, file_sources, db_service: DatabaseService,
+                   previous_conversions: dict = None):
+    """
+    Process uploaded files and convert to Xoro format
+    
+    file_sources holds the (source name, parser) of each upload, in upload
+    order; files uploaded under All Sources can each have a different source.
+    The files of each source are parsed and converted concurrently (see
+    utils/order_batch.py); results are saved and reported here, one file at
+    a time in upload order within each source. Files found in
+    previous_conversions (content hash -> earlier conversion, from
+    DatabaseService.find_previous_conversions) reuse that conversion's Xoro
+    output and are neither parsed nor saved again.
+    """
     
     progress_bar = st.progress(0)
     status_text = st.empty()
     
-    all_converted_data = []
     all_parsed_data = []  # Keep original parsed data for database storage
     errors = []
     
-    for i, uploaded_file in enumerate(uploaded_files):
-        try:
-            status_text.text(f"Processing {uploaded_file.name}...")
-            
-            # Read file content
-            file_content = uploaded_file.read()
-            file_extension = uploaded_file.name.lower().split('.')[-1]
-            
-            # Parse the file
-            parsed_data = parser.parse(file_content, file_extension, uploaded_file.name)
-            
-            if parsed_data:
-                # Store parsed data for database
-                all_parsed_data.extend(parsed_data)
-                
-                # Convert to Xoro format
-                xoro_template = XoroTemplate()
-                converted_data = xoro_template.convert_to_xoro(parsed_data, source_name)
-                all_converted_data.extend(converted_data)
-                
-                # Save to database
-                db_saved = db_service.save_processed_orders(parsed_data, source_name, uploaded_file.name)
+    # Read every upload up front; workers only see bytes
+    files = [(uploaded_file.name, uploaded_file.read()) for uploaded_file in uploaded_files]
+    file_hashes = [content_digest(content) for _, content in files]
+    
+    # Xoro rows per upload position, so reused and new output keep the upload order
+    rows_by_file = {}
+    to_process = {}  # source name -> upload positions to parse
+    for index, (file_name, _) in enumerate(files):
+        previous = (previous_conversions or {}).get(file_hashes[index])
+        reused_rows = None
+        if previous and previous['has_output']:
+            try:
+                reused_rows = db_service.get_conversion_output(previous['id'])
+            except Exception as e:
+                print(f"DEBUG: Could not load previous output for {file_name}: {e}")
+        if reused_rows:
+            rows_by_file[index] = reused_rows
+            st.info(f"♻️ Reused the previous output of {previous['filename']} for {file_name} (not saved again)")
+        else:
+            to_process.setdefault(file_sources[index][0], []).append(index)
+    
+    total_to_process = sum(len(indices) for indices in to_process.values())
+    finished_before = 0
+    
+    def show_progress(finished, total):
+        progress_bar.progress((finished_before + finished) / total_to_process)
+    
+    for source_name, indices in to_process.items():
+        parser = file_sources[indices[0]][1]
+        status_text.text(f"Processing {len(indices)} {source_name} file(s)...")
+        
+        batch = [files[index] for index in indices]
+        for result in iter_converted_files(batch, parser, source_name, on_progress=show_progress):
+            index = indices[result.index]
+            file_name = result.file_name
+            try:
+                if result.error is not None:
+                    raise Exception(result.error)
                 
-                if db_saved:
-                    st.success(f"✅ Successfully processed and saved {uploaded_file.name}")
-                else:
-                    st.warning(f"⚠️ Processed {uploaded_file.name} but database save failed")
-            else:
-                # TJ Maxx requires pairing PO + Distribution PDFs
-                if source_name.lower().replace(' ', '_') == 'tj_maxx' and getattr(parser, 'last_parse_status', '') == 'pending':
-                    st.info(f"⏳ TJ Maxx file stored: {uploaded_file.name}. Upload the matching PO/Distribution file to complete the order.")
+                if result.parsed_data:
+                    status_text.text(f"Saving {file_name}...")
+                    
+                    # Store parsed data for database
+                    all_parsed_data.extend(result.parsed_data)
+                    rows_by_file[index] = result.converted_data
+                    
+                    # Save to database, with the content hash and output for repeat uploads
+                    db_saved = db_service.save_processed_orders(result.parsed_data, source_name, file_name,
+                                                                content_hash=file_hashes[index],
+                                                                xoro_rows=result.converted_data)
+                    
+                    if db_saved:
+                        st.success(f"✅ Successfully processed and saved {file_name}")
+                    else:
+                        st.warning(f"⚠️ Processed {file_name} but database save failed")
                 else:
-                    error_msg = f"Failed to parse {uploaded_file.name}: Parser returned no data. Please check that the file has the correct format (Record Type column with H/D/I records)."
-                    errors.append(error_msg)
-                    st.error(f"❌ {error_msg}")
-                
-        except Exception as e:
-            error_msg = f"Error processing {uploaded_file.name}: {str(e)}"
-            errors.append(error_msg)
-            st.error(f"❌ {error_msg}")
+                    # TJ Maxx requires pairing PO + Distribution PDFs
+                    if source_name.lower().replace(' ', '_') == 'tj_maxx' and result.parse_status == 'pending':
+                        st.info(f"⏳ TJ Maxx file stored: {file_name}. Upload the matching PO/Distribution file to complete the order.")
+                    else:
+                        error_msg = f"Failed to parse {file_name}: Parser returned no data. Please check that the file has the correct format (Record Type column with H/D/I records)."
+                        errors.append(error_msg)
+                        st.error(f"❌ {error_msg}")
+                    
+            except Exception as e:
+                error_msg = f"Error processing {file_name}: {str(e)}"
+                errors.append(error_msg)
+                st.error(f"❌ {error_msg}")
         
-        # Update progress
-        progress_bar.progress((i + 1) / len(uploaded_files))
+        finished_before += len(indices)
     
+    progress_bar.progress(1.0)
+    all_converted_data = [row for index in range(len(files)) for row in rows_by_file.get(index, [])]
     status_text.text("Processing complete!")
     
     # Display results
@@ -893,14 +982,34 @@ def processed_orders_page(db_service: DatabaseService, selected_source: str = "a
         )
     
     with col2:
-        limit = st.number_input("Number of orders to display", min_value=10, max_value=1000, value=50)
+        page_size = int(st.number_input("Orders per page", min_value=10, max_value=1000, value=50))
+    
+    # Keyset pagination: keep the cursor of every page visited so far, restart
+    # from the first page whenever the filter or page size changes
+    page_key = (source_filter, page_size)
+    if st.session_state.get('processed_orders_page_key') != page_key:
+        st.session_state['processed_orders_page_key'] = page_key
+        st.session_state['processed_orders_cursors'] = [None]
+    cursors = st.session_state['processed_orders_cursors']
     
     try:
         source = None if source_filter == "All" else source_filter.lower().replace(" ", "_")
-        orders = db_service.get_processed_orders(source=source, limit=int(limit))
+        orders, next_cursor = db_service.get_processed_orders_page(source=source, page_size=page_size, cursor=cursors[-1])
         
         if orders:
-            st.write(f"Found {len(orders)} orders")
+            page_number = len(cursors)
+            first = (page_number - 1) * page_size + 1
+            st.write(f"Showing orders {first}-{first + len(orders) - 1} (page {page_number})")
+            
+            nav_prev, nav_next = st.columns(2)
+            with nav_prev:
+                if page_number > 1 and st.button("⬅️ Newer", key="processed_orders_prev"):
+                    cursors.pop()
+                    st.rerun()
+            with nav_next:
+                if next_cursor is not None and st.button("Older ➡️", key="processed_orders_next"):
+                    cursors.append(next_cursor)
+                    st.rerun()
             
             # Display orders summary
             for order in orders:
@@ -1885,6 +1994,7 @@ def delete_selected_mappings(db_service: DatabaseService, processor: str, mappin
             
             if deleted_count > 0:
                 session.commit()
+                db_service.bump_mapping_version()
                 st.success(f"✅ Successfully deleted {deleted_count} mapping(s)!")
             
             if failed_deletions:
@@ -2283,272 +2393,11 @@ def show_current_mappings_view(db_service: DatabaseService, processor: str, mapp
 def upload_mappings_to_database_silent(df: pd.DataFrame, db_service: DatabaseService, processor: str, mapping_type: str):
     """Upload mappings to database and return result without showing messages"""
     try:
-        mappings_data = []
-        skipped_rows = []
-        
-        for index, row in df.iterrows():
-            if mapping_type in ["customer", "store"]:
-                # Get source from CSV if available, otherwise use processor parameter
-                # Normalize source name (e.g., "UNFI East" -> "unfi_east")
-                csv_source = str(row.get('Source', '') or row.get('source', '')).strip()
-                if csv_source:
-                    source_to_use = db_service.normalize_source_name(csv_source)
-                else:
-                    source_to_use = db_service.normalize_source_name(processor)
-                
-                # Handle different column name formats for customer/store mappings
-                raw_name_value = row.get('Raw Customer ID' if mapping_type == 'customer' else 'Raw Store ID', '') or \
-                               row.get('RawCustomerID' if mapping_type == 'customer' else 'RawStoreID', '') or \
-                               row.get('Raw Customer' if mapping_type == 'customer' else 'Raw Store', '') or \
-                               row.get('Customer ID' if mapping_type == 'customer' else 'Store ID', '') or \
-                               row.get('Raw ID', '') or ''
-                
-                # Convert to string and normalize numeric values (remove .0 suffix)
-                # Handle cases where pandas might have already converted to float
-                if isinstance(raw_name_value, float):
-                    # If it's a float that represents an integer, convert to int then string
-                    if raw_name_value == int(raw_name_value):
-                        raw_name = str(int(raw_name_value))
-                    else:
-                        raw_name = str(raw_name_value).strip()
-                else:
-                    raw_name = str(raw_name_value).strip()
-                
-                # Remove .0 suffix if it's a numeric value (e.g., "569813000000.0" -> "569813000000")
-                if raw_name.endswith('.0') and raw_name.replace('.', '').replace('-', '').isdigit():
-                    raw_name = raw_name[:-2]
-                
-                mapped_name = str(row.get('Mapped Customer Name' if mapping_type == 'customer' else 'Mapped Store Name', '') or
-                              row.get('MappedCustomerName' if mapping_type == 'customer' else 'MappedStoreName', '') or
-                              row.get('Customer Name' if mapping_type == 'customer' else 'Store Name', '') or
-                              row.get('Mapped Name', '') or
-                              row.get('Name', '') or
-                              '').strip()
-                
-                # Ensure distinct store_type values for customer vs store mappings
-                if mapping_type == 'customer':
-                    # Force customer uploads to be labeled as 'customer' to keep datasets separate
-                    store_type = 'customer'
-                else:  # store
-                    store_type = str(row.get('Store Type', '') or
-                                 row.get('StoreType', '') or
-                                 row.get('Type', 'store') or
-                                 'store').strip()
-                
-                # Handle priority - try different column names
-                priority = 100
-                for col in ['Priority', 'priority']:
-                    if col in row and pd.notna(row[col]):
-                        try:
-                            priority = int(row[col])
-                            break
-                        except (ValueError, TypeError):
-                            continue
-                
-                # Handle active status - try different column names
-                active = True
-                for col in ['Active', 'active', 'Active Status']:
-                    if col in row and pd.notna(row[col]):
-                        try:
-                            active = bool(row[col])
-                            break
-                        except (ValueError, TypeError):
-                            continue
-                
-                # Handle notes - try different column names
-                notes = str(row.get('Notes', '') or 
-                        row.get('notes', '') or 
-                        row.get('Note', '') or 
-                        '').strip()
-                
-                # Skip rows with empty required fields
-                if not raw_name or not mapped_name:
-                    skipped_rows.append(f"Row {index + 1}: Missing raw_name or mapped_name")
-                    continue
-                
-                if mapping_type == "customer":
-                    mappings_data.append({
-                        'source': source_to_use,
-                        'raw_store_id': raw_name,
-                        'mapped_store_name': mapped_name,
-                        'store_type': store_type,
-                        'priority': priority,
-                        'active': active,
-                        'notes': notes
-                    })
-                else:  # store
-                    mappings_data.append({
-                        'source': source_to_use,
-                        'raw_store_id': raw_name,
-                        'mapped_store_name': mapped_name,
-                        'store_type': store_type,
-                        'priority': priority,
-                        'active': active,
-                        'notes': notes
-                    })
-            else:  # item
-                # Handle different column name formats
-                raw_item_value = row.get('Raw Item', '') or row.get('RawKeyValue', '') or row.get('Raw Item Number', '') or ''
-                
-                # Convert to string and normalize numeric values (remove .0 suffix)
-                # Handle cases where pandas might have already converted to float
-                if isinstance(raw_item_value, float):
-                    # If it's a float that represents an integer, convert to int then string
-                    if raw_item_value == int(raw_item_value):
-                        raw_item = str(int(raw_item_value))
-                    else:
-                        raw_item = str(raw_item_value).strip()
-                else:
-                    raw_item = str(raw_item_value).strip()
-                
-                # Remove .0 suffix if it's a numeric value (e.g., "256821.0" -> "256821")
-                if raw_item.endswith('.0') and raw_item.replace('.', '').replace('-', '').isdigit():
-                    raw_item = raw_item[:-2]
-                
-                mapped_item = str(row.get('Mapped Item', '') or 
-                              row.get('MappedItemNumber', '') or 
-                              row.get('Mapped Item Number', '') or 
-                              '').strip()
-                
-                item_description = str(row.get('Item Description', '') or 
-                                   row.get('MappedDescription', '') or 
-                                   row.get('Description', '') or 
-                                   '').strip()
-                
-                # Handle priority - try different column names
-                priority = 100
-                for col in ['Priority', 'priority']:
-                    if col in row and pd.notna(row[col]):
-                        try:
-                            priority = int(row[col])
-                            break
-                        except (ValueError, TypeError):
-                            continue
-                
-                # Handle active status - try different column names
-                active = True
-                for col in ['Active', 'active', 'Active Status']:
-                    if col in row and pd.notna(row[col]):
-                        try:
-                            active = bool(row[col])
-                            break
-                        except (ValueError, TypeError):
-                            continue
-                
-                # Handle notes - try different column names
-                notes = str(row.get('Notes', '') or 
-                        row.get('notes', '') or 
-                        row.get('Note', '') or 
-                        '').strip()
-                
-                # Skip rows with empty required fields
-                if not raw_item or not mapped_item:
-                    skipped_rows.append(f"Row {index + 1}: Missing raw_item or mapped_item")
-                    continue
-                
-                mapping_entry = {
-                    'source': processor,
-                    'raw_item': raw_item,
-                    'mapped_item': mapped_item,
-                    'mapped_description': item_description,
-                    'priority': priority,
-                    'active': active,
-                    'notes': notes
-                }
-                
-                # Handle case_qty only for case-qty processors
-                if uses_case_qty(processor) and db_service._check_case_qty_column_exists():
-                    # Normalize column names for flexible matching (handle spaces, underscores, case)
-                    def normalize_col_name(col_name):
-                        return str(col_name).strip().lower().replace(' ', '').replace('_', '').replace('-', '')
-                    
-                    # Get all column names from the row (pandas Series index)
-                    row_cols_normalized = {normalize_col_name(k): k for k in row.index}
-                    
-                    # Check for "Use Case Qty" flag - try multiple column name variations
-                    use_case_qty = False
-                    use_case_qty_patterns = ['usecaseqty', 'usecase', 'useqty']
-                    for pattern in use_case_qty_patterns:
-                        matching_col = row_cols_normalized.get(pattern)
-                        if matching_col and matching_col in row.index:
-                            try:
-                                val = row[matching_col]
-                                if pd.notna(val):
-                                    # Handle both boolean and string values
-                                    if isinstance(val, bool):
-                                        use_case_qty = val
-                                    else:
-                                        val_str = str(val).strip().lower()
-                                        use_case_qty = val_str in ('true', '1', 'yes', 'on')
-                                    if use_case_qty:
-                                        break
-                            except (ValueError, TypeError, KeyError):
-                                continue
-                    
-                    # Also try direct column name matches as fallback (check all possible variations)
-                    if not use_case_qty:
-                        # Check all columns in the row for "use case qty" pattern
-                        for col_name in row.index:
-                            col_normalized = normalize_col_name(col_name)
-                            if 'usecase' in col_normalized or 'useqty' in col_normalized:
-                                try:
-                                    val = row[col_name]
-                                    if pd.notna(val):
-                                        if isinstance(val, bool):
-                                            use_case_qty = val
-                                        else:
-                                            val_str = str(val).strip().lower()
-                                            use_case_qty = val_str in ('true', '1', 'yes', 'on')
-                                        if use_case_qty:
-                                            break
-                                except (ValueError, TypeError, KeyError):
-                                    continue
-                    
-                    # Get case_qty value - check even if use_case_qty is False, in case user just provided Case Qty directly
-                    case_qty_value = None
-                    case_qty_patterns = ['caseqty', 'case']
-                    for pattern in case_qty_patterns:
-                        matching_col = row_cols_normalized.get(pattern)
-                        if matching_col and matching_col in row.index:
-                            try:
-                                val = row[matching_col]
-                                if pd.notna(val):
-                                    case_qty_value = float(val)
-                                    if case_qty_value > 0:
-                                        break
-                            except (ValueError, TypeError, KeyError):
-                                continue
-                    
-                    # Also try direct column name matches (check all columns for case qty pattern)
-                    if case_qty_value is None:
-                        for col_name in row.index:
-                            col_normalized = normalize_col_name(col_name)
-                            # Match "caseqty" but not "usecaseqty"
-                            if 'caseqty' in col_normalized and 'use' not in col_normalized:
-                                try:
-                                    val = row[col_name]
-                                    if pd.notna(val):
-                                        case_qty_value = float(val)
-                                        if case_qty_value > 0:
-                                            break
-                                except (ValueError, TypeError, KeyError):
-                                    continue
-                    
-                    # Set case_qty based on use_case_qty flag and case_qty_value
-                    # Logic: If case_qty_value is provided, we should use it (implicitly means Use Case Qty = True)
-                    # If use_case_qty is explicitly True, we should set case_qty even if value is not provided
-                    if case_qty_value and case_qty_value > 0:
-                        # If case_qty_value is provided, set it (this implicitly means Use Case Qty should be True)
-                        mapping_entry['case_qty'] = case_qty_value
-                    elif use_case_qty:
-                        # If use_case_qty is explicitly True but no value provided, set default to 1.0
-                        # This ensures "Use Case Qty" shows as True in UI/download
-                        mapping_entry['case_qty'] = 1.0
-                    else:
-                        # Neither use_case_qty is True nor case_qty_value is provided
-                        mapping_entry['case_qty'] = None
-                
-                mappings_data.append(mapping_entry)
+        # Resolve header aliases and clean every field column by column
+        include_case_qty = mapping_type == "item" and uses_case_qty(processor) and db_service._check_case_qty_column_exists()
+        mappings_data, skipped_rows = build_mappings_payload(
+            df, processor, mapping_type, db_service.normalize_source_name, include_case_qty=include_case_qty
+        )
         
         if mapping_type in ["customer", "store"]:
                 if mapping_type == "customer":
@@ -2593,6 +2442,7 @@ def upload_mappings_to_database_silent(df: pd.DataFrame, db_service: DatabaseSer
                                         inserted_count += 1
                                     
                                     session.commit()
+                                    db_service.bump_mapping_version()
                                     
                                     st.success(f"✅ Successfully uploaded {inserted_count} customer mappings using fallback method!")
                                     
@@ -2762,6 +2612,7 @@ def save_bulk_changes(edited_df: pd.DataFrame, db_service: DatabaseService, proc
                             mapping.active = _parse_bool(row['Active'])
                             mapping.notes = str(row.get('Notes', '') or '')
             session.commit()
+            db_service.bump_mapping_version()
             st.success("✅ Bulk changes saved successfully!")
             
     except Exception as e:
@@ -2833,6 +2684,7 @@ def save_row_changes(mapping, form_data: dict, db_service: DatabaseService, proc
                             db_mapping.case_qty = None
                     
             session.commit()
+            db_service.bump_mapping_version()
             st.success("✅ Mapping updated successfully!")
             
     except Exception as e:
@@ -2852,6 +2704,7 @@ def delete_single_mapping(mapping, db_service: DatabaseService, processor: str,
             if db_mapping:
                 session.delete(db_mapping)
                 session.commit()
+                db_service.bump_mapping_version()
                 st.success("✅ Mapping deleted successfully!")
             else:
                 st.warning("⚠️ Mapping not found")
@@ -4,6 +4,7 @@ Database connection and session management with environment switching
 
 import os
 import re
+import threading
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from contextlib import contextmanager
@@ -142,20 +143,59 @@ def create_database_engine():
         # If all strategies fail, raise the original error
         raise Exception(f"Database connection failed after all retry attempts. Environment: {env}, Error: {e}")
 
-# Create engine instance
-engine = create_database_engine()
+# The engine is created on first use, not at import time, so parsers and offline
+# tools can import the database package without waiting on a connection
+_engine = None
+_engine_lock = threading.Lock()
+_warm_up_thread = None
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create session factory (bound to the engine per session)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 
 def get_database_engine():
-    """Get the database engine"""
-    return engine
+    """
+    Get the database engine, creating it on first call
+    
+    Concurrent callers wait for a single creation. A failed creation is not
+    cached; the error is raised and the next call tries again.
+    """
+    global _engine
+    if _engine is not None:
+        return _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_database_engine()
+        return _engine
+
+def warm_up_database_engine() -> None:
+    """
+    Create the engine in a background thread so the connection handshake
+    overlaps with other startup work. Errors are logged and the first real
+    get_database_engine() call retries.
+    """
+    global _warm_up_thread
+    if _engine is not None or (_warm_up_thread is not None and _warm_up_thread.is_alive()):
+        return
+    
+    def _warm_up():
+        try:
+            get_database_engine()
+        except Exception as e:
+            print(f"[WARNING] Background database warm-up failed: {e}")
+    
+    _warm_up_thread = threading.Thread(target=_warm_up, name="database-warm-up", daemon=True)
+    _warm_up_thread.start()
+
+def __getattr__(name):
+    # Keep `from database.connection import engine` working without connecting at import
+    if name == 'engine':
+        return get_database_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 @contextmanager
 def get_session() -> Generator[Session, None, None]:
     """Get a database session with automatic cleanup"""
-    session = SessionLocal()
+    session = SessionLocal(bind=get_database_engine())
     try:
         yield session
         session.commit()
@@ -167,7 +207,7 @@ def get_session() -> Generator[Session, None, None]:
 
 def get_session_direct() -> Session:
     """Get a database session directly (remember to close it)"""
-    return SessionLocal()
+    return SessionLocal(bind=get_database_engine())
 
 def get_current_environment():
     """Get the current database environment"""
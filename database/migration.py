@@ -1,9 +1,14 @@
 """
 Database migration utilities for item mapping template enhancement
+
+Every migration that changes the schema refreshes the schema capability
+registry (database/schema.py) so services see the new columns immediately.
 """
 
 from sqlalchemy import text, inspect
+from datetime import datetime
 from .connection import get_database_engine
+from .schema import schema_capabilities
 import logging
 
 logger = logging.getLogger(__name__)
@@ -75,6 +80,9 @@ def migrate_item_mapping_table():
     except Exception as e:
         logger.error(f"Migration failed: {e}")
         return False, f"Migration failed: {e}"
+    finally:
+        # Columns may have been added even if a later step failed
+        schema_capabilities.refresh()
 
 def migrate_existing_mappings():
     """
@@ -108,6 +116,253 @@ def migrate_existing_mappings():
         logger.error(f"Failed to migrate existing mappings: {e}")
         return False, f"Failed to migrate existing mappings: {e}"
 
+# Versioned index migration for the order and mapping access paths.
+# Recorded in schema_migrations once every index exists. A failed attempt is
+# remembered for the process, so app reruns do not repeat it.
+INDEX_MIGRATION_VERSION = '002_order_and_mapping_indexes'
+_index_migration_failed = None
+
+INDEX_MIGRATION_INDEXES = [
+    # Customer mapping loads: WHERE source = ? AND active ORDER BY priority (covering)
+    ("idx_customer_mappings_lookup",
+     "CREATE INDEX IF NOT EXISTS idx_customer_mappings_lookup ON customer_mappings"
+     "(source, active, priority, raw_customer_id, mapped_customer_name)"),
+    # Store mapping loads: WHERE source = ? AND store_type ... (covering)
+    ("idx_store_mappings_lookup",
+     "CREATE INDEX IF NOT EXISTS idx_store_mappings_lookup ON store_mappings"
+     "(source, store_type, raw_store_id, mapped_store_name)"),
+    # Line items of an order (selectinload, cascades)
+    ("idx_order_line_items_order_id",
+     "CREATE INDEX IF NOT EXISTS idx_order_line_items_order_id ON order_line_items(order_id)"),
+    # Processed orders history, newest first, keyset paginated by (processed_at, id)
+    ("idx_processed_orders_processed_at",
+     "CREATE INDEX IF NOT EXISTS idx_processed_orders_processed_at ON processed_orders(processed_at DESC, id DESC)"),
+    ("idx_processed_orders_source_processed_at",
+     "CREATE INDEX IF NOT EXISTS idx_processed_orders_source_processed_at ON processed_orders(source, processed_at DESC, id DESC)"),
+]
+
+def _ensure_schema_migrations_table(engine):
+    """Create the schema_migrations bookkeeping table if needed"""
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version VARCHAR(100) PRIMARY KEY, applied_at TIMESTAMP NOT NULL)"
+        ))
+
+def _record_migration(engine, version):
+    """Record a versioned migration in schema_migrations"""
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO schema_migrations (version, applied_at) VALUES (:version, :applied_at)"),
+            {'version': version, 'applied_at': datetime.utcnow()}
+        )
+
+def is_migration_applied(version):
+    """Check whether a versioned migration has been recorded in schema_migrations"""
+    
+    engine = get_database_engine()
+    _ensure_schema_migrations_table(engine)
+    with engine.connect() as conn:
+        result = conn.execute(text("SELECT 1 FROM schema_migrations WHERE version = :version"), {'version': version})
+        return result.fetchone() is not None
+
+def migrate_order_and_mapping_indexes(retry=False):
+    """
+    Add the indexes used by mapping loads and the processed orders history.
+    
+    Each index is created in its own transaction so that one failure does not
+    abort the rest. The app runs this on startup, so a failed attempt is not
+    repeated in the same process (call with retry=True to try again).
+    """
+    
+    global _index_migration_failed
+    if _index_migration_failed and not retry:
+        return False, f"Migration {INDEX_MIGRATION_VERSION} failed earlier in this process. {_index_migration_failed}"
+    
+    engine = get_database_engine()
+    
+    try:
+        if is_migration_applied(INDEX_MIGRATION_VERSION):
+            return True, f"Migration {INDEX_MIGRATION_VERSION} already applied."
+        
+        tables = set(inspect(engine).get_table_names())
+        created, failed = [], []
+        for idx_name, idx_sql in INDEX_MIGRATION_INDEXES:
+            table_name = idx_sql.split(' ON ', 1)[1].split('(', 1)[0].strip()
+            if table_name not in tables:
+                failed.append(f"{idx_name} (missing table {table_name})")
+                continue
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(idx_sql))
+                created.append(idx_name)
+                logger.info(f"Created index: {idx_name}")
+            except Exception as e:
+                failed.append(f"{idx_name} ({e.__class__.__name__})")
+                logger.warning(f"Index creation warning for {idx_name}: {e}")
+        
+        if failed:
+            # Not recorded, so it can be retried once the cause is fixed
+            _index_migration_failed = f"Could not create: {', '.join(failed)}"
+            logger.error(f"Migration {INDEX_MIGRATION_VERSION} incomplete. {_index_migration_failed}")
+            return False, f"Migration {INDEX_MIGRATION_VERSION} incomplete. {_index_migration_failed}"
+        
+        _record_migration(engine, INDEX_MIGRATION_VERSION)
+        _index_migration_failed = None
+        logger.info(f"Migration {INDEX_MIGRATION_VERSION} applied")
+        return True, f"Migration {INDEX_MIGRATION_VERSION} applied ({len(created)} indexes)."
+        
+    except Exception as e:
+        _index_migration_failed = str(e)
+        logger.error(f"Index migration failed: {e}")
+        return False, f"Index migration failed: {e}"
+    finally:
+        schema_capabilities.refresh()
+
+# Versioned migration allowing at most one active mapping per key. Existing
+# data can hold duplicate active mappings, which block these unique indexes,
+# so it is not run on app startup: only from "Initialize Database" and the
+# setup scripts (run_full_migration), reporting the keys to clean up.
+UNIQUE_MAPPING_MIGRATION_VERSION = '004_unique_active_mappings'
+
+UNIQUE_MAPPING_INDEXES = [
+    ("uq_item_mappings_active", 'item_mappings', ['source', 'key_type', 'raw_item']),
+    ("uq_customer_mappings_active", 'customer_mappings', ['source', 'raw_customer_id']),
+    ("uq_store_mappings_active", 'store_mappings', ['source', 'store_type', 'raw_store_id']),
+]
+
+# Duplicate keys listed per table in the migration message
+DUPLICATE_KEYS_REPORTED = 10
+
+def find_duplicate_active_mappings(table_name, key_columns):
+    """
+    Find keys with more than one active mapping
+    
+    Args:
+        table_name: Mapping table
+        key_columns: Columns identifying a mapping
+        
+    Returns:
+        List of (key values tuple, number of active rows), most duplicated first
+    """
+    
+    engine = get_database_engine()
+    columns = ', '.join(key_columns)
+    with engine.connect() as conn:
+        result = conn.execute(text(
+            f"SELECT {columns}, COUNT(*) AS active_rows FROM {table_name} WHERE active = TRUE "
+            f"GROUP BY {columns} HAVING COUNT(*) > 1 ORDER BY COUNT(*) DESC, {columns}"
+        ))
+        return [(tuple(row[:-1]), row[-1]) for row in result]
+
+def migrate_unique_active_mappings():
+    """
+    Add unique partial indexes allowing one active mapping per key.
+    
+    A table with duplicate active mappings is skipped and its duplicate keys
+    are reported; the migration is only recorded once every index exists.
+    """
+    
+    engine = get_database_engine()
+    
+    try:
+        if is_migration_applied(UNIQUE_MAPPING_MIGRATION_VERSION):
+            return True, f"Migration {UNIQUE_MAPPING_MIGRATION_VERSION} already applied."
+        
+        tables = set(inspect(engine).get_table_names())
+        created, blocked, failed = [], [], []
+        for idx_name, table_name, key_columns in UNIQUE_MAPPING_INDEXES:
+            if table_name not in tables:
+                failed.append(f"{idx_name} (missing table {table_name})")
+                continue
+            
+            duplicates = find_duplicate_active_mappings(table_name, key_columns)
+            if duplicates:
+                keys = '; '.join(
+                    f"{'/'.join(str(value) for value in key)} ({count} active)"
+                    for key, count in duplicates[:DUPLICATE_KEYS_REPORTED]
+                )
+                if len(duplicates) > DUPLICATE_KEYS_REPORTED:
+                    keys += f"; ... {len(duplicates) - DUPLICATE_KEYS_REPORTED} more"
+                blocked.append(f"{table_name} ({'/'.join(key_columns)}): {keys}")
+                logger.warning(f"{len(duplicates)} duplicate active keys block {idx_name}: {keys}")
+                continue
+            
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(
+                        f"CREATE UNIQUE INDEX IF NOT EXISTS {idx_name} ON {table_name}({', '.join(key_columns)}) "
+                        f"WHERE active = TRUE"
+                    ))
+                created.append(idx_name)
+                logger.info(f"Created index: {idx_name}")
+            except Exception as e:
+                failed.append(f"{idx_name} ({e.__class__.__name__})")
+                logger.warning(f"Index creation warning for {idx_name}: {e}")
+        
+        if blocked or failed:
+            problems = []
+            if blocked:
+                problems.append(f"Deactivate or delete the duplicate active mappings in {' | '.join(blocked)}")
+            if failed:
+                problems.append(f"Could not create: {', '.join(failed)}")
+            return False, f"Migration {UNIQUE_MAPPING_MIGRATION_VERSION} not applied. {'. '.join(problems)}"
+        
+        _record_migration(engine, UNIQUE_MAPPING_MIGRATION_VERSION)
+        logger.info(f"Migration {UNIQUE_MAPPING_MIGRATION_VERSION} applied")
+        return True, f"Migration {UNIQUE_MAPPING_MIGRATION_VERSION} applied ({len(created)} indexes)."
+        
+    except Exception as e:
+        logger.error(f"Unique mapping migration failed: {e}")
+        return False, f"Unique mapping migration failed: {e}"
+    finally:
+        schema_capabilities.refresh()
+
+# Versioned migration for duplicate upload detection
+CONTENT_HASH_MIGRATION_VERSION = '003_conversion_history_content_hash'
+
+def migrate_conversion_history_content_hash():
+    """
+    Add conversion_history.content_hash (indexed) and xoro_output, so a file
+    that was already converted can be recognized and its output reused.
+    """
+    
+    engine = get_database_engine()
+    
+    try:
+        if is_migration_applied(CONTENT_HASH_MIGRATION_VERSION):
+            return True, f"Migration {CONTENT_HASH_MIGRATION_VERSION} already applied."
+        
+        inspector = inspect(engine)
+        if 'conversion_history' not in inspector.get_table_names():
+            return True, f"Migration {CONTENT_HASH_MIGRATION_VERSION} skipped. Table conversion_history does not exist yet."
+        columns = [col['name'] for col in inspector.get_columns('conversion_history')]
+        
+        columns_added = []
+        with engine.begin() as conn:
+            for col_name, col_definition in [('content_hash', "VARCHAR(64)"), ('xoro_output', "TEXT")]:
+                if col_name not in columns:
+                    conn.execute(text(f"ALTER TABLE conversion_history ADD COLUMN {col_name} {col_definition}"))
+                    columns_added.append(col_name)
+                    logger.info(f"Added column: conversion_history.{col_name}")
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_conversion_history_content_hash ON conversion_history(content_hash)"
+            ))
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, applied_at) VALUES (:version, :applied_at)"),
+                {'version': CONTENT_HASH_MIGRATION_VERSION, 'applied_at': datetime.utcnow()}
+            )
+        
+        logger.info(f"Migration {CONTENT_HASH_MIGRATION_VERSION} applied")
+        added = f"Added columns: {', '.join(columns_added)}" if columns_added else "Columns already exist"
+        return True, f"Migration {CONTENT_HASH_MIGRATION_VERSION} applied. {added}."
+        
+    except Exception as e:
+        logger.error(f"Content hash migration failed: {e}")
+        return False, f"Content hash migration failed: {e}"
+    finally:
+        schema_capabilities.refresh()
+
 def run_full_migration():
     """
     Run complete migration process for item mapping enhancement
@@ -124,8 +379,23 @@ def run_full_migration():
     success, migrate_message = migrate_existing_mappings()
     if not success:
         return False, migrate_message
+    
+    # Step 3: Indexes
+    success, index_message = migrate_order_and_mapping_indexes(retry=True)
+    if not success:
+        return False, index_message
+    
+    # Step 4: Content hashes for duplicate upload detection
+    success, hash_message = migrate_conversion_history_content_hash()
+    if not success:
+        return False, hash_message
+        
+    # Step 5: One active mapping per key (reports duplicates that block it)
+    success, unique_message = migrate_unique_active_mappings()
+    if not success:
+        return False, unique_message
         
-    full_message = f"{message}. {migrate_message}"
+    full_message = f"{message}. {migrate_message}. {index_message}. {hash_message}. {unique_message}"
     logger.info(f"Full migration completed: {full_message}")
     
     return True, full_message
\ No newline at end of file
@@ -54,6 +54,8 @@ class ConversionHistory(Base):
     line_items_count = Column(Integer, default=0)
     success = Column(Boolean, default=True)
     error_message = Column(Text)
+    content_hash = Column(String(64), index=True)  # SHA-256 of the converted file, to recognize repeat uploads
+    xoro_output = Column(Text)  # Xoro CSV produced by the conversion, reused for repeat uploads
     
 class CustomerMapping(Base):
     """Model for storing customer name mappings"""
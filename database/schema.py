@@ -0,0 +1,103 @@
+"""
+Registry of the optional tables and columns present in the connected database
+
+Older deployments predate some of the schema: the customer_mappings table,
+the item_mappings columns added by migration.migrate_item_mapping_table
+(key_type, priority, active, vendor, mapped_description, notes, case_qty) and
+the conversion_history columns added by
+migration.migrate_conversion_history_content_hash (content_hash, xoro_output).
+Instead of probing information_schema before queries, the schema is
+introspected once per engine and answered from memory. Anything that changes
+the schema (migrations, create_all) must call schema_capabilities.refresh().
+"""
+
+import threading
+from typing import Dict, FrozenSet, List, Optional
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only
+from .connection import get_database_engine
+
+
+class SchemaCapabilities:
+    """Thread-safe, lazily loaded view of the tables and columns in the database"""
+
+    def __init__(self):
+        self._engine = None
+        self._tables: Optional[Dict[str, FrozenSet[str]]] = None
+        self._lock = threading.Lock()
+
+    def _get_tables(self) -> Optional[Dict[str, FrozenSet[str]]]:
+        """
+        Table name -> column names for the current engine
+
+        Returns:
+            The cached schema, introspecting it on first use (or after a
+            refresh or engine change). None if the database cannot be
+            introspected; failures are not cached, so the next call retries.
+        """
+        engine = get_database_engine()
+        tables = self._tables
+        if tables is not None and self._engine is engine:
+            return tables
+
+        with self._lock:
+            if self._tables is not None and self._engine is engine:
+                return self._tables
+            try:
+                inspector = inspect(engine)
+                tables = {
+                    table_name: frozenset(column['name'] for column in inspector.get_columns(table_name))
+                    for table_name in inspector.get_table_names()
+                }
+            except Exception as e:
+                print(f"DEBUG: Could not introspect database schema: {e}")
+                return None
+            self._engine = engine
+            self._tables = tables
+            print(f"DEBUG: Schema capabilities loaded for {len(tables)} tables")
+            return tables
+
+    def refresh(self) -> None:
+        """Forget the cached schema; the next check introspects the database again"""
+        with self._lock:
+            self._engine = None
+            self._tables = None
+
+    def has_table(self, table_name: str) -> bool:
+        """Whether the table exists (False if the schema cannot be read)"""
+        tables = self._get_tables()
+        return tables is not None and table_name in tables
+
+    def has_column(self, table_name: str, column_name: str) -> bool:
+        """Whether the table exists and has the column (False if the schema cannot be read)"""
+        tables = self._get_tables()
+        return tables is not None and column_name in tables.get(table_name, ())
+
+    def missing_columns(self, model) -> List[str]:
+        """Columns of a model's table that the database does not have"""
+        columns = self._get_tables() or {}
+        existing = columns.get(model.__tablename__)
+        if existing is None:
+            # Unknown schema or missing table: nothing to exclude, let the query report it
+            return []
+        return [column.name for column in model.__table__.columns if column.name not in existing]
+
+    def load_options(self, model) -> list:
+        """
+        Query options that keep a model query from selecting missing columns
+
+        Args:
+            model: ORM model class (e.g. ItemMapping)
+
+        Returns:
+            [load_only(...)] with the columns that exist, or [] if none are missing
+        """
+        missing = self.missing_columns(model)
+        if not missing:
+            return []
+        present = [getattr(model, column.name) for column in model.__table__.columns if column.name not in missing]
+        return [load_only(*present)]
+
+
+# Shared by every DatabaseService in the process
+schema_capabilities = SchemaCapabilities()
@@ -2,9 +2,12 @@
 Database service for order transformer operations
 """
 
-from typing import List, Dict, Any, Optional, Union
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, inspect as sqlalchemy_inspect
+from typing import List, Dict, Any, Optional, Tuple, Union
+import io
+import threading
+from sqlalchemy.orm import Session, load_only, selectinload
+from sqlalchemy import (and_, case, or_, func, insert, literal, select, tuple_, update, inspect as sqlalchemy_inspect,
+                        Table, MetaData, Column, Integer, DateTime)
 from datetime import datetime
 import pandas as pd
 
@@ -17,43 +20,45 @@ def parse_boolean(value: Any) -> bool:
     return bool(value)
 from .models import ProcessedOrder, OrderLineItem, ConversionHistory, StoreMapping, ItemMapping, CustomerMapping
 from .connection import get_session
+from .schema import schema_capabilities
 
 class DatabaseService:
     """Service class for database operations"""
     
-    _case_qty_column_exists = None  # Cache for column existence check
+    # Process-wide mapping version counter. Every write to the store, item or
+    # customer mapping tables bumps it so in-memory mapping snapshots
+    # (see utils/mapping_cache.py) know when to reload.
+    _mapping_version = 0
+    _mapping_version_lock = threading.Lock()
+    
+    @classmethod
+    def get_mapping_version(cls) -> int:
+        """Return the current mapping version counter"""
+        return cls._mapping_version
+    
+    @classmethod
+    def bump_mapping_version(cls) -> int:
+        """Mark all cached mapping snapshots as stale. Call after any mapping write."""
+        with cls._mapping_version_lock:
+            cls._mapping_version += 1
+            return cls._mapping_version
     
     @staticmethod
     def _check_case_qty_column_exists() -> bool:
-        """Check if case_qty column exists in item_mappings table.
-        Uses a fresh connection to avoid transaction state issues.
-        Only caches True results. False results are NOT cached so
-        the check is retried (the column may be added by a migration).
-        """
-        if DatabaseService._case_qty_column_exists is True:
-            return True
-        
-        try:
-            from .connection import get_database_engine
-            engine = get_database_engine()
-            
-            with engine.connect() as conn:
-                from sqlalchemy import text
-                result = conn.execute(text("""
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = 'item_mappings' 
-                    AND column_name = 'case_qty'
-                """))
-                exists = result.fetchone() is not None
-                if exists:
-                    # Only cache True - once the column exists it won't disappear
-                    DatabaseService._case_qty_column_exists = True
-                return exists
-        except Exception as e:
-            print(f"DEBUG: Could not check case_qty column existence: {e}")
-            # Don't cache failures - retry next time
-            return False
+        """Check if case_qty column exists in item_mappings table (answered from the schema registry)"""
+        return schema_capabilities.has_column('item_mappings', 'case_qty')
+    
+    @staticmethod
+    def _item_mapping_query(session):
+        """ItemMapping query that only selects the columns present in the database"""
+        return session.query(ItemMapping).options(*schema_capabilities.load_options(ItemMapping))
+    
+    @staticmethod
+    def _mapped_description(mapping) -> str:
+        """mapped_description of an ItemMapping, '' if empty or the column is missing"""
+        if not schema_capabilities.has_column('item_mappings', 'mapped_description'):
+            return ''
+        return str(mapping.mapped_description) if mapping.mapped_description else ''
     
     @staticmethod
     def _safe_get_item_mapping_attr(mapping, attr_name: str, default=None):
@@ -68,33 +73,11 @@ class DatabaseService:
     
     def _safe_query_item_mapping(self, session, source: str = None, raw_item: str = None, key_type: str = None, active: bool = None):
         """
-        Safely query a single ItemMapping, handling missing case_qty column gracefully.
+        Safely query a single ItemMapping, handling missing optional columns gracefully.
         Returns the first matching ItemMapping or None.
-        Checks column existence BEFORE querying to avoid transaction abort.
+        Missing columns are excluded up front (see database/schema.py) to avoid transaction abort.
         """
-        from sqlalchemy.orm import load_only
-        from sqlalchemy import and_
-        
-        # Check if case_qty column exists BEFORE querying
-        if not self._check_case_qty_column_exists():
-            # Column doesn't exist, use load_only to exclude it
-            query = session.query(ItemMapping).options(load_only(
-                ItemMapping.id,
-                ItemMapping.source,
-                ItemMapping.raw_item,
-                ItemMapping.mapped_item,
-                ItemMapping.key_type,
-                ItemMapping.priority,
-                ItemMapping.active,
-                ItemMapping.vendor,
-                ItemMapping.mapped_description,
-                ItemMapping.notes,
-                ItemMapping.created_at,
-                ItemMapping.updated_at
-            ))
-        else:
-            # Column exists, use normal query
-            query = session.query(ItemMapping)
+        query = self._item_mapping_query(session)
         
         # Build filter conditions
         filters = []
@@ -115,7 +98,7 @@ class DatabaseService:
     @staticmethod
     def _safe_query_item_mappings(session, source: str, **filters):
         """
-        Safely query ItemMapping, handling missing case_qty column gracefully
+        Safely query ItemMapping, handling missing optional columns gracefully
         
         Args:
             session: SQLAlchemy session
@@ -125,37 +108,7 @@ class DatabaseService:
         Returns:
             List of ItemMapping objects
         """
-        try:
-            # Try normal query first
-            query = session.query(ItemMapping).filter_by(source=source, **filters)
-            return query.all()
-        except Exception as e:
-            # If query fails due to missing case_qty column, use load_only to exclude it
-            if 'case_qty' in str(e).lower() or 'does not exist' in str(e).lower():
-                try:
-                    from sqlalchemy.orm import load_only
-                    # Query without case_qty column
-                    query = session.query(ItemMapping).options(load_only(
-                        ItemMapping.id,
-                        ItemMapping.source,
-                        ItemMapping.raw_item,
-                        ItemMapping.mapped_item,
-                        ItemMapping.key_type,
-                        ItemMapping.priority,
-                        ItemMapping.active,
-                        ItemMapping.vendor,
-                        ItemMapping.mapped_description,
-                        ItemMapping.notes,
-                        ItemMapping.created_at,
-                        ItemMapping.updated_at
-                    )).filter_by(source=source, **filters)
-                    return query.all()
-                except Exception as e2:
-                    print(f"DEBUG: Error querying ItemMapping even with load_only: {e2}")
-                    return []
-            else:
-                # Re-raise if it's a different error
-                raise
+        return DatabaseService._item_mapping_query(session).filter_by(source=source, **filters).all()
     
     @staticmethod
     def normalize_source_name(source: str) -> str:
@@ -199,6 +152,10 @@ class DatabaseService:
                 candidate_sources.update({str(source).strip(), str(source).strip().lower()})
         candidate_sources.discard('')
         
+        if not schema_capabilities.has_table('customer_mappings'):
+            # Nowhere to migrate to yet; leave the legacy rows in place
+            return stats
+        
         try:
             with get_session() as session:
                 query = session.query(StoreMapping).filter(StoreMapping.store_type == 'customer')
@@ -245,6 +202,7 @@ class DatabaseService:
                 
                 if legacy_mappings:
                     session.commit()
+                    self.bump_mapping_version()
         except Exception:
             # If migration fails we don't want to block the UI; just return stats so caller can log if needed.
             pass
@@ -261,8 +219,30 @@ class DatabaseService:
     ItemMapping = ItemMapping
     CustomerMapping = CustomerMapping
     
-    def save_processed_orders(self, orders_data: List[Dict[str, Any]], source: str, filename: str) -> bool:
-        """Save processed orders to database"""
+    def save_processed_orders(self, orders_data: List[Dict[str, Any]], source: str, filename: str,
+                              content_hash: Optional[str] = None,
+                              xoro_rows: Optional[List[Dict[str, Any]]] = None) -> bool:
+        """
+        Save processed orders to database
+        
+        Orders, line items and the ConversionHistory record are written in one
+        transaction with a fixed number of statements: one INSERT ... RETURNING
+        for the orders and one executemany for the line items.
+        
+        Args:
+            orders_data: Parsed order lines
+            source: Source name
+            filename: Original file name
+            content_hash: SHA-256 of the file, recorded so repeat uploads are recognized
+            xoro_rows: Xoro rows produced from the file, stored for reuse on repeat uploads
+        """
+        
+        # Older databases lack the columns until migrate_conversion_history_content_hash runs
+        history_extras = {}
+        if content_hash and schema_capabilities.has_column('conversion_history', 'content_hash'):
+            history_extras['content_hash'] = content_hash
+            if xoro_rows and schema_capabilities.has_column('conversion_history', 'xoro_output'):
+                history_extras['xoro_output'] = pd.DataFrame(xoro_rows).to_csv(index=False)
         
         try:
             with get_session() as session:
@@ -277,43 +257,57 @@ class DatabaseService:
                         }
                     orders_by_number[order_num]['line_items'].append(order_data)
                 
-                conversion_record = ConversionHistory(
+                # Core insert, so only the given columns are sent (older schemas may lack the optional ones)
+                session.execute(insert(ConversionHistory).values(
                     filename=filename,
                     source=source,
                     orders_count=len(orders_by_number),  # Count unique orders
                     line_items_count=len(orders_data),   # Total line items
-                    success=True
-                )
-                session.add(conversion_record)
+                    success=True,
+                    **history_extras
+                ))
                 
-                # Save orders and line items
+                # Build every row up front so a bad value fails before anything is sent
+                order_rows = []
+                line_item_groups = []
                 for order_num, order_group in orders_by_number.items():
                     order_info = order_group['order_info']
+                    order_rows.append({
+                        'order_number': order_num,
+                        'source': source,
+                        'customer_name': order_info.get('customer_name', 'UNKNOWN'),
+                        'raw_customer_name': order_info.get('raw_customer_name', ''),
+                        'order_date': self._parse_date(order_info.get('order_date')),
+                        'source_file': filename
+                    })
+                    line_item_groups.append([
+                        {
+                            'item_number': item_data.get('item_number', 'UNKNOWN'),
+                            'raw_item_number': item_data.get('raw_item_number', ''),
+                            'item_description': item_data.get('item_description', ''),
+                            'quantity': int(item_data.get('quantity', 1)),
+                            'unit_price': float(item_data.get('unit_price', 0.0)),
+                            'total_price': float(item_data.get('total_price', 0.0))
+                        }
+                        for item_data in order_group['line_items']
+                    ])
+                
+                if order_rows:
+                    # One INSERT ... RETURNING id for all orders; ids come back in row order
+                    order_ids = session.scalars(
+                        insert(ProcessedOrder).returning(ProcessedOrder.id, sort_by_parameter_order=True),
+                        order_rows
+                    ).all()
                     
-                    # Create order record
-                    order = ProcessedOrder(
-                        order_number=order_num,
-                        source=source,
-                        customer_name=order_info.get('customer_name', 'UNKNOWN'),
-                        raw_customer_name=order_info.get('raw_customer_name', ''),
-                        order_date=self._parse_date(order_info.get('order_date')),
-                        source_file=filename
-                    )
-                    session.add(order)
-                    session.flush()  # Get the order ID
+                    line_item_rows = []
+                    for order_id, line_items in zip(order_ids, line_item_groups):
+                        for line_item in line_items:
+                            line_item['order_id'] = order_id
+                            line_item_rows.append(line_item)
                     
-                    # Create line items
-                    for item_data in order_group['line_items']:
-                        line_item = OrderLineItem(
-                            order_id=order.id,
-                            item_number=item_data.get('item_number', 'UNKNOWN'),
-                            raw_item_number=item_data.get('raw_item_number', ''),
-                            item_description=item_data.get('item_description', ''),
-                            quantity=int(item_data.get('quantity', 1)),
-                            unit_price=float(item_data.get('unit_price', 0.0)),
-                            total_price=float(item_data.get('total_price', 0.0))
-                        )
-                        session.add(line_item)
+                    # One executemany for all line items (batched into multi-row INSERTs by the driver)
+                    if line_item_rows:
+                        session.execute(insert(OrderLineItem), line_item_rows)
                 
                 return True
                 
@@ -321,13 +315,13 @@ class DatabaseService:
             # Log conversion error
             try:
                 with get_session() as session:
-                    error_record = ConversionHistory(
+                    session.execute(insert(ConversionHistory).values(
                         filename=filename,
                         source=source,
                         success=False,
-                        error_message=str(e)
-                    )
-                    session.add(error_record)
+                        error_message=str(e),
+                        **{key: value for key, value in history_extras.items() if key == 'content_hash'}
+                    ))
             except:
                 pass
             
@@ -342,7 +336,9 @@ class DatabaseService:
         """Get recent conversion history"""
         
         with get_session() as session:
+            # The stored Xoro output is only needed when a conversion is reused
             records = session.query(ConversionHistory)\
+                           .options(load_only(*self._conversion_summary_columns()))\
                            .order_by(ConversionHistory.conversion_date.desc())\
                            .limit(limit)\
                            .all()
@@ -358,41 +354,161 @@ class DatabaseService:
                 'error_message': record.error_message
             } for record in records]
     
+    @staticmethod
+    def _conversion_summary_columns() -> list:
+        """ConversionHistory columns other than xoro_output that the database has"""
+        return [
+            getattr(ConversionHistory, column.name) for column in ConversionHistory.__table__.columns
+            if column.name != 'xoro_output' and schema_capabilities.has_column('conversion_history', column.name)
+        ] or [ConversionHistory.id]
+    
+    def find_previous_conversions(self, content_hashes: List[str], source: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Find earlier successful conversions of the same file contents
+        
+        One indexed lookup for the whole upload, cheap enough to run before
+        anything is parsed.
+        
+        Args:
+            content_hashes: SHA-256 digests of the uploaded files
+            source: Source name the files are being processed as
+            
+        Returns:
+            Content hash -> most recent matching conversion (id, filename,
+            conversion_date, orders_count, line_items_count, has_output).
+            Empty if none match or the database has no content hashes yet.
+        """
+        hashes = sorted({content_hash for content_hash in content_hashes if content_hash})
+        if not hashes or not schema_capabilities.has_column('conversion_history', 'content_hash'):
+            return {}
+        
+        has_output_column = schema_capabilities.has_column('conversion_history', 'xoro_output')
+        has_output = ConversionHistory.xoro_output.isnot(None) if has_output_column else literal(False)
+        
+        try:
+            with get_session() as session:
+                rows = session.execute(
+                    select(
+                        ConversionHistory.id,
+                        ConversionHistory.content_hash,
+                        ConversionHistory.filename,
+                        ConversionHistory.conversion_date,
+                        ConversionHistory.orders_count,
+                        ConversionHistory.line_items_count,
+                        has_output.label('has_output')
+                    )
+                    .where(
+                        ConversionHistory.content_hash.in_(hashes),
+                        ConversionHistory.source == source,
+                        ConversionHistory.success == True
+                    )
+                    .order_by(ConversionHistory.conversion_date.desc(), ConversionHistory.id.desc())
+                ).all()
+        except Exception as e:
+            print(f"DEBUG: Previous conversion lookup failed: {e}")
+            return {}
+        
+        previous = {}
+        for row in rows:
+            # Newest first, so the first row per hash wins
+            if row.content_hash not in previous:
+                previous[row.content_hash] = {
+                    'id': row.id,
+                    'filename': row.filename,
+                    'conversion_date': row.conversion_date,
+                    'orders_count': row.orders_count,
+                    'line_items_count': row.line_items_count,
+                    'has_output': bool(row.has_output)
+                }
+        return previous
+    
+    def get_conversion_output(self, conversion_id: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Xoro rows stored with a conversion
+        
+        Returns:
+            The rows (values as strings, as read back from the stored CSV), or
+            None if the conversion has no stored output
+        """
+        if not schema_capabilities.has_column('conversion_history', 'xoro_output'):
+            return None
+        
+        with get_session() as session:
+            xoro_output = session.execute(
+                select(ConversionHistory.xoro_output).where(ConversionHistory.id == conversion_id)
+            ).scalar()
+        if not xoro_output:
+            return None
+        return pd.read_csv(io.StringIO(xoro_output), dtype=str, keep_default_na=False).to_dict('records')
+    
+    @staticmethod
+    def _processed_order_to_dict(order: ProcessedOrder) -> Dict[str, Any]:
+        """Convert a ProcessedOrder (with line items loaded) to a plain dictionary"""
+        return {
+            'id': order.id,
+            'order_number': order.order_number,
+            'source': order.source,
+            'customer_name': order.customer_name,
+            'raw_customer_name': order.raw_customer_name,
+            'order_date': order.order_date,
+            'processed_at': order.processed_at,
+            'source_file': order.source_file,
+            'line_items': [{
+                'id': item.id,
+                'item_number': item.item_number,
+                'raw_item_number': item.raw_item_number,
+                'item_description': item.item_description,
+                'quantity': item.quantity,
+                'unit_price': item.unit_price,
+                'total_price': item.total_price
+            } for item in order.line_items]
+        }
+    
     def get_processed_orders(self, source: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
         """Get processed orders with line items"""
         
+        orders, _ = self.get_processed_orders_page(source=source, page_size=limit)
+        return orders
+    
+    def get_processed_orders_page(self, source: Optional[str] = None, page_size: int = 50,
+                                  cursor: Optional[Tuple[datetime, int]] = None) -> Tuple[List[Dict[str, Any]], Optional[Tuple[datetime, int]]]:
+        """
+        Get one page of processed orders (newest first) with their line items
+        
+        Pages are addressed by a (processed_at, id) keyset cursor rather than an
+        offset, so every page costs the same no matter how deep the history is.
+        Line items for the whole page are loaded with one extra SELECT ... IN query.
+        
+        Args:
+            source: Only return orders from this source (None for all)
+            page_size: Maximum number of orders to return
+            cursor: The next_cursor returned for the previous page (None for the first page)
+            
+        Returns:
+            Tuple of (orders, next_cursor); next_cursor is None on the last page
+        """
+        
         with get_session() as session:
-            query = session.query(ProcessedOrder)
+            query = session.query(ProcessedOrder).options(selectinload(ProcessedOrder.line_items))
             
             if source:
                 query = query.filter(ProcessedOrder.source == source)
             
-            orders = query.order_by(ProcessedOrder.processed_at.desc()).limit(limit).all()
+            if cursor is not None:
+                cursor_processed_at, cursor_id = cursor
+                query = query.filter(tuple_(ProcessedOrder.processed_at, ProcessedOrder.id) < (cursor_processed_at, cursor_id))
             
-            result = []
-            for order in orders:
-                order_dict = {
-                    'id': order.id,
-                    'order_number': order.order_number,
-                    'source': order.source,
-                    'customer_name': order.customer_name,
-                    'raw_customer_name': order.raw_customer_name,
-                    'order_date': order.order_date,
-                    'processed_at': order.processed_at,
-                    'source_file': order.source_file,
-                    'line_items': [{
-                        'id': item.id,
-                        'item_number': item.item_number,
-                        'raw_item_number': item.raw_item_number,
-                        'item_description': item.item_description,
-                        'quantity': item.quantity,
-                        'unit_price': item.unit_price,
-                        'total_price': item.total_price
-                    } for item in order.line_items]
-                }
-                result.append(order_dict)
+            # Fetch one extra row to know whether another page follows
+            orders = query.order_by(ProcessedOrder.processed_at.desc(), ProcessedOrder.id.desc())\
+                          .limit(page_size + 1)\
+                          .all()
             
-            return result
+            next_cursor = None
+            if len(orders) > page_size:
+                orders = orders[:page_size]
+                next_cursor = (orders[-1].processed_at, orders[-1].id)
+            
+            return [self._processed_order_to_dict(order) for order in orders], next_cursor
     
     def save_store_mapping(self, source: str, raw_name: str, mapped_name: str) -> bool:
         """Save or update store mapping"""
@@ -414,8 +530,9 @@ class DatabaseService:
                         mapped_store_name=mapped_name
                     )
                     session.add(mapping)
-                
-                return True
+            
+            self.bump_mapping_version()
+            return True
                 
         except Exception:
             return False
@@ -440,8 +557,9 @@ class DatabaseService:
                         mapped_item=mapped_item
                     )
                     session.add(mapping)
-                
-                return True
+            
+            self.bump_mapping_version()
+            return True
                 
         except Exception:
             return False
@@ -458,7 +576,22 @@ class DatabaseService:
             return {str(mapping.raw_store_id): str(mapping.mapped_store_name) for mapping in mappings}
     
     def get_customer_mappings(self, source: str) -> Dict[str, str]:
-        """Get all customer mappings for a source"""
+        """Get all customer mappings for a source ({} if the query fails)"""
+        
+        try:
+            return self.load_customer_mappings(source)
+        except Exception as e:
+            # Return empty dict if query fails (e.g., table doesn't exist yet)
+            print(f"DEBUG: Error in get_customer_mappings for {source}: {e}")
+            return {}
+    
+    def load_customer_mappings(self, source: str) -> Dict[str, str]:
+        """
+        Get all customer mappings for a source, raising on database errors
+        
+        Used by the mapping snapshot cache, which must not cache an empty
+        table for a query that failed (see get_customer_mappings).
+        """
         
         def _normalize_key(key: str) -> str:
             """Normalize key by removing .0 suffix from numeric strings"""
@@ -468,84 +601,74 @@ class DatabaseService:
                 return key_str[:-2]
             return key_str
         
-        try:
-            # Normalize source name (e.g., "Whole Foods" -> "wholefoods", "UNFI East" -> "unfi_east")
-            source_lower = source.lower().strip()
-            # Handle special cases first
-            if source_lower in ['whole foods', 'whole_foods']:
-                normalized_source = 'wholefoods'
-            elif source_lower in ['unfi east', 'unfi_east']:
-                normalized_source = 'unfi_east'
-            elif source_lower in ['unfi west', 'unfi_west']:
-                normalized_source = 'unfi_west'
-            elif source_lower in ['kehe', 'kehe - sps', 'kehe_sps', 'kehe___sps']:
-                normalized_source = 'kehe'
-            else:
-                # General normalization: replace spaces and hyphens with underscores
-                normalized_source = source_lower.replace(' ', '_').replace('-', '_')
-            
-            # For UNFI East, also try alternative source name formats that might exist in production
-            candidate_sources = [normalized_source]
-            if normalized_source == 'unfi_east':
-                candidate_sources.extend(['UNFI East', 'unfi east', 'UNFI_EAST', 'Unfi East'])
+        # Normalize source name (e.g., "Whole Foods" -> "wholefoods", "UNFI East" -> "unfi_east")
+        source_lower = source.lower().strip()
+        # Handle special cases first
+        if source_lower in ['whole foods', 'whole_foods']:
+            normalized_source = 'wholefoods'
+        elif source_lower in ['unfi east', 'unfi_east']:
+            normalized_source = 'unfi_east'
+        elif source_lower in ['unfi west', 'unfi_west']:
+            normalized_source = 'unfi_west'
+        elif source_lower in ['kehe', 'kehe - sps', 'kehe_sps', 'kehe___sps']:
+            normalized_source = 'kehe'
+        else:
+            # General normalization: replace spaces and hyphens with underscores
+            normalized_source = source_lower.replace(' ', '_').replace('-', '_')
+        
+        # For UNFI East, also try alternative source name formats that might exist in production
+        candidate_sources = [normalized_source]
+        if normalized_source == 'unfi_east':
+            candidate_sources.extend(['UNFI East', 'unfi east', 'UNFI_EAST', 'Unfi East'])
+        
+        mapping_dict = {}
+        
+        with get_session() as session:
+            # Try CustomerMapping table first with all candidate source names
+            # (skipped on databases that predate the table, which would abort the transaction)
+            mappings = []
+            if schema_capabilities.has_table('customer_mappings'):
+                for candidate_source in candidate_sources:
+                    found_mappings = session.query(CustomerMapping)\
+                                         .filter_by(source=candidate_source, active=True)\
+                                         .order_by(CustomerMapping.priority.asc())\
+                                         .all()
+                    if found_mappings:
+                        mappings = found_mappings
+                        print(f"DEBUG: Found {len(mappings)} customer mappings with source='{candidate_source}'")
+                        break
             
-            mapping_dict = {}
+            # Normalize keys to remove .0 suffixes
+            for mapping in mappings:
+                normalized_key = _normalize_key(mapping.raw_customer_id)
+                mapping_dict[normalized_key] = str(mapping.mapped_customer_name)
             
-            with get_session() as session:
-                # Try CustomerMapping table first with all candidate source names
-                try:
-                    mappings = []
-                    for candidate_source in candidate_sources:
-                        found_mappings = session.query(CustomerMapping)\
-                                             .filter_by(source=candidate_source, active=True)\
-                                             .order_by(CustomerMapping.priority.asc())\
-                                             .all()
-                        if found_mappings:
-                            mappings = found_mappings
-                            print(f"DEBUG: Found {len(mappings)} customer mappings with source='{candidate_source}'")
-                            break
-                    
-                    # Normalize keys to remove .0 suffixes
-                    for mapping in mappings:
-                        normalized_key = _normalize_key(mapping.raw_customer_id)
-                        mapping_dict[normalized_key] = str(mapping.mapped_customer_name)
-                except Exception as e:
-                    print(f"DEBUG: CustomerMapping table query failed for {source}: {e}")
-                    mapping_dict = {}
+            # Fallback to StoreMapping table with store_type='customer' if CustomerMapping is empty or doesn't exist
+            # NOTE: This should not be used for new data - customer mappings should be in CustomerMapping table
+            # This is only for legacy data migration
+            if not mapping_dict:
+                store_mappings = []
+                for candidate_source in candidate_sources:
+                    found_store_mappings = session.query(StoreMapping)\
+                                               .filter_by(source=candidate_source)\
+                                               .filter(StoreMapping.store_type == 'customer')\
+                                               .all()
+                    if found_store_mappings:
+                        store_mappings = found_store_mappings
+                        print(f"DEBUG: Found {len(store_mappings)} legacy customer mappings in StoreMapping table with source='{candidate_source}'")
+                        break
                 
-                # Fallback to StoreMapping table with store_type='customer' if CustomerMapping is empty or doesn't exist
-                # NOTE: This should not be used for new data - customer mappings should be in CustomerMapping table
-                # This is only for legacy data migration
-                if not mapping_dict:
-                    try:
-                        store_mappings = []
-                        for candidate_source in candidate_sources:
-                            found_store_mappings = session.query(StoreMapping)\
-                                                       .filter_by(source=candidate_source)\
-                                                       .filter(StoreMapping.store_type == 'customer')\
-                                                       .all()
-                            if found_store_mappings:
-                                store_mappings = found_store_mappings
-                                print(f"DEBUG: Found {len(store_mappings)} legacy customer mappings in StoreMapping table with source='{candidate_source}'")
-                                break
-                        
-                        # Build mapping dict from StoreMapping (using raw_store_id as key)
-                        for mapping in store_mappings:
-                            raw_id = _normalize_key(mapping.raw_store_id)
-                            mapped_name = str(mapping.mapped_store_name).strip()
-                            if raw_id and mapped_name:
-                                mapping_dict[raw_id] = mapped_name
-                        
-                        if store_mappings:
-                            print(f"DEBUG: WARNING - Using legacy StoreMapping table for customer mappings. Consider migrating to CustomerMapping table.")
-                    except Exception as e:
-                        print(f"DEBUG: StoreMapping fallback query failed for {source}: {e}")
+                # Build mapping dict from StoreMapping (using raw_store_id as key)
+                for mapping in store_mappings:
+                    raw_id = _normalize_key(mapping.raw_store_id)
+                    mapped_name = str(mapping.mapped_store_name).strip()
+                    if raw_id and mapped_name:
+                        mapping_dict[raw_id] = mapped_name
                 
-                return mapping_dict
-        except Exception as e:
-            # Return empty dict if query fails (e.g., table doesn't exist yet)
-            print(f"DEBUG: Error in get_customer_mappings for {source}: {e}")
-            return {}
+                if store_mappings:
+                    print(f"DEBUG: WARNING - Using legacy StoreMapping table for customer mappings. Consider migrating to CustomerMapping table.")
+            
+            return mapping_dict
     
     def get_item_mappings(self, source: str) -> Dict[str, str]:
         """Get all item mappings for a source"""
@@ -566,31 +689,10 @@ class DatabaseService:
             normalized_source = source_lower.replace(' ', '_').replace('-', '_')
         
         with get_session() as session:
-            # Use safe query that handles missing case_qty column
-            from sqlalchemy.orm import load_only
-            
-            # Check if case_qty column exists BEFORE querying
-            if not self._check_case_qty_column_exists():
-                # Column doesn't exist, use load_only to exclude it
-                mappings = session.query(ItemMapping).options(load_only(
-                    ItemMapping.id,
-                    ItemMapping.source,
-                    ItemMapping.raw_item,
-                    ItemMapping.mapped_item,
-                    ItemMapping.key_type,
-                    ItemMapping.priority,
-                    ItemMapping.active,
-                    ItemMapping.vendor,
-                    ItemMapping.mapped_description,
-                    ItemMapping.notes,
-                    ItemMapping.created_at,
-                    ItemMapping.updated_at
-                )).filter_by(source=normalized_source).all()
-            else:
-                # Column exists, use normal query
-                mappings = session.query(ItemMapping)\
-                                 .filter_by(source=normalized_source)\
-                                 .all()
+            # Only select columns that exist (older databases lack case_qty etc.)
+            mappings = self._item_mapping_query(session)\
+                           .filter_by(source=normalized_source)\
+                           .all()
             
             # Normalize keys to remove .0 suffixes
             result = {}
@@ -635,31 +737,10 @@ class DatabaseService:
                 normalized_source = source_lower.replace(' ', '_').replace('-', '_')
             
             with get_session() as session:
-                # Use safe query that handles missing case_qty column
-                from sqlalchemy.orm import load_only
-                
-                # Check if case_qty column exists BEFORE querying
-                if not self._check_case_qty_column_exists():
-                    # Column doesn't exist, use load_only to exclude it
-                    mappings = session.query(ItemMapping).options(load_only(
-                        ItemMapping.id,
-                        ItemMapping.source,
-                        ItemMapping.raw_item,
-                        ItemMapping.mapped_item,
-                        ItemMapping.key_type,
-                        ItemMapping.priority,
-                        ItemMapping.active,
-                        ItemMapping.vendor,
-                        ItemMapping.mapped_description,
-                        ItemMapping.notes,
-                        ItemMapping.created_at,
-                        ItemMapping.updated_at
-                    )).filter_by(source=normalized_source).all()
-                else:
-                    # Column exists, use normal query
-                    mappings = session.query(ItemMapping)\
-                                     .filter_by(source=normalized_source)\
-                                     .all()
+                # Only select columns that exist (older databases lack case_qty etc.)
+                mappings = self._item_mapping_query(session)\
+                               .filter_by(source=normalized_source)\
+                               .all()
                 
                 result = {}
                 for mapping in mappings:
@@ -667,7 +748,7 @@ class DatabaseService:
                     normalized_key = _normalize_item_key(mapping.raw_item)
                     result[normalized_key] = {
                         'mapped_item': str(mapping.mapped_item),
-                        'mapped_description': str(mapping.mapped_description) if mapping.mapped_description else ''
+                        'mapped_description': self._mapped_description(mapping)
                     }
                 
                 return result
@@ -701,7 +782,7 @@ class DatabaseService:
                 if mapping:
                     return {
                         'mapped_item': str(mapping.mapped_item),
-                        'mapped_description': str(mapping.mapped_description) if mapping.mapped_description else ''
+                        'mapped_description': self._mapped_description(mapping)
                     }
                 
                 return None
@@ -739,9 +820,7 @@ class DatabaseService:
             
             with get_session() as session:
                 # Use safe query method that checks column existence BEFORE querying
-                # Create a temporary db_service instance to use the safe query method
-                temp_db_service = DatabaseService()
-                mapping = temp_db_service._safe_query_item_mapping(
+                mapping = self._safe_query_item_mapping(
                     session,
                     source=normalized_source,
                     raw_item=str(raw_item).strip()
@@ -750,7 +829,7 @@ class DatabaseService:
                 if mapping:
                     result = {
                         'mapped_item': str(mapping.mapped_item),
-                        'mapped_description': str(mapping.mapped_description) if mapping.mapped_description else ''
+                        'mapped_description': self._mapped_description(mapping)
                     }
                     # Add case_qty if available and column exists
                     if self._check_case_qty_column_exists():
@@ -778,6 +857,7 @@ class DatabaseService:
                 if mapping:
                     session.delete(mapping)
                     session.commit()
+                    self.bump_mapping_version()
                     return True
                 return False
                 
@@ -796,6 +876,7 @@ class DatabaseService:
                 if mapping:
                     session.delete(mapping)
                     session.commit()
+                    self.bump_mapping_version()
                     return True
                 return False
                 
@@ -858,6 +939,123 @@ class DatabaseService:
             
             return result
     
+    @staticmethod
+    def _dedupe_mapping_rows(rows: List[Dict[str, Any]], key_columns: List[str]) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Collapse rows that share a key, the last occurrence winning (as if applied in order)
+        
+        Returns:
+            Tuple of (unique rows in first-seen order, number of rows collapsed)
+        """
+        unique_rows = {}
+        for row in rows:
+            unique_rows[tuple(row[column] for column in key_columns)] = row
+        return list(unique_rows.values()), len(rows) - len(unique_rows)
+    
+    @staticmethod
+    def _stage_mapping_rows(conn, model, rows: List[Dict[str, Any]], key_columns: List[str],
+                            value_columns: List[str], target_filter=None) -> Table:
+        """
+        Load the rows into a temporary staging table and resolve the existing mapping each row updates
+        
+        Every staged row gets target_id: the existing mapping it will update (the
+        active one if there is one, otherwise the oldest), or NULL for new mappings.
+        Targets are resolved in the database with one UPDATE joining the staging
+        table to the mapping table on the key columns. The staging table lives in
+        the caller's transaction and must be dropped with staging.drop(conn)
+        before committing.
+        
+        Args:
+            conn: Connection of the upsert transaction
+            model: Mapping model class (ItemMapping, StoreMapping, CustomerMapping)
+            rows: Validated rows (unique per key) with key, value and row_index entries
+            key_columns: Columns identifying a mapping, starting with 'source'
+            value_columns: Columns written by the upsert
+            target_filter: Optional extra condition on existing rows that may be updated
+            
+        Returns:
+            The staging Table
+        """
+        target = model.__table__
+        
+        staging = Table(
+            f"staging_{target.name}",
+            MetaData(),
+            Column('row_index', Integer),
+            Column('target_id', Integer, index=True),
+            *[Column(name, target.c[name].type) for name in key_columns + value_columns],
+            prefixes=['TEMPORARY']
+        )
+        # A rolled-back upsert can leave the table behind on drivers that
+        # autocommit DDL (pysqlite); PostgreSQL rolls it back with the transaction
+        staging.drop(conn, checkfirst=True)
+        staging.create(conn)
+        conn.execute(insert(staging), [
+            {name: row.get(name) for name in ['row_index'] + key_columns + value_columns}
+            for row in rows
+        ])
+        
+        existing_id = select(target.c.id)\
+            .where(*[target.c[name] == staging.c[name] for name in key_columns])\
+            .order_by(case((target.c.active == True, 0), else_=1), target.c.id)\
+            .limit(1)
+        if target_filter is not None:
+            existing_id = existing_id.where(target_filter)
+        conn.execute(update(staging).values(target_id=existing_id.scalar_subquery()))
+        return staging
+    
+    @staticmethod
+    def _merge_staged_mappings(conn, model, staging: Table, key_columns: List[str], value_columns: List[str],
+                               keep_existing_when_null: tuple = ()) -> Tuple[int, int]:
+        """
+        Apply staged rows with one set-based UPDATE and one INSERT ... SELECT
+        
+        Args:
+            conn: Connection of the upsert transaction
+            model: Mapping model class
+            staging: Table returned by _stage_mapping_rows
+            key_columns: Columns identifying a mapping
+            value_columns: Columns written by the upsert
+            keep_existing_when_null: Value columns that keep their current value when the staged value is NULL
+            
+        Returns:
+            Tuple of (added, updated)
+        """
+        target = model.__table__
+        now = datetime.utcnow()
+        
+        updated = conn.execute(select(func.count()).where(staging.c.target_id.is_not(None))).scalar()
+        added = conn.execute(select(func.count()).where(staging.c.target_id.is_(None))).scalar()
+        
+        if updated:
+            values = {
+                name: func.coalesce(staging.c[name], target.c[name]) if name in keep_existing_when_null else staging.c[name]
+                for name in value_columns
+            }
+            values['updated_at'] = now
+            conn.execute(update(target).where(target.c.id == staging.c.target_id).values(values))
+        
+        if added:
+            insert_columns = key_columns + value_columns
+            # Like an ORM insert, fall back to the column's scalar default for NULL values
+            insert_values = []
+            for name in insert_columns:
+                default = target.c[name].default
+                if default is not None and default.is_scalar:
+                    insert_values.append(func.coalesce(staging.c[name], literal(default.arg, target.c[name].type)))
+                else:
+                    insert_values.append(staging.c[name])
+            conn.execute(insert(target).from_select(
+                insert_columns + ['created_at', 'updated_at'],
+                select(
+                    *insert_values,
+                    literal(now, DateTime()),
+                    literal(now, DateTime())
+                ).where(staging.c.target_id.is_(None)).order_by(staging.c.row_index)
+            ))
+        
+        return added, updated
+    
     def bulk_upsert_store_mappings(self, mappings_data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Bulk insert or update store mappings with transaction safety"""
         
@@ -917,46 +1115,23 @@ class DatabaseService:
                     stats['errors'] += 1
                     stats['error_details'].append(f"Row {idx + 1}: Validation error - {str(e)}")
             
-            for data in validated_data:
-                try:
-                    # Filter by store_type != 'customer' to avoid overwriting customer mappings
-                    # This ensures store mappings and customer mappings remain separate
-                    existing = session.query(StoreMapping).filter(
-                        and_(
-                            StoreMapping.source == data['source'],
-                            StoreMapping.raw_store_id == data['raw_store_id'],
-                            StoreMapping.store_type != 'customer'  # Exclude customer mappings
-                        )
-                    ).first()
-                    
-                    if existing:
-                        existing.mapped_store_name = data['mapped_store_name']  # type: ignore
-                        existing.store_type = data['store_type']  # type: ignore
-                        existing.priority = data['priority']  # type: ignore
-                        existing.active = data['active']  # type: ignore
-                        existing.notes = data['notes']  # type: ignore
-                        existing.updated_at = datetime.utcnow()  # type: ignore
-                        stats['updated'] += 1
-                    else:
-                        new_mapping = StoreMapping(
-                            source=data['source'],
-                            raw_store_id=data['raw_store_id'],
-                            mapped_store_name=data['mapped_store_name'],
-                            store_type=data['store_type'],
-                            priority=data['priority'],
-                            active=data['active'],
-                            notes=data['notes']
-                        )
-                        session.add(new_mapping)
-                        stats['added'] += 1
-                        
-                except Exception as e:
-                    stats['errors'] += 1
-                    stats['error_details'].append(f"Row {data['row_index']}: Database error - {str(e)}")
-                    transaction.rollback()
-                    return stats
+            if validated_data:
+                key_columns = ['source', 'raw_store_id']
+                value_columns = ['mapped_store_name', 'store_type', 'priority', 'active', 'notes']
+                unique_rows, collapsed = self._dedupe_mapping_rows(validated_data, key_columns)
+                conn = session.connection()
+                # Legacy customer mappings kept in store_mappings are never overwritten
+                staging = self._stage_mapping_rows(
+                    conn, StoreMapping, unique_rows, key_columns, value_columns,
+                    target_filter=StoreMapping.__table__.c.store_type != 'customer'
+                )
+                added, updated = self._merge_staged_mappings(conn, StoreMapping, staging, key_columns, value_columns)
+                staging.drop(conn)
+                stats['added'] += added
+                stats['updated'] += updated + collapsed
             
             transaction.commit()
+            self.bump_mapping_version()
             return stats
                 
         except Exception as e:
@@ -970,6 +1145,10 @@ class DatabaseService:
     def bulk_upsert_customer_mappings(self, mappings_data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Bulk insert or update customer mappings with transaction safety"""
         
+        if not schema_capabilities.has_table('customer_mappings'):
+            return {'added': 0, 'updated': 0, 'errors': len(mappings_data),
+                    'error_details': ["customer_mappings table does not exist - run the database migration first"]}
+        
         session = get_session().__enter__()
         transaction = None
         
@@ -1004,7 +1183,7 @@ class DatabaseService:
                         'priority': priority,
                         'active': active,
                         'notes': mapping_data.get('notes', ''),
-                        'row_index': idx
+                        'row_index': idx + 1
                     })
                     
                 except Exception as e:
@@ -1012,42 +1191,19 @@ class DatabaseService:
                     stats['error_details'].append(f"Row {idx + 1}: Validation error - {str(e)}")
                     continue
             
-            # Process validated data
-            for data in validated_data:
-                try:
-                    existing = session.query(CustomerMapping).filter_by(
-                        source=data['source'],
-                        raw_customer_id=data['raw_customer_id']
-                    ).first()
-                    
-                    if existing:
-                        existing.mapped_customer_name = data['mapped_customer_name']
-                        existing.customer_type = data['customer_type']
-                        existing.priority = data['priority']
-                        existing.active = data['active']
-                        existing.notes = data['notes']
-                        existing.updated_at = datetime.utcnow()
-                        stats['updated'] += 1
-                    else:
-                        new_mapping = CustomerMapping(
-                            source=data['source'],
-                            raw_customer_id=data['raw_customer_id'],
-                            mapped_customer_name=data['mapped_customer_name'],
-                            customer_type=data['customer_type'],
-                            priority=data['priority'],
-                            active=data['active'],
-                            notes=data['notes']
-                        )
-                        session.add(new_mapping)
-                        stats['added'] += 1
-                        
-                except Exception as e:
-                    stats['errors'] += 1
-                    stats['error_details'].append(f"Row {data['row_index']}: Database error - {str(e)}")
-                    transaction.rollback()
-                    return stats
+            if validated_data:
+                key_columns = ['source', 'raw_customer_id']
+                value_columns = ['mapped_customer_name', 'customer_type', 'priority', 'active', 'notes']
+                unique_rows, collapsed = self._dedupe_mapping_rows(validated_data, key_columns)
+                conn = session.connection()
+                staging = self._stage_mapping_rows(conn, CustomerMapping, unique_rows, key_columns, value_columns)
+                added, updated = self._merge_staged_mappings(conn, CustomerMapping, staging, key_columns, value_columns)
+                staging.drop(conn)
+                stats['added'] += added
+                stats['updated'] += updated + collapsed
             
             transaction.commit()
+            self.bump_mapping_version()
             return stats
                 
         except Exception as e:
@@ -1158,125 +1314,59 @@ class DatabaseService:
                                 f"({constraint_key[0]}, {constraint_key[1]}, {constraint_key[2]})"
                             )
                             validated_data.remove(mapping)
+            
+            key_columns = ['source', 'key_type', 'raw_item']
+            value_columns = ['mapped_item', 'priority', 'active', 'vendor', 'mapped_description', 'notes']
+            if case_qty_column_exists:
+                value_columns.append('case_qty')
+            
+            staging = None
+            conn = session.connection()
+            if validated_data:
+                unique_rows, collapsed = self._dedupe_mapping_rows(validated_data, key_columns)
+                staging = self._stage_mapping_rows(conn, ItemMapping, unique_rows, key_columns, value_columns)
                 
-                # Check existing database for constraint violations
-                for data in [v for v in validated_data if v['active']]:
-                    # Use safe query that handles missing case_qty column
-                    existing_active = self._safe_query_item_mapping(
-                        session,
-                        source=data['source'],
-                        raw_item=data['raw_item'],
-                        key_type=data['key_type'],
-                        active=True
+                # Check existing database for constraint violations: an active row
+                # must not collide with an active mapping other than the one it updates
+                target = ItemMapping.__table__
+                conflicts = conn.execute(
+                    select(staging.c.row_index, staging.c.source, staging.c.key_type, staging.c.raw_item)
+                    .select_from(staging.join(target, and_(
+                        target.c.source == staging.c.source,
+                        target.c.key_type == staging.c.key_type,
+                        target.c.raw_item == staging.c.raw_item
+                    )))
+                    .where(staging.c.active == True, target.c.active == True)
+                    .where(or_(staging.c.target_id.is_(None), target.c.id != staging.c.target_id))
+                    .distinct()
+                    .order_by(staging.c.row_index)
+                ).fetchall()
+                for conflict in conflicts:
+                    stats['errors'] += 1
+                    stats['error_details'].append(
+                        f"Row {conflict.row_index}: Active mapping already exists for "
+                        f"({conflict.source}, {conflict.key_type}, {conflict.raw_item})"
                     )
-                    
-                    if existing_active:
-                        # Check if this would create a constraint violation
-                        # (i.e., updating a different mapping to be active)
-                        existing_for_this_row = self._safe_query_item_mapping(
-                            session,
-                            source=data['source'],
-                            raw_item=data['raw_item'],
-                            key_type=data['key_type']
-                        )
-                        
-                        if not existing_for_this_row:  # New mapping would conflict
-                            stats['errors'] += 1
-                            stats['error_details'].append(
-                                f"Row {data['row_index']}: Active mapping already exists for "
-                                f"({data['source']}, {data['key_type']}, {data['raw_item']})"
-                            )
-                            validated_data.remove(data)
             
             # If validation errors, rollback and return early
             if stats['errors'] > 0:
                 transaction.rollback()
                 return stats
             
-            # Phase 3: Apply all validated changes atomically
-            for data in validated_data:
-                try:
-                    # Check if mapping exists - use safe query that handles missing case_qty column
-                    existing = self._safe_query_item_mapping(
-                        session,
-                        source=data['source'],
-                        raw_item=data['raw_item'],
-                        key_type=data['key_type']
-                    )
-                    
-                    if existing:
-                        # Update existing mapping
-                        existing.mapped_item = data['mapped_item']  # type: ignore
-                        existing.priority = data['priority']  # type: ignore
-                        existing.active = data['active']  # type: ignore
-                        existing.vendor = data['vendor']  # type: ignore
-                        existing.mapped_description = data['mapped_description']  # type: ignore
-                        existing.notes = data['notes']  # type: ignore
-                        # Update case_qty if provided and column exists in database
-                        # Check case_qty_column_exists (not hasattr) because hasattr will always be True for model attributes
-                        if case_qty_column_exists and 'case_qty' in data:
-                            # Set case_qty value (can be None to clear it, or a float value)
-                            existing.case_qty = data['case_qty']  # type: ignore
-                        existing.updated_at = datetime.utcnow()  # type: ignore
-                        stats['updated'] += 1
-                    else:
-                        # Create new mapping
-                        # If case_qty column doesn't exist, use raw SQL to exclude it from INSERT
-                        if not case_qty_column_exists:
-                            from sqlalchemy import text
-                            
-                            # Use raw SQL INSERT to exclude case_qty column
-                            insert_sql = text("""
-                                INSERT INTO item_mappings 
-                                (source, raw_item, mapped_item, key_type, priority, active, vendor, mapped_description, notes, created_at, updated_at)
-                                VALUES 
-                                (:source, :raw_item, :mapped_item, :key_type, :priority, :active, :vendor, :mapped_description, :notes, :created_at, :updated_at)
-                            """)
-                            
-                            now = datetime.utcnow()
-                            session.execute(insert_sql, {
-                                'source': data['source'],
-                                'raw_item': data['raw_item'],
-                                'mapped_item': data['mapped_item'],
-                                'key_type': data['key_type'],
-                                'priority': data['priority'],
-                                'active': data['active'],
-                                'vendor': data['vendor'],
-                                'mapped_description': data['mapped_description'],
-                                'notes': data['notes'],
-                                'created_at': now,
-                                'updated_at': now
-                            })
-                            stats['added'] += 1
-                        else:
-                            # Column exists, use normal ORM insert
-                            mapping_kwargs = {
-                                'source': data['source'],
-                                'raw_item': data['raw_item'],
-                                'mapped_item': data['mapped_item'],
-                                'key_type': data['key_type'],
-                                'priority': data['priority'],
-                                'active': data['active'],
-                                'vendor': data['vendor'],
-                                'mapped_description': data['mapped_description'],
-                                'notes': data['notes']
-                            }
-                            # Add case_qty if provided
-                            if 'case_qty' in data and data['case_qty'] is not None:
-                                mapping_kwargs['case_qty'] = data['case_qty']
-                            
-                            new_mapping = ItemMapping(**mapping_kwargs)
-                            session.add(new_mapping)
-                            stats['added'] += 1
-                        
-                except Exception as e:
-                    stats['errors'] += 1
-                    stats['error_details'].append(f"Row {data['row_index']}: Database error - {str(e)}")
-                    transaction.rollback()
-                    return stats
+            # Phase 3: Apply all validated changes atomically (case_qty is only
+            # overwritten when a valid value was supplied)
+            if staging is not None:
+                added, updated = self._merge_staged_mappings(
+                    conn, ItemMapping, staging, key_columns, value_columns,
+                    keep_existing_when_null=('case_qty',)
+                )
+                staging.drop(conn)
+                stats['added'] += added
+                stats['updated'] += updated + collapsed
             
             # Commit transaction
             transaction.commit()
+            self.bump_mapping_version()
             return stats
                 
         except Exception as e:
@@ -1321,7 +1411,9 @@ class DatabaseService:
                     synchronize_session=False
                 )
                 session.commit()
-                return count
+            if count:
+                self.bump_mapping_version()
+            return count
         except Exception:
             return 0
     
@@ -1334,7 +1426,9 @@ class DatabaseService:
                     ItemMapping.id.in_(mapping_ids)
                 ).delete(synchronize_session=False)
                 session.commit()
-                return count
+            if count:
+                self.bump_mapping_version()
+            return count
         except Exception:
             return 0
     
@@ -1372,6 +1466,65 @@ class DatabaseService:
             
             return None
     
+    def resolve_item_numbers_bulk(self, lookup_attributes_list: List[Dict[str, str]], source: str) -> List[Optional[str]]:
+        """
+        Resolve many items at once with the same priority rules as resolve_item_number.
+        
+        All candidate (key_type, raw_item) pairs are fetched in a single query and the
+        key type priority (vendor_item, upc, ean, gtin, sku_alias) is applied in memory.
+        
+        Args:
+            lookup_attributes_list: One lookup_attributes dict per line item
+            source: Source system (e.g., 'kehe', 'wholefoods')
+            
+        Returns:
+            List aligned with lookup_attributes_list holding the mapped item or None
+        """
+        
+        key_priority = ['vendor_item', 'upc', 'ean', 'gtin', 'sku_alias']
+        
+        # Collect the distinct raw values per key type across all lines
+        wanted_pairs = set()
+        for lookup_attributes in lookup_attributes_list:
+            for key_type in key_priority:
+                if lookup_attributes and lookup_attributes.get(key_type):
+                    wanted_pairs.add((key_type, str(lookup_attributes[key_type]).strip()))
+        
+        if not wanted_pairs:
+            return [None] * len(lookup_attributes_list)
+        
+        wanted_types = sorted({key_type for key_type, _ in wanted_pairs})
+        wanted_values = sorted({raw_value for _, raw_value in wanted_pairs})
+        
+        found: Dict[tuple, str] = {}
+        with get_session() as session:
+            rows = session.query(ItemMapping.key_type, ItemMapping.raw_item, ItemMapping.mapped_item).filter(
+                and_(
+                    ItemMapping.source == source,
+                    ItemMapping.key_type.in_(wanted_types),
+                    ItemMapping.raw_item.in_(wanted_values),
+                    ItemMapping.active == True  # type: ignore
+                )
+            ).order_by(ItemMapping.priority.asc()).all()
+            
+            # Rows arrive in priority order, so the first row per key wins
+            for key_type, raw_item, mapped_item in rows:
+                pair = (key_type, raw_item)
+                if pair in wanted_pairs and pair not in found:
+                    found[pair] = str(mapped_item)
+        
+        results: List[Optional[str]] = []
+        for lookup_attributes in lookup_attributes_list:
+            resolved = None
+            for key_type in key_priority:
+                if lookup_attributes and lookup_attributes.get(key_type):
+                    resolved = found.get((key_type, str(lookup_attributes[key_type]).strip()))
+                    if resolved:
+                        break
+            results.append(resolved)
+        
+        return results
+    
     def _parse_date(self, date_str: str) -> Optional[datetime]:
         """Parse date string to datetime object"""
         
@@ -1386,4 +1539,17 @@ class DatabaseService:
             except ValueError:
                 continue
         
-        return None
\ No newline at end of file
+        return None
+
+
+_shared_db_service: Optional[DatabaseService] = None
+_shared_db_service_lock = threading.Lock()
+
+def get_shared_database_service() -> DatabaseService:
+    """Return the process-wide DatabaseService instance (created on first use)"""
+    global _shared_db_service
+    if _shared_db_service is None:
+        with _shared_db_service_lock:
+            if _shared_db_service is None:
+                _shared_db_service = DatabaseService()
+    return _shared_db_service
\ No newline at end of file
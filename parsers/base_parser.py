@@ -5,13 +5,21 @@ Base parser class for all order sources
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional
 import pandas as pd
-from utils.mapping_utils import MappingUtils
+from utils.mapping_utils import MappingUtils, get_shared_mapping_utils
 
 class BaseParser(ABC):
     """Base class for all order parsers"""
     
-    def __init__(self):
-        self.mapping_utils = MappingUtils()
+    # False for parsers that keep state between files (e.g. pairing uploads),
+    # which a batch must then parse one file at a time
+    supports_concurrent_parsing = True
+    
+    # Source key passed to extract_pdf_pages() by PDF parsers
+    pdf_source: Optional[str] = None
+    
+    def __init__(self, mapping_utils: Optional[MappingUtils] = None):
+        # Share one mapping provider per process unless one is injected
+        self.mapping_utils = mapping_utils or get_shared_mapping_utils()
     
     @abstractmethod
     def parse(self, file_content: bytes, file_extension: str, filename: str) -> Optional[List[Dict[str, Any]]]:
@@ -0,0 +1,157 @@
+"""
+Pluggable PDF text-extraction backends
+
+The PDF parsers' regexes were written against PyPDF2's text layout, so
+'pypdf2' stays the default. 'pdfium' (pypdfium2, in requirements.txt and the
+"pdfium" extra of pyproject.toml) is several times faster per page; its
+output is normalized to PyPDF2-style line endings, but its line grouping can
+differ, so enable it per source only after scripts/benchmark_pdf_backends.py
+reports equivalent parser output:
+
+    PDF_BACKEND=pdfium               # every PDF source
+    PDF_BACKEND_UNFI_EAST=pdfium     # one source (UNFI_EAST, ROSS, TJMAXX)
+
+Unknown or uninstalled backends fall back to PyPDF2.
+"""
+
+import io
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+from PyPDF2 import PdfReader
+
+try:
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+
+
+class PDFBackend(ABC):
+    """Interface of a text-extraction engine"""
+
+    name = ''
+
+    def is_available(self) -> bool:
+        """Whether the engine's library is installed"""
+        return True
+
+    @abstractmethod
+    def open(self, file_content: bytes):
+        """Open a PDF document; raises if the bytes are not a readable PDF"""
+        pass
+
+    def close(self, document) -> None:
+        """Release a document returned by open(); callers close it in a finally block"""
+        pass
+
+    @abstractmethod
+    def page_count(self, document) -> int:
+        """Number of pages of an open document"""
+        pass
+
+    @abstractmethod
+    def extract_page(self, document, page_num: int) -> str:
+        """Raw text of one page (0-based)"""
+        pass
+
+    def normalize(self, text: str) -> str:
+        """Adapt the engine's text layout to what the parsers' regexes expect"""
+        return text
+
+    def extract_pages(self, document, page_numbers) -> List[Optional[str]]:
+        """Extract the given pages, recording None for pages that fail"""
+        texts = []
+        for page_num in page_numbers:
+            try:
+                texts.append(self.normalize(self.extract_page(document, page_num)))
+            except Exception as page_error:
+                print(f"DEBUG: Warning - Could not extract text from page {page_num + 1}: {page_error}")
+                texts.append(None)
+        return texts
+
+
+class PyPDF2Backend(PDFBackend):
+    """Pure-Python PyPDF2 extraction (reference layout for all parsers)"""
+
+    name = 'pypdf2'
+
+    def open(self, file_content: bytes):
+        return PdfReader(io.BytesIO(file_content))
+
+    def page_count(self, document) -> int:
+        return len(document.pages)
+
+    def extract_page(self, document, page_num: int) -> str:
+        return document.pages[page_num].extract_text()
+
+
+class PdfiumBackend(PDFBackend):
+    """PDFium extraction through the pypdfium2 wheel"""
+
+    name = 'pdfium'
+
+    # PDFium is not thread-safe; serialize calls within a process
+    _lock = threading.RLock()
+
+    def is_available(self) -> bool:
+        return pypdfium2 is not None
+
+    def open(self, file_content: bytes):
+        with self._lock:
+            return pypdfium2.PdfDocument(file_content)
+
+    def close(self, document) -> None:
+        # Frees the native PDFium document instead of waiting for garbage collection
+        with self._lock:
+            document.close()
+
+    def page_count(self, document) -> int:
+        with self._lock:
+            return len(document)
+
+    def extract_page(self, document, page_num: int) -> str:
+        with self._lock:
+            page = document[page_num]
+            try:
+                text_page = page.get_textpage()
+                try:
+                    return text_page.get_text_range()
+                finally:
+                    text_page.close()
+            finally:
+                page.close()
+
+    def normalize(self, text: str) -> str:
+        # PDFium ends lines with CRLF; PyPDF2 (and every parser regex) uses LF
+        return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+PDF_BACKENDS: Dict[str, PDFBackend] = {
+    backend.name: backend for backend in (PyPDF2Backend(), PdfiumBackend())
+}
+DEFAULT_PDF_BACKEND = 'pypdf2'
+
+
+def get_pdf_backend(source: Optional[str] = None) -> PDFBackend:
+    """
+    Backend configured for an order source
+
+    Args:
+        source: Source key such as 'unfi_east', 'ross' or 'tjmaxx'
+
+    Returns:
+        The backend named by PDF_BACKEND_<SOURCE>, else PDF_BACKEND, else
+        PyPDF2. Unknown or uninstalled backends fall back to PyPDF2.
+    """
+    name = ''
+    if source:
+        name = os.getenv(f"PDF_BACKEND_{source.upper()}", '')
+    name = (name or os.getenv('PDF_BACKEND', '') or DEFAULT_PDF_BACKEND).strip().lower()
+
+    backend = PDF_BACKENDS.get(name)
+    if backend is None or not backend.is_available():
+        print(f"DEBUG: PDF backend '{name}' is not available, using {DEFAULT_PDF_BACKEND}")
+        return PDF_BACKENDS[DEFAULT_PDF_BACKEND]
+    return backend
@@ -0,0 +1,161 @@
+"""
+PDF text extraction shared by the PDF order parsers (UNFI East, ROSS, TJ Maxx)
+
+Pages are extracted serially by default. Setting PDF_PARALLEL_EXTRACTION=1
+fans the pages of large PDFs out to a bounded process pool; PDFs with fewer
+than PDF_PARALLEL_MIN_PAGES pages are always extracted serially so the pool
+overhead never slows down small files. The same setting lets a concurrent
+batch (utils/order_batch.py) decode each of its PDFs whole in the pool, so
+many small files are spread across cores instead of one.
+
+The extraction engine is chosen per source, see parsers/pdf_backends.py.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+from .pdf_backends import PDF_BACKENDS, PDFBackend, get_pdf_backend
+from utils.pdf_text_cache import pdf_text_cache, content_digest, PageTexts
+
+# Opt-in parallel extraction settings
+PDF_PARALLEL_EXTRACTION = os.getenv('PDF_PARALLEL_EXTRACTION', '').lower() in ('1', 'true', 'yes')
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', 8))
+PDF_PARALLEL_MAX_WORKERS = int(os.getenv('PDF_PARALLEL_MAX_WORKERS', min(4, os.cpu_count() or 1)))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _extract_page_range(backend_name: str, file_content: bytes, start: int, stop: int) -> List[Optional[str]]:
+    """Worker entry point: open the PDF in this process and extract pages [start, stop)"""
+    backend = PDF_BACKENDS[backend_name]
+    document = backend.open(file_content)
+    try:
+        return backend.extract_pages(document, range(start, stop))
+    finally:
+        backend.close(document)
+
+
+def _extract_all_pages(backend_name: str, file_content: bytes) -> List[Optional[str]]:
+    """Worker entry point: open the PDF in this process and extract every page"""
+    backend = PDF_BACKENDS[backend_name]
+    document = backend.open(file_content)
+    try:
+        return backend.extract_pages(document, range(backend.page_count(document)))
+    finally:
+        backend.close(document)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Shared process pool, created on first parallel extraction"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn avoids forking a multi-threaded (Streamlit) process
+                _pool = ProcessPoolExecutor(
+                    max_workers=PDF_PARALLEL_MAX_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+    return _pool
+
+
+def _extract_parallel(backend: PDFBackend, file_content: bytes, page_count: int) -> List[Optional[str]]:
+    """Extract contiguous page ranges in the pool and concatenate them in page order"""
+    workers = max(1, min(PDF_PARALLEL_MAX_WORKERS, page_count))
+    chunk = -(-page_count // workers)
+    pool = _get_pool()
+    futures = [
+        pool.submit(_extract_page_range, backend.name, file_content, start, min(start + chunk, page_count))
+        for start in range(0, page_count, chunk)
+    ]
+    texts = []
+    for future in futures:
+        texts.extend(future.result())
+    return texts
+
+
+def extract_pdf_pages(file_content: bytes, source: Optional[str] = None, parallel: Optional[bool] = None) -> PageTexts:
+    """
+    Extract the text of every page of a PDF, reusing cached results
+
+    Args:
+        file_content: Raw PDF bytes
+        source: Order source key used to pick the extraction backend
+        parallel: Use the process pool for large PDFs (defaults to PDF_PARALLEL_EXTRACTION)
+
+    Returns:
+        Tuple with one entry per page: the page text, or None if that page
+        could not be extracted. Raises if the file cannot be opened as a PDF
+        (such failures are not cached).
+    """
+    backend = get_pdf_backend(source)
+    key = f"{backend.name}-{content_digest(file_content)}"
+    pages = pdf_text_cache.get(key)
+    if pages is not None:
+        print(f"DEBUG: Using cached PDF text for {key[:20]} ({len(pages)} pages)")
+        return pages
+
+    document = backend.open(file_content)
+    try:
+        page_count = backend.page_count(document)
+
+        if parallel is None:
+            parallel = PDF_PARALLEL_EXTRACTION
+
+        extracted = None
+        if parallel and PDF_PARALLEL_MAX_WORKERS > 1 and page_count >= PDF_PARALLEL_MIN_PAGES:
+            try:
+                extracted = _extract_parallel(backend, file_content, page_count)
+            except Exception as e:
+                print(f"DEBUG: Parallel PDF extraction failed, extracting serially: {e}")
+
+        if extracted is None:
+            extracted = backend.extract_pages(document, range(page_count))
+    finally:
+        backend.close(document)
+
+    pages = tuple(extracted)
+    pdf_text_cache.put(key, pages)
+    return pages
+
+
+def extract_first_page_text(file_content: bytes) -> str:
+    """
+    Extract the text of the first page only, to classify a PDF without
+    decoding all of it (see parsers/source_detection.py)
+
+    Served from the cache when the whole PDF was extracted before. Raises if
+    the file cannot be opened as a PDF.
+    """
+    backend = get_pdf_backend()
+    pages = pdf_text_cache.get(f"{backend.name}-{content_digest(file_content)}")
+    if pages is None:
+        document = backend.open(file_content)
+        try:
+            pages = backend.extract_pages(document, range(min(1, backend.page_count(document))))
+        finally:
+            backend.close(document)
+    return (pages[0] if pages else None) or ''
+
+
+def prefetch_pdf_pages(file_content: bytes, source: Optional[str] = None) -> None:
+    """
+    Extract a whole PDF in the process pool and cache the page texts, so the
+    parser's own extract_pdf_pages() call is served from the cache
+
+    Meant for threads that parse several files concurrently. Failures are
+    only logged; the parser then extracts (and reports errors) as usual.
+    """
+    backend = get_pdf_backend(source)
+    key = f"{backend.name}-{content_digest(file_content)}"
+    if pdf_text_cache.get(key) is not None:
+        return
+    try:
+        pages = tuple(_get_pool().submit(_extract_all_pages, backend.name, file_content).result())
+    except Exception as e:
+        print(f"DEBUG: PDF prefetch failed for {key[:20]}, the parser will extract it: {e}")
+        return
+    pdf_text_cache.put(key, pages)
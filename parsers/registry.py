@@ -0,0 +1,94 @@
+"""
+Registry of the supported order sources and their parsers
+
+One place that knows, for every source, its key (as used in URLs, mapping
+folders and the database), its display name and the file types its parser
+reads. The Streamlit app, the batch CLI and the folder watcher build their
+parsers from here instead of wiring each parser class by hand.
+"""
+
+from typing import Dict, List, Optional
+from .base_parser import BaseParser
+from .wholefoods_parser import WholeFoodsParser
+from .unfi_west_parser import UNFIWestParser
+from .unfi_east_parser import UNFIEastParser
+from .kehe_parser import KEHEParser
+from .tkmaxx_parser import TKMaxxParser
+from .vmc_parser import VMCParser
+from .davidson_parser import DavidsonParser
+from .ross_parser import ROSSParser
+
+
+class OrderSource:
+    """A supported order source"""
+
+    def __init__(self, key: str, display_name: str, parser_class, file_types: List[str],
+                 aliases: Optional[List[str]] = None):
+        self.key = key
+        self.display_name = display_name
+        self.parser_class = parser_class
+        self.file_types = file_types
+        self.aliases = aliases or []
+
+    @property
+    def names(self) -> List[str]:
+        """Key, display name and aliases"""
+        return [self.key, self.display_name] + self.aliases
+
+    def named_in(self, text: str) -> bool:
+        """Whether one of the source's names appears in text, e.g. a file name ("KeHE po3268397.csv")"""
+        compact_text = _compact_name(text)
+        return any(_compact_name(name) in compact_text for name in self.names)
+
+    def accepts(self, filename: str) -> bool:
+        """Whether the file's extension is one this source's parser reads"""
+        return filename.lower().rsplit('.', 1)[-1] in self.file_types
+
+    def build_parser(self, db_service=None, mapping_utils=None) -> BaseParser:
+        """
+        Create a parser for this source
+
+        Args:
+            db_service: DatabaseService, used by parsers that query it directly (Whole Foods)
+            mapping_utils: Mapping provider; the shared one if None
+        """
+        if self.parser_class is WholeFoodsParser:
+            return WholeFoodsParser(db_service, mapping_utils)
+        return self.parser_class(mapping_utils)
+
+
+# In the order the sources are listed in the UI
+ORDER_SOURCES: Dict[str, OrderSource] = {
+    source.key: source for source in [
+        OrderSource('wholefoods', 'Whole Foods', WholeFoodsParser, ['html']),
+        OrderSource('unfi_west', 'UNFI West', UNFIWestParser, ['html']),
+        OrderSource('unfi_east', 'UNFI East', UNFIEastParser, ['pdf']),
+        OrderSource('kehe', 'KEHE - SPS', KEHEParser, ['csv']),
+        OrderSource('tkmaxx', 'TJ Maxx', TKMaxxParser, ['pdf', 'csv', 'xlsx'], aliases=['tjmaxx']),
+        OrderSource('vmc', 'VMC', VMCParser, ['csv']),
+        OrderSource('davidson', 'Davidson', DavidsonParser, ['csv']),
+        OrderSource('ross', 'ROSS', ROSSParser, ['pdf']),
+    ]
+}
+
+# Every file type some source reads
+SUPPORTED_FILE_TYPES: List[str] = sorted({file_type for source in ORDER_SOURCES.values() for file_type in source.file_types})
+
+
+def _compact_name(name: str) -> str:
+    return ''.join(ch for ch in str(name).lower() if ch.isalnum())
+
+
+def get_order_source(name: str) -> Optional[OrderSource]:
+    """
+    Look up a source by key, display name or alias, ignoring case, spaces,
+    dashes and underscores ("unfi_east", "UNFI East", "KEHE - SPS", "tjmaxx")
+
+    Returns:
+        The OrderSource, or None if the name matches no source
+    """
+    wanted = _compact_name(name)
+    for source in ORDER_SOURCES.values():
+        if wanted in [_compact_name(candidate) for candidate in source.names]:
+            return source
+    return None
@@ -5,19 +5,19 @@ Handles ROSS Dress for Less purchase orders
 
 from typing import List, Dict, Any, Optional
 import re
-import io
-from PyPDF2 import PdfReader
 from .base_parser import BaseParser
+from .pdf_text import extract_pdf_pages
 from utils.mapping_utils import MappingUtils
 
 
 class ROSSParser(BaseParser):
     """Parser for ROSS PDF order files"""
     
-    def __init__(self):
-        super().__init__()
+    pdf_source = 'ross'
+    
+    def __init__(self, mapping_utils: Optional[MappingUtils] = None):
+        super().__init__(mapping_utils)
         self.source_name = "ROSS"
-        self.mapping_utils = MappingUtils(use_database=True)
     
     def parse(self, file_content: bytes, file_extension: str, filename: str) -> Optional[List[Dict[str, Any]]]:
         """Parse ROSS PDF order file"""
@@ -53,24 +53,19 @@ class ROSSParser(BaseParser):
             raise ValueError(f"Error parsing ROSS PDF: {str(e)}")
     
     def _extract_text_from_pdf(self, file_content: bytes) -> str:
-        """Extract text from PDF file content using PyPDF2"""
+        """Extract text from PDF file content (cached by content hash)"""
         
         try:
-            pdf_stream = io.BytesIO(file_content)
-            pdf_reader = PdfReader(pdf_stream)
+            pages = extract_pdf_pages(file_content, source=self.pdf_source)
             
-            if len(pdf_reader.pages) == 0:
+            if len(pages) == 0:
                 raise ValueError("PDF file appears to be empty or corrupted (no pages found)")
             
+            # Pages that failed to extract are None and skipped, like empty pages
             text_content = ""
-            for page_num, page in enumerate(pdf_reader.pages):
-                try:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_content += page_text + "\n"
-                except Exception as page_error:
-                    print(f"DEBUG: Warning - Could not extract text from page {page_num + 1}: {page_error}")
-                    continue
+            for page_text in pages:
+                if page_text:
+                    text_content += page_text + "\n"
             
             if not text_content or len(text_content.strip()) < 50:
                 raise ValueError("PDF text extraction returned very little or no text. The PDF may be image-based or corrupted.")
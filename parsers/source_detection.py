@@ -0,0 +1,184 @@
+"""
+Detect the order source of a file from cheap signals, without parsing it
+
+Used for uploads under "All Sources" and by the batch CLI's --source auto,
+so a mixed batch can be dispatched file by file to the right parser:
+
+    1. The extension narrows the candidates to the sources that read it; an
+       extension only one source reads decides on its own (xlsx -> TJ Maxx).
+    2. HTML and CSV files are matched on markers in their first
+       FINGERPRINT_HEAD_BYTES: the Whole Foods page title, the UNFI West
+       cover sheet, the SPS "Record Type" layout.
+    3. PDFs are matched on the text of their first page only and must match
+       the markers of exactly one source: retailer POs (ROSS, TJ Maxx) can
+       mention UNFI, so a PDF matching several sources is left undetected.
+    4. KEHE, VMC and Davidson share the SPS layout and are told apart by the
+       partner named in the header (H) record, or failing that by a source
+       name in the file name.
+
+A file that matches no marker is reported as undetected rather than guessed,
+so it can still be processed with an explicitly selected source. Set
+SOURCE_DETECTION_DEBUG=1 to log every detection.
+"""
+
+import csv
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from .pdf_text import extract_first_page_text
+from .registry import ORDER_SOURCES, OrderSource
+from utils.pdf_text_cache import content_digest
+
+# Log each detection (once per file, not on cached reruns)
+SOURCE_DETECTION_DEBUG = os.getenv('SOURCE_DETECTION_DEBUG', '').lower() in ('1', 'true', 'yes')
+
+# Bytes of an HTML/CSV file searched for markers
+FINGERPRINT_HEAD_BYTES = 16 * 1024
+
+# (source key, pattern) per file type. In HTML and CSV files the first
+# matching source wins; a PDF must match exactly one source.
+_CONTENT_MARKERS = {
+    'html': [
+        ('wholefoods', re.compile(r'Whole\s+Foods\s+Market', re.I)),
+        # Saved UNFI West pages can carry large injected style blocks, so the title counts too
+        ('unfi_west', re.compile(r'\bUNFI\b|<title>\s*Purchase\s+Order\s+\d+', re.I)),
+    ],
+    'pdf': [
+        ('unfi_east', re.compile(r'\bUNFI\b', re.I)),
+        ('ross', re.compile(r'\bROSS\s+(STORES|PROCURE)|FLAMMABLE\s+FABRICS\s+ACT', re.I)),
+        ('tkmaxx', re.compile(r'TJX|TJ\s*MAXX|ROUTING AND DISTRIBUTION INSTRUCTIONS|MARSHALLS|HOMESENSE|HOME\s*GOODS|WINNERS', re.I)),
+    ],
+    # Legacy TJ Maxx exports; SPS files are recognized separately
+    'csv': [
+        ('tkmaxx', re.compile(r'TJX|TJ\s*MAXX|MARSHALLS|HOMESENSE|HOME\s*GOODS|WINNERS', re.I)),
+    ],
+}
+
+# Sources exporting the SPS Commerce layout, and how their header records name the partner
+SPS_SOURCES = ('kehe', 'vmc', 'davidson')
+_SPS_PARTNER_MARKERS = [
+    ('kehe', re.compile(r'\bKEHE\b', re.I)),
+    # VMC (Valu Merchandisers) orders are issued by Associated Wholesale Grocers
+    ('vmc', re.compile(r'\bVMC\b|VALU\s+MERCHANDISERS|ASSOCIATED\s+WHOLESALE\s+GROCERS', re.I)),
+    ('davidson', re.compile(r'\bDAVIDSON', re.I)),
+]
+_SPS_PARTNER_COLUMNS = ('Partner', 'Ship To Name', 'Bill To Name')
+
+# Recent detections, so Streamlit reruns do not read every upload again
+_DETECTION_CACHE_SIZE = 1024
+_detections: 'OrderedDict[Tuple[str, str], SourceDetection]' = OrderedDict()
+_detections_lock = threading.Lock()
+
+
+class SourceDetection:
+    """Outcome of classifying one file"""
+
+    def __init__(self, source: Optional[OrderSource], reason: str):
+        self.source = source  # None if the file could not be classified
+        self.reason = reason  # What decided it (or why nothing did), for messages
+
+    def __repr__(self):
+        return f"SourceDetection({self.source.key if self.source else None!r}, {self.reason!r})"
+
+
+def _match_markers(markers: List[Tuple[str, re.Pattern]], text: str, candidates: List[OrderSource]) -> List[OrderSource]:
+    """Candidate sources whose markers appear in text, in marker order"""
+    return [
+        ORDER_SOURCES[source_key] for source_key, pattern in markers
+        if ORDER_SOURCES[source_key] in candidates and pattern.search(text)
+    ]
+
+
+def _is_sps_layout(head: str) -> bool:
+    """SPS CSV exports start with a header row naming "PO Number" and "Record Type" """
+    header = next(csv.reader([head.lstrip('\ufeff').split('\n', 1)[0]]), [])
+    columns = {column.strip() for column in header}
+    return 'PO Number' in columns and 'Record Type' in columns
+
+
+def _detect_sps_source(file_name: str, head: str, truncated: bool) -> SourceDetection:
+    """Tell KEHE, VMC and Davidson apart by the partner in the header records"""
+    lines = head.lstrip('\ufeff').splitlines()
+    if truncated:
+        lines = lines[:-1]  # The last line may be cut off
+    partner_text = ' '.join(
+        str(row.get(column) or '')
+        for row in csv.DictReader(lines)
+        if str(row.get('Record Type') or '').strip() == 'H'
+        for column in _SPS_PARTNER_COLUMNS
+    )
+
+    matches = [key for key, pattern in _SPS_PARTNER_MARKERS if pattern.search(partner_text)]
+    if len(matches) == 1:
+        return SourceDetection(ORDER_SOURCES[matches[0]], "SPS CSV, partner named in the header record")
+
+    named = [key for key in SPS_SOURCES if ORDER_SOURCES[key].named_in(file_name)]
+    if len(named) == 1:
+        return SourceDetection(ORDER_SOURCES[named[0]], "SPS CSV, source named in the file name")
+
+    return SourceDetection(None, "SPS CSV without a known partner (KEHE, VMC or Davidson)")
+
+
+def _detect(file_name: str, file_content: bytes) -> SourceDetection:
+    file_extension = file_name.lower().rsplit('.', 1)[-1]
+    candidates = [source for source in ORDER_SOURCES.values() if source.accepts(file_name)]
+    if not candidates:
+        return SourceDetection(None, f"no order source reads .{file_extension} files")
+    if len(candidates) == 1:
+        return SourceDetection(candidates[0], f"only {candidates[0].display_name} reads .{file_extension} files")
+
+    if file_extension == 'pdf':
+        try:
+            text = extract_first_page_text(file_content)
+        except Exception as e:
+            return SourceDetection(None, f"not a readable PDF ({e})")
+        if not text.strip():
+            return SourceDetection(None, "first PDF page has no text")
+        sources = _match_markers(_CONTENT_MARKERS['pdf'], text, candidates)
+        if len(sources) == 1:
+            return SourceDetection(sources[0], "matched on the first PDF page")
+        if sources:
+            names = ' and '.join(source.display_name for source in sources)
+            return SourceDetection(None, f"first PDF page matches the markers of {names}")
+        return SourceDetection(None, "no known source markers on the first PDF page")
+
+    truncated = len(file_content) > FINGERPRINT_HEAD_BYTES
+    head = file_content[:FINGERPRINT_HEAD_BYTES].decode('utf-8', errors='replace')
+    if file_extension == 'csv' and _is_sps_layout(head):
+        return _detect_sps_source(file_name, head, truncated)
+
+    sources = _match_markers(_CONTENT_MARKERS.get(file_extension, []), head, candidates)
+    if sources:
+        return SourceDetection(sources[0], f"matched on the start of the {file_extension.upper()} file")
+    return SourceDetection(None, f"no known source markers in the {file_extension.upper()} file")
+
+
+def detect_order_source(file_name: str, file_content: bytes) -> SourceDetection:
+    """
+    Classify an order file by its extension and a cheap look at its content
+
+    Args:
+        file_name: Original file name (extension and, for SPS CSVs, source hints)
+        file_content: Raw file content
+
+    Returns:
+        SourceDetection with the OrderSource, or None and the reason
+    """
+    key = (content_digest(file_content), file_name)
+    with _detections_lock:
+        detection = _detections.get(key)
+        if detection is not None:
+            _detections.move_to_end(key)
+            return detection
+
+    detection = _detect(file_name, file_content)
+    if SOURCE_DETECTION_DEBUG:
+        print(f"DEBUG: Detected source of {file_name}: {detection.source.key if detection.source else 'unknown'} ({detection.reason})")
+
+    with _detections_lock:
+        _detections[key] = detection
+        while len(_detections) > _DETECTION_CACHE_SIZE:
+            _detections.popitem(last=False)
+    return detection
@@ -0,0 +1,464 @@
+"""
+Shared parser engine for SPS Commerce CSV order files
+Used by KEHE - SPS, VMC and Davidson, which all export the same record layout:
+one CSV where 'Record Type' marks PO header ('H'), line item ('D') and
+allowance/charge ('I') rows. An 'I' row applies to the 'D' row before it.
+"""
+
+from typing import List, Dict, Any, Optional, Tuple
+import csv
+import io
+import numpy as np
+import pandas as pd
+from .base_parser import BaseParser
+from utils.mapping_utils import MappingUtils
+
+
+class SPSProfile:
+    """
+    Per-source settings for SPSParser
+
+    Args:
+        source_key: Mapping source passed to MappingUtils ('kehe', 'vmc', ...)
+        label: Name used in debug and error messages
+        item_number_columns: Columns holding the buyer's item number, first non-empty wins
+        default_customer_name: Customer used when Ship To Location has no mapping
+        default_store_name: Store used when Ship To Location has no mapping
+        default_raw_customer_name: Fallback when the header has no 'Ship To Name' column
+        delivery_date_columns: Header date columns for the delivery date, first parseable wins
+        discount_columns: {'percent'|'flat'|'rate'|'rate_qty'|'description': column aliases}
+        discount_style: 'best' picks the largest allowance and reports discount_percent and
+            discount_type; 'annotated' picks the largest and notes the options it beat
+        item_number_width: Zero-pad numeric item numbers to this width (0 = no padding)
+        ship_to_length: Restore a dropped leading zero on numeric Ship To Locations
+            one digit shorter than this (0 = leave as is)
+        upc_column: Optional column whose value is used as the 'upc' lookup key
+        infer_types: Let pandas infer column types instead of reading every cell as text
+        require_line_items: Raise instead of returning None when a file has no 'D' records
+    """
+
+    def __init__(self, source_key: str, label: str, item_number_columns: Tuple[str, ...],
+                 default_customer_name: str, default_store_name: str, default_raw_customer_name: str,
+                 delivery_date_columns: Tuple[str, ...], discount_columns: Dict[str, Tuple[str, ...]],
+                 discount_style: str = 'annotated', item_number_width: int = 0, ship_to_length: int = 0,
+                 upc_column: Optional[str] = None, infer_types: bool = False, require_line_items: bool = True):
+        self.source_key = source_key
+        self.label = label
+        self.item_number_columns = item_number_columns
+        self.default_customer_name = default_customer_name
+        self.default_store_name = default_store_name
+        self.default_raw_customer_name = default_raw_customer_name
+        self.delivery_date_columns = delivery_date_columns
+        self.discount_columns = discount_columns
+        self.discount_style = discount_style
+        self.item_number_width = item_number_width
+        self.ship_to_length = ship_to_length
+        self.upc_column = upc_column
+        self.infer_types = infer_types
+        self.require_line_items = require_line_items
+
+
+class SPSParser(BaseParser):
+    """Columnar parser for SPS H/D/I record CSV files, configured by a SPSProfile"""
+
+    profile: SPSProfile = None
+
+    def __init__(self, mapping_utils: Optional[MappingUtils] = None):
+        super().__init__(mapping_utils)
+        # Legacy CSV mapping fallbacks - mappings now come from the database
+        self.customer_mapping = {}
+        self.item_mapping = {}
+
+    def parse(self, file_content, file_extension: str, filename: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Parse an SPS CSV file and return structured order data
+
+        Args:
+            file_content: Raw file content (bytes or string)
+            file_extension: File format ('csv' expected)
+            filename: Name of the source file
+
+        Returns:
+            List of order dictionaries with parsed data
+        """
+        profile = self.profile
+        try:
+            # Handle different content types
+            if isinstance(file_content, bytes):
+                content_str = file_content.decode('utf-8-sig')
+            else:
+                content_str = file_content
+
+            try:
+                df = self._read_records(content_str)
+            except Exception as e:
+                print(f"ERROR: Failed to read CSV file: {e}")
+                raise ValueError(f"Failed to parse CSV file: {str(e)}")
+
+            # Check if required columns exist
+            if 'Record Type' not in df.columns:
+                available_cols = ', '.join(df.columns[:10].tolist())  # Show first 10 columns
+                raise ValueError(
+                    f"CSV file missing required 'Record Type' column. "
+                    f"Available columns: {available_cols}{'...' if len(df.columns) > 10 else ''}. "
+                    f"Expected format: CSV with Record Type column containing 'H' (header), 'D' (detail), and 'I' (invoice/discount) records."
+                )
+
+            # Normalize Record Type once (whitespace and case) for every split below
+            record_types = df['Record Type'].map(str).str.strip().str.upper()
+            found_record_types = [rt for rt in sorted(record_types.unique().tolist()) if rt and rt != 'NAN']
+            print(f"DEBUG: Found Record Types after stripping: {found_record_types}")
+
+            # Get header information from the first 'H' record
+            header_df = df[record_types == 'H']
+            if header_df.empty:
+                raise ValueError(
+                    f"No header record (Record Type='H') found in CSV file. "
+                    f"Found Record Types: {found_record_types}. "
+                    f"Expected at least one 'H' record for header information."
+                )
+            header_info = header_df.iloc[0]
+
+            # Filter for line item records (Record Type = 'D')
+            line_items_df = df[record_types == 'D']
+            if line_items_df.empty:
+                if not profile.require_line_items:
+                    return None
+                raise ValueError(
+                    f"No line item records (Record Type='D') found in CSV file. "
+                    f"Found Record Types: {found_record_types}. "
+                    f"Expected at least one 'D' record for line items."
+                )
+
+            # Dates, customer and store come from the single 'H' record - resolve them once per PO
+            try:
+                header = self._resolve_header(header_info)
+            except Exception as e:
+                print(f"Error resolving {profile.label} header: {e}")
+                return None
+
+            # Every per-line field is computed column-wise over all 'D' records
+            item_numbers = self._item_number_column(line_items_df)
+            item_attributes = self._item_attributes(line_items_df, item_numbers)
+            quantities = self._numeric_column(line_items_df, 'Qty Ordered')
+            unit_prices = self._numeric_column(line_items_df, 'Unit Price')
+            descriptions = self._text_column(line_items_df, 'Product/Item Description').str.strip()
+            line_discounts = self._calculate_line_discounts(df, record_types, unit_prices, quantities)
+
+            # Resolve every line's item number in a single round trip
+            resolvable = [idx for idx, item_number in item_numbers.items() if item_number]
+            resolved_items = dict(zip(resolvable, self.mapping_utils.resolve_item_numbers_bulk(
+                [item_attributes[idx] for idx in resolvable], profile.source_key
+            )))
+
+            orders = []
+            for idx in line_items_df.index:
+                try:
+                    item_number = item_numbers[idx]
+                    quantity = float(quantities[idx])
+                    unit_price = float(unit_prices[idx])
+
+                    # Skip invalid entries
+                    if not item_number or quantity <= 0:
+                        continue
+
+                    # Use enhanced mapping resolution with priority system (resolved in bulk above)
+                    mapped_item = resolved_items.get(idx)
+                    if mapped_item:
+                        print(f"DEBUG: {profile.label} Priority Mapping: {item_attributes[idx]} -> '{mapped_item}'")
+                    elif item_number in self.item_mapping:
+                        # Fallback to legacy CSV mapping for backward compatibility
+                        mapped_item = self.item_mapping[item_number]
+                        print(f"DEBUG: {profile.label} Legacy Mapping: '{item_number}' -> '{mapped_item}'")
+                    else:
+                        mapped_item = item_number  # Final fallback to original number
+                        print(f"DEBUG: No {profile.label} mapping found for '{item_number}', using raw number")
+
+                    # Calculate total price before applying discounts
+                    line_total = unit_price * quantity
+
+                    # Discount from the 'I' record that follows this line item, if any
+                    discount_amount, discount_info, discount_percent, discount_type = line_discounts.get(
+                        idx, (0, "", 0, "")
+                    )
+
+                    order_data = {
+                        **header,
+                        'item_number': mapped_item,
+                        'raw_item_number': item_number,
+                        'item_description': descriptions[idx],
+                        'quantity': int(quantity),
+                        'unit_price': unit_price,
+                        'total_price': line_total - discount_amount,
+                        'original_total': line_total,
+                        'discount_amount': discount_amount,
+                        'discount_info': discount_info
+                    }
+                    if profile.discount_style == 'best':
+                        order_data['discount_percent'] = discount_percent
+                        order_data['discount_type'] = discount_type
+                    order_data['source_file'] = filename
+
+                    orders.append(order_data)
+
+                except Exception as e:
+                    print(f"Error processing line item: {e}")
+                    continue
+
+            return orders if orders else None
+
+        except Exception as e:
+            raise ValueError(f"Error parsing {profile.label} CSV: {str(e)}")
+
+    def _read_records(self, content_str: str) -> pd.DataFrame:
+        """
+        Read the CSV in one pass, tolerating ragged rows
+        Rows longer than the header are truncated and shorter rows are padded
+        """
+        header = next(csv.reader(io.StringIO(content_str)), None)
+        if not header:
+            raise ValueError("CSV file is empty")
+
+        if self.profile.infer_types:
+            return pd.read_csv(io.StringIO(content_str), usecols=range(len(header)))
+
+        df = pd.read_csv(io.StringIO(content_str), usecols=range(len(header)), dtype=str, keep_default_na=False)
+        return df.replace('nan', '')
+
+    def _text_column(self, frame: pd.DataFrame, *column_names: str) -> pd.Series:
+        """
+        The first of column_names present in frame as text
+        Mirrors str(row.get(name, '')) for every row
+        """
+        for column_name in column_names:
+            if column_name in frame.columns:
+                return frame[column_name].map(str)
+        return pd.Series('', index=frame.index, dtype=object)
+
+    def _numeric_column(self, frame: pd.DataFrame, *column_names: str) -> pd.Series:
+        """
+        Clean the first of column_names present in frame into floats
+        Mirrors clean_numeric_value(str(row.get(name, '0'))) for every row
+        """
+        for column_name in column_names:
+            if column_name in frame.columns:
+                return frame[column_name].map(str).map(self.clean_numeric_value).astype(float)
+        return pd.Series(0.0, index=frame.index)
+
+    def _item_number_column(self, line_items_df: pd.DataFrame) -> pd.Series:
+        """Buyer's item number of every 'D' record, cleaned of a .0 suffix and padded"""
+        item_numbers = pd.Series('', index=line_items_df.index, dtype=object)
+        for column_name in self.profile.item_number_columns:
+            if column_name in line_items_df.columns:
+                candidates = line_items_df[column_name].map(str).str.strip()
+                item_numbers = item_numbers.where(item_numbers != '', candidates)
+
+        item_numbers = item_numbers.where(~item_numbers.str.endswith('.0'), item_numbers.str[:-2])
+
+        width = self.profile.item_number_width
+        if width:
+            needs_padding = item_numbers.str.isdigit() & (item_numbers.str.len() < width)
+            if needs_padding.any():
+                print(f"DEBUG: Padded {int(needs_padding.sum())} {self.profile.label} item numbers with leading zeros")
+                item_numbers = item_numbers.where(~needs_padding, item_numbers.str.zfill(width))
+        return item_numbers
+
+    def _item_attributes(self, line_items_df: pd.DataFrame, item_numbers: pd.Series) -> Dict[Any, Dict[str, str]]:
+        """
+        Priority-resolution attributes for every 'D' record
+        Returns: {line label: {'vendor_item': ..., 'upc'/'sku_alias': ...}}
+        """
+        vendor_styles = self._text_column(line_items_df, 'Vendor Style').str.strip()
+        upcs = (self._text_column(line_items_df, self.profile.upc_column).str.strip()
+                if self.profile.upc_column else None)
+
+        attributes = {}
+        for idx, item_number in item_numbers.items():
+            item_attributes = {'vendor_item': item_number}
+
+            # Vendor style could be a UPC (typically 12 digits) or another identifier
+            vendor_style = vendor_styles[idx]
+            if vendor_style and vendor_style != 'nan':
+                if vendor_style.isdigit() and len(vendor_style) == 12:
+                    item_attributes['upc'] = vendor_style
+                else:
+                    item_attributes['sku_alias'] = vendor_style
+
+            if upcs is not None:
+                upc = upcs[idx]
+                if upc and upc != 'nan':
+                    item_attributes['upc'] = upc
+
+            attributes[idx] = item_attributes
+        return attributes
+
+    def _resolve_header(self, header_info: pd.Series) -> Dict[str, Any]:
+        """
+        Resolve the order-level fields shared by every line of a PO
+        Returns: dict with order number, dates, customer/store names and ship to location
+        """
+        profile = self.profile
+
+        po_date = self.parse_date(str(header_info.get('PO Date', '')))
+        delivery_date = None
+        for column_name in profile.delivery_date_columns:
+            delivery_date = self.parse_date(str(header_info.get(column_name, '')))
+            if delivery_date:
+                break
+        delivery_date = delivery_date or po_date
+
+        # Clean Ship To Location value - remove .0 suffix and ensure proper format
+        ship_to_location_raw = str(header_info.get('Ship To Location', '')).strip()
+        ship_to_location = ship_to_location_raw
+        if ship_to_location.endswith('.0'):
+            ship_to_location = ship_to_location[:-2]
+
+        # Restore a leading zero dropped by numeric parsing (e.g. KEHE 13-digit locations)
+        if profile.ship_to_length and ship_to_location.isdigit() and len(ship_to_location) == profile.ship_to_length - 1:
+            ship_to_location = '0' + ship_to_location
+            print(f"DEBUG: Added leading zero to Ship To Location: '{ship_to_location_raw}' -> '{ship_to_location}'")
+
+        # Use customer mapping for customer names (separate from store mappings)
+        customer_name = profile.default_customer_name
+        if ship_to_location:
+            db_mapped_customer = self.mapping_utils.get_customer_mapping(ship_to_location, profile.source_key)
+            if db_mapped_customer and db_mapped_customer != 'UNKNOWN':
+                customer_name = db_mapped_customer
+                print(f"DEBUG: {profile.label} DB Customer Mapping: '{ship_to_location}' -> '{customer_name}'")
+            elif ship_to_location in self.customer_mapping:
+                customer_name = self.customer_mapping[ship_to_location]
+                print(f"DEBUG: {profile.label} Legacy Customer Mapping: '{ship_to_location}' -> '{customer_name}'")
+            else:
+                print(f"DEBUG: No {profile.label} customer mapping found for '{ship_to_location}' (raw: '{ship_to_location_raw}'), using default: '{customer_name}'")
+
+        # Use store mapping for SaleStoreName and StoreName fields
+        store_name = profile.default_store_name
+        if ship_to_location:
+            db_mapped_store = self.mapping_utils.get_store_mapping(ship_to_location, profile.source_key)
+            if db_mapped_store and db_mapped_store != 'UNKNOWN' and db_mapped_store != ship_to_location:
+                store_name = db_mapped_store
+                print(f"DEBUG: {profile.label} DB Store Mapping: '{ship_to_location}' -> '{store_name}'")
+            else:
+                print(f"DEBUG: No {profile.label} store mapping found for '{ship_to_location}', using default: '{store_name}'")
+
+        return {
+            'order_number': str(header_info.get('PO Number', '')),
+            'order_date': po_date,
+            'delivery_date': delivery_date,
+            'customer_name': customer_name,  # Use mapped company name from Ship To Location
+            'store_name': store_name,  # Use store mapping, not customer mapping
+            'raw_customer_name': str(header_info.get('Ship To Name', profile.default_raw_customer_name)),
+            'ship_to_location': ship_to_location  # Add ship to location for reference
+        }
+
+    def _pair_discount_records(self, record_types: pd.Series) -> pd.Series:
+        """
+        Find the discount record (type 'I') that applies to each line item (type 'D')
+
+        Discount records follow the line item they apply to. Every row gets a
+        group id from a running count of 'D' records, so an 'I' record belongs
+        to the 'D' that opened its group; only the first 'I' per group applies.
+
+        Returns:
+            Series mapping 'D' row labels to the label of their 'I' record
+        """
+        is_line = record_types == 'D'
+        line_group = is_line.cumsum()
+        first_discounts = line_group[(record_types == 'I') & (line_group > 0)].drop_duplicates()
+        line_labels = record_types.index[is_line]
+        return pd.Series(first_discounts.index, index=line_labels[first_discounts.to_numpy() - 1])
+
+    def _calculate_line_discounts(self, df: pd.DataFrame, record_types: pd.Series,
+                                  unit_prices: pd.Series, quantities: pd.Series) -> Dict[Any, tuple]:
+        """
+        Calculate the discount of every line item that has a discount record
+
+        Percentage, flat and per-unit rate allowances are evaluated column-wise
+        and the largest one wins; on ties the earlier option (percentage, flat,
+        rate) is kept.
+
+        Returns:
+            {line label: (discount_amount, discount_description, discount_percent, discount_type)}
+        """
+        discount_labels = self._pair_discount_records(record_types)
+        if discount_labels.empty:
+            return {}
+
+        try:
+            columns = self.profile.discount_columns
+            line_labels = discount_labels.index
+            discount_rows = df.loc[discount_labels.to_numpy()].set_index(line_labels)
+            quantities = quantities.loc[line_labels]
+            line_totals = unit_prices.loc[line_labels] * quantities
+
+            percentage_discount = self._numeric_column(discount_rows, *columns['percent'])
+            flat_discount = self._numeric_column(discount_rows, *columns['flat'])
+            rate_discount = self._numeric_column(discount_rows, *columns['rate'])
+            rate_qty = self._numeric_column(discount_rows, *columns['rate_qty'])
+            discount_desc = self._text_column(discount_rows, *columns['description']).str.strip()
+
+            percentage_amount = (line_totals * percentage_discount) / 100
+            # Rate applies to the discount record's Qty if given, otherwise to the line quantity
+            rate_by_qty = rate_qty > 0
+            rate_no_units = ~rate_by_qty & ~(quantities > 0)
+            rate_amount = rate_discount * rate_qty.where(rate_by_qty, quantities).where(~rate_no_units, 0)
+
+            has_percentage = percentage_discount > 0
+            has_flat = flat_discount > 0
+            has_rate = rate_discount > 0
+            best_amount = percentage_amount.where(has_percentage, -np.inf)
+            flat_wins = has_flat & (flat_discount > best_amount)
+            best_amount = flat_discount.where(flat_wins, best_amount)
+            rate_wins = has_rate & (rate_amount > best_amount)
+            option_count = has_percentage.astype(int) + has_flat.astype(int) + has_rate.astype(int)
+
+            line_discounts = {}
+            for label in line_labels:
+                options = []
+                if has_percentage[label]:
+                    options.append(('percentage', float(percentage_amount[label]),
+                                    f"Percentage: {float(percentage_discount[label])}%"))
+                if has_flat[label]:
+                    options.append(('flat', float(flat_discount[label]), f"Flat: ${float(flat_discount[label]):.2f}"))
+                if has_rate[label]:
+                    options.append(('rate', 0 if rate_no_units[label] else float(rate_amount[label]),
+                                    f"Rate: ${float(rate_discount[label]):.2f} per unit"))
+
+                best_option = None
+                if rate_wins[label]:
+                    best_option = options[-1]
+                elif flat_wins[label]:
+                    best_option = options[1] if has_percentage[label] else options[0]
+                elif has_percentage[label]:
+                    best_option = options[0]
+
+                discount_amount = 0
+                discount_info = ""
+                discount_percent = 0
+                discount_type = ""
+                if self.profile.discount_style == 'best':
+                    if best_option:
+                        discount_type, discount_amount, discount_info = best_option
+                        if discount_type == 'percentage':
+                            discount_percent = float(percentage_discount[label])
+                elif option_count[label] > 1:
+                    # Report the options the chosen discount beat
+                    discount_amount, discount_info = best_option[1], best_option[2]
+                    other_options = [option[2] for option in options if option is not best_option]
+                    discount_info += f" (better than {', '.join(other_options)})"
+                elif best_option and (best_option[0] != 'rate' or best_option[1] > 0):
+                    discount_amount, discount_info = best_option[1], best_option[2]
+                    if best_option[0] == 'rate':
+                        discount_info = discount_info + f" (total: ${discount_amount:.2f})"
+
+                # Get discount description if available
+                if discount_desc[label]:
+                    discount_info += f" - {discount_desc[label]}"
+
+                line_discounts[label] = (discount_amount, discount_info, discount_percent, discount_type)
+
+            return line_discounts
+
+        except Exception as e:
+            print(f"Error calculating discounts: {e}")
+            return {}
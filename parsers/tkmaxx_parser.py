@@ -7,14 +7,19 @@ from typing import List, Dict, Any, Optional
 import pandas as pd
 import io
 import re
-from PyPDF2 import PdfReader
 from .base_parser import BaseParser
+from .pdf_text import extract_pdf_pages
+from utils.mapping_utils import MappingUtils
 
 class TKMaxxParser(BaseParser):
     """Parser for TJ Maxx PDF/CSV/Excel order files"""
     
-    def __init__(self):
-        super().__init__()
+    # PO and Distribution files of one order are combined across parse() calls
+    supports_concurrent_parsing = False
+    pdf_source = 'tjmaxx'
+    
+    def __init__(self, mapping_utils: Optional[MappingUtils] = None):
+        super().__init__(mapping_utils)
         self.source_name = "TJ Maxx"
         # Cache PO and Distribution data to combine across uploads
         self._pending_po_data = {}
@@ -78,15 +83,14 @@ class TKMaxxParser(BaseParser):
             raise ValueError(f"Error parsing TJ Maxx PDF: {str(e)}")
     
     def _extract_text_from_pdf(self, file_content: bytes) -> str:
-        """Extract text from PDF file content using PyPDF2"""
+        """Extract text from PDF file content (cached by content hash)"""
         
         try:
-            pdf_stream = io.BytesIO(file_content)
-            pdf_reader = PdfReader(pdf_stream)
-            
             text_content = ""
-            for page in pdf_reader.pages:
-                text_content += page.extract_text() + "\n"
+            for page_num, page_text in enumerate(extract_pdf_pages(file_content, source=self.pdf_source)):
+                if page_text is None:
+                    raise ValueError(f"page {page_num + 1} could not be read")
+                text_content += page_text + "\n"
             
             return text_content
             
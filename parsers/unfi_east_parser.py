@@ -2,19 +2,91 @@
 Parser for UNFI East order files (PDF format)
 """
 
-from typing import List, Dict, Any, Optional
+from typing import Iterator, List, Dict, Any, Optional
+import os
 import re
-import io
-from PyPDF2 import PdfReader
 from .base_parser import BaseParser
+from .pdf_text import extract_pdf_pages
+from utils.mapping_utils import MappingUtils
+
+# Log every line-item tokenizer/parser decision (slow, for troubleshooting a PO)
+UNFI_EAST_DIAGNOSTICS = os.getenv('UNFI_EAST_DIAGNOSTICS', '').lower() in ('1', 'true', 'yes')
+
+# IOW codes as stored in the unfi_east customer mappings, most common first
+IOW_CODES = ['RCH', 'HOW', 'CHE', 'YOR', 'IOW', 'GRW', 'MAN', 'ATL', 'SAR', 'SRQ', 'DAY', 'HVA', 'RAC', 'TWC']
+
+# Int Ref# prefixes that identify the warehouse (e.g. "JJ-85948-J10" is Howell)
+INT_REF_TO_IOW = {
+    'JJ': 'HOW',
+    'CC': 'CHE',
+    'MM': 'YOR',
+    'SS': 'SAR',
+    'HH': 'HOW',
+    'GG': 'GRW',
+    'UU': 'HOW',
+    'RR': 'RCH',
+    'YY': 'YOR',
+}
+
+# Customer code patterns
+_IOW_CODE_PATTERNS = {code: re.compile(rf'(?<![A-Z]){code}(?![A-Z])', re.IGNORECASE) for code in IOW_CODES}
+_IOW_CODE_WORDS = {code: re.compile(rf'\b{code}\b', re.IGNORECASE) for code in IOW_CODES}
+_INT_REF_LABEL = re.compile(r'Int(?:ernal)?\s+Ref(?:\s+Number)?[:#]', re.IGNORECASE)
+_INT_REF_PREFIX = re.compile(r'Int(?:ernal)?\s+Ref(?:\s+Number)?[:#\s]+([A-Z]{2})-[0-9\-]+', re.IGNORECASE)
+_INT_REF_SUFFIXES = [
+    re.compile(r'Int(?:ernal)?\s+Ref(?:\s+Number)?[:#\s]+[A-Za-z0-9\-]+\s+([A-Z]{2,3})\b', re.IGNORECASE),  # "UU-85950-I16 RCH"
+    re.compile(r'Int(?:ernal)?\s+Ref(?:\s+Number)?[:#\s]+[A-Za-z0-9\-]+([A-Z]{2,3})\b', re.IGNORECASE),  # "UU-85950-I16RCH"
+]
+_LOCATION_KEYWORDS = [re.compile(re.escape(keyword), re.IGNORECASE) for keyword in
+                      ['Ship To', 'Ship To:', 'Warehouse', 'Location', 'Int Ref', 'Internal Ref', 'Ref#', 'Ref #']]
+
+# Start of an item: Prod#, Seq, Ord Qty, Vend Qty
+_ITEM_START = re.compile(r'(\d{6})\s+(\d+)\s+(\d+)\s+(\d+)')
+_ITEM_LINE_START = re.compile(r'\s*\d{6}\s+\d+')
+_SIX_DIGITS = re.compile(r'\d{6}')
+_SPACES = re.compile(r'[ \t]+')
+_WHITESPACE = re.compile(r'\s+')
+
+# Item patterns, most to least specific
+_ITEM_PATTERNS = [re.compile(pattern) for pattern in (
+    # Full format: Prod# Seq Ord Qty Vend Qty Vend ID MC Pack U/M Brand Description Unit Cst Vend CS Extensin
+    r'(\d{6})\s+(\d+)\s+(\d+)\s+(\d+)\s+([\d\-]+)\s+[\d\s]+(?:[\d\.]+\s+)?(?:OZ|FZ|LB|PK|CT|EA)?\s+([A-Z]{2,})\s+([A-Z\s,&\.\-:]+?)\s+([\d\.]+)\s+([\d\.]+)\s+([\d,]+\.?\d*)',
+    # Flexible format: variations in spacing and unit position
+    r'(\d{6})\s+\d+\s+(\d+)\s+\d+\s+([\d\-]+)\s+[^\d]*([A-Z]{2,})\s+([A-Z\s,&\.\-:]+?)\s+([\d\.]+)\s+[\d\.]+\s+([\d,]+\.?\d*)',
+    # Simplified: product number, qty, description and prices
+    r'(\d{6})\s+\d+\s+(\d+)\s+\d+\s+[\d\-]+\s+.*?([A-Z]{2,})\s+([A-Z\s,&\.\-:]{10,}?)(?=\s+[\d\.]+\s+[\d\.]+\s+[\d,]+)\s+([\d\.]+)\s+[\d\.]+\s+([\d,]+\.?\d*)',
+    # Most flexible: product number, qty and prices only
+    r'(\d{6})\s+\d+\s+(\d+)\s+\d+\s+([\d\-]+)\s+.*?([\d\.]+)\s+[\d\.]+\s+([\d,]+\.?\d*)',
+)]
+_PARTIAL_ITEM = re.compile(r'(\d{6})\s+\d+\s+(\d+)')
+_PARTIAL_PRICES = re.compile(r'([\d\.]+)\s+[\d\.]+\s+([\d,]+\.?\d*)')
+
+# Prices: Unit Cst, Vend CS, Extensin
+_BRAND = re.compile(r'\b([A-Z]{2,6})\s+[A-Z\s,&\.\-:]{5,}')
+_PRICE_TRIPLET = re.compile(r'(\d{1,3}\.\d{2})\s+(\d{1,3}\.\d{2})\s+([\d,]+\d{2})')
+_PRICE_TRIPLET_NO_COMMA = re.compile(r'(\d{1,3}\.\d{2})\s+(\d{1,3}\.\d{2})\s+(\d{1,4}\.\d{2})(?!\d)')
+_TWO_PRICES = re.compile(r'(\d{1,4}\.\d{2})\s+(\d{1,4}\.\d{2})')
+_EXTENSION = re.compile(r'([\d,]+\d{2})(?=\s*(?:ALLOWANCE|DISC|NWL|$))')
+
+# Description recovery for the most flexible pattern
+_DESC_NUMBERS = re.compile(r'\d+\s+\d+\s+[\d\.]+\s*(?:OZ|FZ|LB|PK|CT|EA)?\s*')
+_LEADING_NUMBER = re.compile(r'^\d+\s+')
+_BRAND_DESCRIPTION = re.compile(r'([A-Z]{2,6})\s+([A-Z\s,&\.\-:]{5,}?)(?=\s+\d)')
+
+# Discounts: "ALLOWANCE - DISC: 10.0%" and "NWL AMT: 1.32 11.88 403.92"
+_DISCOUNT_PERCENT = re.compile(r'ALLOWANCE\s*-\s*DISC:\s*([\d\.]+)%', re.IGNORECASE)
+_DISCOUNT_AMOUNT = re.compile(r'NWL\s+AMT:\s+([\d\.]+)\s+([\d\.]+)\s+([\d,]+\.?\d*)', re.IGNORECASE)
+
 
 class UNFIEastParser(BaseParser):
     """Parser for UNFI East PDF order files"""
     
-    def __init__(self, mapping_utils):
-        super().__init__()
+    pdf_source = 'unfi_east'
+    
+    def __init__(self, mapping_utils: Optional[MappingUtils] = None):
+        super().__init__(mapping_utils)
         self.source_name = "UNFI East"
-        self.mapping_utils = mapping_utils
+        self.diagnostics = UNFI_EAST_DIAGNOSTICS
     
     def parse(self, file_content: bytes, file_extension: str, filename: str) -> Optional[List[Dict[str, Any]]]:
         """Parse UNFI East PDF order file"""
@@ -49,19 +121,15 @@ class UNFIEastParser(BaseParser):
             raise ValueError(f"Error parsing UNFI East PDF: {str(e)}")
     
     def _extract_text_from_pdf(self, file_content: bytes) -> str:
-        """Extract text from PDF file content using PyPDF2"""
+        """Extract text from PDF file content (cached by content hash)"""
         
         try:
-            # Create a BytesIO object from the file content
-            pdf_stream = io.BytesIO(file_content)
-            
-            # Use PyPDF2 to read the PDF
-            pdf_reader = PdfReader(pdf_stream)
-            
             # Extract text from all pages
             text_content = ""
-            for page in pdf_reader.pages:
-                text_content += page.extract_text() + "\n"
+            for page_num, page_text in enumerate(extract_pdf_pages(file_content, source=self.pdf_source)):
+                if page_text is None:
+                    raise ValueError(f"page {page_num + 1} could not be read")
+                text_content += page_text + "\n"
             
             return text_content
             
@@ -277,7 +345,7 @@ class UNFIEastParser(BaseParser):
             'Twin Cities': 'TWC',
         }
         
-        # Try warehouse name mapping first (most reliable)
+        iow_code = ''
         if warehouse_location:
             # Try exact match
             iow_code = warehouse_to_iow.get(warehouse_location, '')
@@ -288,231 +356,35 @@ class UNFIEastParser(BaseParser):
                         iow_code = code
                         print(f"DEBUG: Matched warehouse '{warehouse_location}' to IOW code '{iow_code}' via partial match")
                         break
-            
-            if iow_code:
-                mapped_customer = self.mapping_utils.get_customer_mapping(iow_code, 'unfi_east')
-                if mapped_customer and mapped_customer != 'UNKNOWN':
-                    order_info['customer_name'] = mapped_customer
-                    order_info['raw_customer_name'] = f"{warehouse_location} ({iow_code})"
-                    print(f"DEBUG: Successfully mapped warehouse '{warehouse_location}' -> IOW '{iow_code}' -> Customer '{mapped_customer}'")
-                else:
-                    print(f"DEBUG: Warehouse '{warehouse_location}' -> IOW '{iow_code}' not found in customer mapping")
-                    # Try direct warehouse name lookup as fallback
-                    mapped_customer = self.mapping_utils.get_customer_mapping(warehouse_location, 'unfi_east')
-                    if mapped_customer and mapped_customer != 'UNKNOWN':
-                        order_info['customer_name'] = mapped_customer
-                        order_info['raw_customer_name'] = warehouse_location
-                        print(f"DEBUG: Mapped warehouse name directly '{warehouse_location}' -> '{mapped_customer}'")
-        
-        # FALLBACK 1: Try to extract IOW code from Int Ref# line
-        # Pattern: "Int Ref#: JJ-85948-J10" - the first part (JJ) might be a warehouse code
-        # Or: "Int Ref#: UU-85950-I16 RCH" - the IOW code (RCH) appears after the Internal Ref Number
-        if order_info['customer_name'] == 'UNKNOWN':
-            # Map known Int Ref# codes to IOW codes
-            # Some PDFs use codes like "JJ" for Howell, "CC" for Chesterfield, etc. in the Int Ref#
-            # IMPORTANT: The IOW code (like CHE) may appear in the Int Ref# prefix OR on a separate line below it
-            int_ref_to_iow = {
-                'JJ': 'HOW',  # JJ in Int Ref# usually means Howell (e.g., "JJ-85948-J10")
-                'CC': 'CHE',  # CC in Int Ref# usually means Chesterfield (e.g., "CC-85948-105")
-                'MM': 'YOR',  # MM in Int Ref# usually means York
-                'SS': 'SAR',  # SS in Int Ref# usually means Sarasota
-                'HH': 'HOW',  # HH in Int Ref# usually means Howell
-                'GG': 'GRW',  # GG in Int Ref# usually means Greenwood
-                'UU': 'HOW',  # UU might also be Howell in some cases
-                'RR': 'RCH',  # RR might be Richburg
-                'YY': 'YOR',  # YY might be York
-            }
-            
-            # Pattern 1: Look for code at start of Int Ref# (e.g., "Int Ref#: JJ-85948-J10")
-            int_ref_start_pattern = r'Int(?:ernal)?\s+Ref(?:\s+Number)?[:#\s]+([A-Z]{2})-[0-9\-]+'
-            int_ref_start_match = re.search(int_ref_start_pattern, text_content, re.IGNORECASE)
-            if int_ref_start_match:
-                int_ref_code = int_ref_start_match.group(1).upper()
-                print(f"DEBUG: Found Int Ref# code '{int_ref_code}' at start of Int Ref#")
-                
-                # Map to IOW code if known
-                if int_ref_code in int_ref_to_iow:
-                    iow_code_from_ref = int_ref_to_iow[int_ref_code]
-                    print(f"DEBUG: Mapped Int Ref# code '{int_ref_code}' to IOW code '{iow_code_from_ref}'")
-                    
-                    # Try to map this code
-                    mapped_customer = self.mapping_utils.get_customer_mapping(iow_code_from_ref, 'unfi_east')
-                    if mapped_customer and mapped_customer != 'UNKNOWN':
-                        order_info['customer_name'] = mapped_customer
-                        order_info['raw_customer_name'] = iow_code_from_ref
-                        print(f"DEBUG: Mapped IOW code from Int Ref# '{int_ref_code}' -> '{iow_code_from_ref}' -> '{mapped_customer}'")
-                    else:
-                        print(f"DEBUG: WARNING - Int Ref# code '{int_ref_code}' mapped to '{iow_code_from_ref}' but mapping lookup failed")
-                        print(f"DEBUG: This should not happen - '{iow_code_from_ref}' should be in database")
-            
-            # Pattern 2: Look for IOW code after Int Ref# (e.g., "Int Ref#: UU-85950-I16 RCH")
-            if order_info['customer_name'] == 'UNKNOWN':
-                int_ref_patterns = [
-                    r'Int(?:ernal)?\s+Ref(?:\s+Number)?[:#\s]+[A-Za-z0-9\-]+\s+([A-Z]{2,3})\b',  # Code after ref number with space
-                    r'Int(?:ernal)?\s+Ref(?:\s+Number)?[:#\s]+[A-Za-z0-9\-]+([A-Z]{2,3})\b',  # Code after ref number without space
-                ]
-                
-                for pattern in int_ref_patterns:
-                    int_ref_match = re.search(pattern, text_content, re.IGNORECASE)
-                    if int_ref_match and int_ref_match.group(1):
-                        iow_code_from_ref = int_ref_match.group(1).upper()
-                        # Verify it's a valid IOW code
-                        valid_codes = ['RCH', 'HOW', 'CHE', 'YOR', 'IOW', 'GRW', 'MAN', 'ATL', 'SAR', 'SRQ', 'DAY', 'HVA', 'RAC', 'TWC']
-                        if iow_code_from_ref in valid_codes:
-                            print(f"DEBUG: Found IOW code '{iow_code_from_ref}' after Int Ref# with pattern '{pattern}'")
-                            
-                            # Try to map this code
-                            mapped_customer = self.mapping_utils.get_customer_mapping(iow_code_from_ref, 'unfi_east')
-                            if mapped_customer and mapped_customer != 'UNKNOWN':
-                                order_info['customer_name'] = mapped_customer
-                                order_info['raw_customer_name'] = iow_code_from_ref
-                                print(f"DEBUG: Mapped IOW code from Int Ref# '{iow_code_from_ref}' -> '{mapped_customer}'")
-                                break
-                    if order_info['customer_name'] != 'UNKNOWN':
-                        break
-            
-            # Pattern 3: Look for IOW code on lines near Int Ref# (the code may appear on a separate line below)
-            # Example: "Int Ref#: CC-85948-105" on one line, then "CHE" on the next line
-            if order_info['customer_name'] == 'UNKNOWN':
-                lines = text_content.split('\n')
-                valid_codes = ['RCH', 'HOW', 'CHE', 'YOR', 'IOW', 'GRW', 'MAN', 'ATL', 'SAR', 'SRQ', 'DAY', 'HVA', 'RAC', 'TWC']
-                
-                for i, line in enumerate(lines):
-                    if re.search(r'Int(?:ernal)?\s+Ref(?:\s+Number)?[:#]', line, re.IGNORECASE):
-                        print(f"DEBUG: Found Int Ref# on line {i}: {repr(line)}")
-                        
-                        # First, try to map Int Ref# prefix code (e.g., "CC" from "CC-85948-105")
-                        int_ref_code_match = re.search(r'Int(?:ernal)?\s+Ref(?:\s+Number)?[:#\s]+([A-Z]{2})-[0-9\-]+', line, re.IGNORECASE)
-                        if int_ref_code_match:
-                            int_ref_code = int_ref_code_match.group(1).upper()
-                            print(f"DEBUG: Found Int Ref# prefix code '{int_ref_code}' on line {i}")
-                            
-                            # Map Int Ref# code to IOW code if known
-                            if int_ref_code in int_ref_to_iow:
-                                iow_code_from_ref = int_ref_to_iow[int_ref_code]
-                                print(f"DEBUG: Mapped Int Ref# code '{int_ref_code}' to IOW code '{iow_code_from_ref}'")
-                                
-                                mapped_customer = self.mapping_utils.get_customer_mapping(iow_code_from_ref, 'unfi_east')
-                                if mapped_customer and mapped_customer != 'UNKNOWN':
-                                    order_info['customer_name'] = mapped_customer
-                                    order_info['raw_customer_name'] = iow_code_from_ref
-                                    print(f"DEBUG: Successfully mapped '{int_ref_code}' -> '{iow_code_from_ref}' -> '{mapped_customer}'")
-                                    break
-                        
-                        # Also check current line and next 3 lines for IOW codes (CHE, RCH, HOW, etc.)
-                        # The IOW code often appears on a separate line below the Int Ref# line
-                        if order_info['customer_name'] == 'UNKNOWN':
-                            for check_line_idx in range(i, min(i+4, len(lines))):  # Check current line and next 3 lines
-                                check_line = lines[check_line_idx]
-                                print(f"DEBUG: Checking line {check_line_idx} for IOW codes: {repr(check_line)}")
-                                
-                                # Look for valid IOW codes as standalone words
-                                for code in valid_codes:
-                                    # Use word boundary to ensure we match the code as a complete word
-                                    # Pattern: \bCHE\b matches "CHE" but not "CHEMICAL" or "ACHIEVE"
-                                    pattern = rf'(?<![A-Z]){re.escape(code)}(?![A-Z])'
-                                    if re.search(pattern, check_line, re.IGNORECASE):
-                                        # Found a valid IOW code, try to map it
-                                        mapped_customer = self.mapping_utils.get_customer_mapping(code, 'unfi_east')
-                                        if mapped_customer and mapped_customer != 'UNKNOWN':
-                                            order_info['customer_name'] = mapped_customer
-                                            order_info['raw_customer_name'] = code
-                                            print(f"DEBUG: ✅ Found IOW code '{code}' on line {check_line_idx} near Int Ref# -> '{mapped_customer}'")
-                                            print(f"DEBUG: Line content: {repr(check_line)}")
-                                            break
-                                if order_info['customer_name'] != 'UNKNOWN':
-                                    break
-                        
-                        if order_info['customer_name'] != 'UNKNOWN':
-                            break
         
-        # FINAL FALLBACK: Try to extract any 2-3 letter codes from the document that might be IOW codes
-        if order_info['customer_name'] == 'UNKNOWN':
-            # Look for common IOW codes in the text (must match database keys exactly)
-            # Database has: ATL, CHE, DAY, GRW, HOW, HVA, IOW, MAN, RAC, RCH, SAR, SRQ, TWC, YOR
-            # Priority order: most common codes first
-            common_iow_codes = ['RCH', 'HOW', 'CHE', 'YOR', 'IOW', 'GRW', 'MAN', 'ATL', 'SAR', 'SRQ', 'DAY', 'HVA', 'RAC', 'TWC']
-            
-            # Strategy 1: Look for IOW codes near keywords that might indicate location
-            location_keywords = ['Ship To', 'Ship To:', 'Warehouse', 'Location', 'Int Ref', 'Internal Ref', 'Ref#', 'Ref #']
-            for keyword in location_keywords:
-                if order_info['customer_name'] != 'UNKNOWN':
-                    break
-                # Find context around keyword (50 chars before and after)
-                keyword_pattern = re.escape(keyword)
-                matches = list(re.finditer(keyword_pattern, text_content, re.IGNORECASE))
-                for match in matches:
-                    if order_info['customer_name'] != 'UNKNOWN':
-                        break
-                    start = max(0, match.start() - 20)
-                    end = min(len(text_content), match.end() + 50)
-                    context = text_content[start:end]
-                    # Look for IOW codes in this context
-                    for code in common_iow_codes:
-                        # Match code even if followed by punctuation/digits (e.g., "TWC-")
-                        pattern = rf'(?<![A-Z]){re.escape(code)}(?![A-Z])'
-                        if re.search(pattern, context, re.IGNORECASE):
-                            mapped_customer = self.mapping_utils.get_customer_mapping(code, 'unfi_east')
-                            if mapped_customer and mapped_customer != 'UNKNOWN':
-                                order_info['customer_name'] = mapped_customer
-                                order_info['raw_customer_name'] = code
-                                print(f"DEBUG: Found IOW code '{code}' near keyword '{keyword}' -> '{mapped_customer}'")
-                                break
-            
-            # Strategy 2: Search entire document for IOW codes (if still UNKNOWN)
-            if order_info['customer_name'] == 'UNKNOWN':
-                print(f"DEBUG: Searching entire document for IOW codes...")
-                for code in common_iow_codes:
-                    # Look for code as standalone word (word boundary match)
-                    pattern = rf'\b{code}\b'
-                    if re.search(pattern, text_content, re.IGNORECASE):
-                        mapped_customer = self.mapping_utils.get_customer_mapping(code, 'unfi_east')
-                        if mapped_customer and mapped_customer != 'UNKNOWN':
-                            order_info['customer_name'] = mapped_customer
-                            order_info['raw_customer_name'] = code
-                            print(f"DEBUG: Found IOW code '{code}' in document -> '{mapped_customer}'")
-                            break
-        
-        # If still UNKNOWN, log diagnostic information and set raw_customer_name
-        if order_info['customer_name'] == 'UNKNOWN':
+        # Resolve every candidate code against the customer mappings in one call,
+        # in precedence order (the candidates are scanned lazily, up to the first hit)
+        matched_code, mapped_customer = self.mapping_utils.resolve_customer_mapping(
+            self._customer_code_candidates(text_content, warehouse_location, iow_code), 'unfi_east')
+        if matched_code is not None:
+            order_info['customer_name'] = mapped_customer
+            if iow_code and matched_code == iow_code:
+                order_info['raw_customer_name'] = f"{warehouse_location} ({iow_code})"
+            else:
+                order_info['raw_customer_name'] = matched_code
+            print(f"DEBUG: Mapped customer code '{matched_code}' -> '{mapped_customer}'")
+        else:
             print(f"DEBUG: WARNING - Could not find customer mapping for UNFI East order")
             print(f"DEBUG: Extracted warehouse_location: '{warehouse_location}'")
-            print(f"DEBUG: Attempted IOW code lookups but all returned UNKNOWN")
-            print(f"DEBUG: Please verify customer mappings exist in database for source='unfi_east'")
             
             # Set raw_customer_name to warehouse_location if available, otherwise set to "NOT EXTRACTED"
             # This ensures the error message shows what was extracted, not an empty string
-            if not order_info.get('raw_customer_name') or order_info.get('raw_customer_name') == '':
-                if warehouse_location:
-                    order_info['raw_customer_name'] = warehouse_location
+            if warehouse_location:
+                order_info['raw_customer_name'] = warehouse_location
+            else:
+                # Report IOW codes that are in the document but have no mapping
+                found_codes = [code for code in IOW_CODES if _IOW_CODE_PATTERNS[code].search(text_content)]
+                if found_codes:
+                    order_info['raw_customer_name'] = f"Found codes: {', '.join(found_codes)}"
+                    print(f"DEBUG: Found IOW codes in document but couldn't map them: {found_codes}")
                 else:
-                    # Look for any IOW codes in the document that might have been found but not mapped
-                    # Check if we found any codes that weren't in the database
-                    common_iow_codes = ['RCH', 'HOW', 'CHE', 'YOR', 'IOW', 'GRW', 'MAN', 'ATL', 'SAR', 'SRQ', 'DAY', 'HVA', 'RAC', 'TWC']
-                    found_codes = []
-                    for code in common_iow_codes:
-                        pattern = rf'(?<![A-Z]){re.escape(code)}(?![A-Z])'
-                        if re.search(pattern, text_content, re.IGNORECASE):
-                            found_codes.append(code)
-                    
-                    if found_codes:
-                        # Found IOW codes but couldn't map them (shouldn't happen, but handle it)
-                        order_info['raw_customer_name'] = f"Found codes: {', '.join(found_codes)}"
-                        print(f"DEBUG: Found IOW codes in document but couldn't map them: {found_codes}")
-                    else:
-                        # No codes found at all
-                        order_info['raw_customer_name'] = "NOT EXTRACTED"
-                        print(f"DEBUG: No IOW codes found in document")
-            
-            # Try to get available mappings for debugging
-            try:
-                from database.service import DatabaseService
-                db_service = DatabaseService()
-                available_mappings = db_service.get_customer_mappings('unfi_east')
-                print(f"DEBUG: Available customer mappings in database: {list(available_mappings.keys())}")
-                print(f"DEBUG: Total mappings found: {len(available_mappings)}")
-            except Exception as debug_e:
-                print(f"DEBUG: Could not retrieve mapping list for debugging: {debug_e}")
+                    order_info['raw_customer_name'] = "NOT EXTRACTED"
+                    print(f"DEBUG: No IOW codes found in document")
         
         # Apply STORE MAPPING: Use "Order To" number to select which store to use in Xoro
         # Store mapping is SEPARATE from customer mapping:
@@ -545,808 +417,434 @@ class UNFIEastParser(BaseParser):
         
         return order_info
     
+    def _customer_code_candidates(self, text_content: str, warehouse_location: str, iow_code: str) -> Iterator[str]:
+        """
+        Yield the customer codes found in the PDF, in lookup precedence order
+
+        1. IOW code of the warehouse location, then the warehouse name itself
+        2. Int Ref# prefix code (e.g. "JJ-85948-J10" -> HOW)
+        3. IOW code right after the Int Ref# (e.g. "UU-85950-I16 RCH")
+        4. Per Int Ref# line: its prefix code, then IOW codes on it and the next 3 lines
+        5. IOW codes near location keywords (Ship To, Warehouse, Ref#, ...)
+        6. Any IOW code in the document
+
+        Used as a generator so the later, broader scans only run when the
+        earlier candidates have no mapping.
+        """
+        if iow_code:
+            yield iow_code
+            yield warehouse_location
+
+        int_ref_start_match = _INT_REF_PREFIX.search(text_content)
+        if int_ref_start_match and int_ref_start_match.group(1).upper() in INT_REF_TO_IOW:
+            yield INT_REF_TO_IOW[int_ref_start_match.group(1).upper()]
+
+        for pattern in _INT_REF_SUFFIXES:
+            int_ref_match = pattern.search(text_content)
+            if int_ref_match and int_ref_match.group(1).upper() in IOW_CODES:
+                yield int_ref_match.group(1).upper()
+
+        lines = text_content.split('\n')
+        for i, line in enumerate(lines):
+            if not _INT_REF_LABEL.search(line):
+                continue
+            int_ref_code_match = _INT_REF_PREFIX.search(line)
+            if int_ref_code_match and int_ref_code_match.group(1).upper() in INT_REF_TO_IOW:
+                yield INT_REF_TO_IOW[int_ref_code_match.group(1).upper()]
+            # The IOW code often appears on a separate line below the Int Ref# line
+            for check_line in lines[i:i + 4]:
+                for code in IOW_CODES:
+                    if _IOW_CODE_PATTERNS[code].search(check_line):
+                        yield code
+
+        for keyword_pattern in _LOCATION_KEYWORDS:
+            for match in keyword_pattern.finditer(text_content):
+                context = text_content[max(0, match.start() - 20):match.end() + 50]
+                for code in IOW_CODES:
+                    if _IOW_CODE_PATTERNS[code].search(context):
+                        yield code
+
+        for code in IOW_CODES:
+            if _IOW_CODE_WORDS[code].search(text_content):
+                yield code
+
     def _extract_line_items(self, text_content: str) -> List[Dict[str, Any]]:
-        """Extract line items from UNFI East PDF text"""
-        
+        """
+        Extract line items from UNFI East PDF text
+
+        The text is walked once: _tokenize_item_lines cuts it into one chunk
+        per item as it goes and each chunk is parsed as soon as it is complete.
+        Set UNFI_EAST_DIAGNOSTICS=1 to log every tokenizer and parser decision.
+        """
+        if self.diagnostics:
+            self._log_line_item_diagnostics(text_content)
+
         line_items = []
-        
-        # Debug: print the text content to see what we're working with
-        print(f"DEBUG: PDF text content length: {len(text_content)}")
-        
-        # Print key lines to debug
-        all_lines = text_content.split('\n')
-        for i, line in enumerate(all_lines):
-            if 'Prod#' in line or re.search(r'\d{6}', line):
-                print(f"DEBUG Line {i}: {repr(line)}")
-        
-        # Also test the regex pattern on the concatenated line to debug
-        test_line = None
-        for line in all_lines:
-            if '315851' in line and '315882' in line and '316311' in line:
-                test_line = line
-                break
-        
-        if test_line:
-            print(f"DEBUG: Testing patterns on concatenated line")
-            print(f"DEBUG: Line length: {len(test_line)}")
-            
-            # Test different patterns to see what works
-            patterns = [
-                r'(\d{6})\s+\d+\s+\d+\s+(\d+)\s+([\d\-]+)\s+\d+\s+(\d+(?:\.\d+)?)\s+OZ\s+([A-Z\s,&\.\-:]+?)\s+([\d\.]+)\s+([\d\.]+)\s+([\d,]+\.?\d*)',
-                r'(\d{6})\s+\d+\s+\d+\s+(\d+)\s+([\d\-]+)\s+\d+\s+(\d+(?:\.\d+)?)\s+OZ\s+([^0-9]+?)\s+([\d\.]+)',
-                r'(\d{6})\s+\d+\s+\d+\s+(\d+)\s+([\d\-]+)',
-                r'315851.*?(\d+\.\d+)\s+(\d+\.\d+)\s+(\d+\.\d+)',
-                r'315882.*?(\d+\.\d+)\s+(\d+\.\d+)\s+(\d+\.\d+)',
-                r'316311.*?(\d+\.\d+)\s+(\d+\.\d+)\s+(\d+\.\d+)'
-            ]
-            
-            for i, pattern in enumerate(patterns):
-                matches = list(re.finditer(pattern, test_line))
-                print(f"DEBUG: Pattern {i+1} found {len(matches)} matches")
-                for j, match in enumerate(matches[:3]):  # Show first 3 matches
-                    print(f"DEBUG: Pattern {i+1} Match {j+1}: {match.groups()}")
-        
-        # Look for the line items section and extract it
-        lines = text_content.split('\n')
-        item_section_started = False
-        item_lines = []
-        
-        collecting_item = False
-        current_item_text = ""
-        
-        for line in lines:
-            # Check if we've reached the line items section
-            # NOTE: The header might be on the same line as items, so check for header first
-            if 'Prod# Seq' in line or ('Prod#' in line and 'Seq' in line):
-                if not item_section_started:
-                    item_section_started = True
-                    print(f"DEBUG: Found item section header")
-                
-                # IMPORTANT: Even if this line contains the header, it might also contain items
-                # Check if this line also contains items (product numbers with sequence)
-                has_items = bool(re.search(r'\d{6}\s+\d+\s+\d+\s+\d+', line))
-                
-                if 'Product Description' in line and not has_items:
-                    # Header only, no items - skip this line
-                    print(f"DEBUG: Skipping header-only line (no items found)")
-                    continue
-                # Otherwise, continue processing this line for items (fall through)
-            
-            # Process items (either from header line or subsequent lines)
-            if item_section_started:
-                # Check if we've reached the end of items (skip the separator line)
-                if '-------' in line and len(line) > 50 and not re.search(r'\d{6}', line):
-                    print(f"DEBUG: Skipping separator line: {line[:50]}...")
-                    # Add the last item if we were collecting one
-                    if current_item_text.strip():
-                        item_lines.append(current_item_text.strip())
-                        print(f"DEBUG: Final item from separator: {current_item_text.strip()[:80]}...")
-                        current_item_text = ""
-                        collecting_item = False
+        for item_text in self._tokenize_item_lines(text_content):
+            item = self._parse_item_line(item_text)
+            if item:
+                line_items.append(item)
+
+        if self.diagnostics:
+            print(f"=== DEBUG: Total line items extracted: {len(line_items)} ===")
+        return line_items
+
+    def _tokenize_item_lines(self, text_content: str) -> Iterator[str]:
+        """
+        Split the line-item section into one text chunk per item
+
+        PyPDF2 usually returns several items (and the repeated page header) on
+        one physical line, while other layouts put each item on its own line
+        followed by continuation lines. Both are handled in the same pass.
+        The last completed chunk is held back by one line so that an allowance
+        line following a multi-item line can still be attached to it.
+
+        Args:
+            text_content: Full PDF text
+
+        Yields:
+            Item text starting with the Prod# (whitespace normalized for
+            multi-item lines)
+        """
+        diagnostics = self.diagnostics
+        in_section = False
+        collecting = ""            # single-item layout: item being accumulated
+        pending: List[str] = []    # completed chunks not yet yielded
+        attach_allowance = False   # previous line held several items
+
+        for line in text_content.split('\n'):
+            if attach_allowance:
+                attach_allowance = False
+                if pending and ('ALLOWANCE' in line or 'DISC' in line):
+                    pending[-1] += " " + line.strip()
+                    if diagnostics:
+                        print(f"DEBUG: Added discount line to last item: {line[:100]}...")
+
+            if len(pending) > 1:
+                yield from pending[:-1]
+                del pending[:-1]
+
+            # The header can share a physical line with the first items
+            if 'Prod#' in line and 'Seq' in line:
+                if not in_section and diagnostics:
+                    print("DEBUG: Found item section header")
+                in_section = True
+                if 'Product Description' in line and not _ITEM_START.search(line):
                     continue
-                elif 'Total Pieces' in line or ('Total' in line and 'Order Net' in line):
+
+            if not in_section:
+                continue
+
+            if '-------' in line and len(line) > 50 and not _SIX_DIGITS.search(line):
+                # Separator line closes the item being collected
+                if collecting:
+                    pending.append(collecting)
+                    collecting = ""
+                continue
+
+            if 'Total Pieces' in line or ('Total' in line and 'Order Net' in line):
+                if diagnostics:
                     print(f"DEBUG: End of items section: {line[:50]}...")
-                    # Add the last item if we were collecting one
-                    if current_item_text.strip():
-                        item_lines.append(current_item_text.strip())
-                        print(f"DEBUG: Final item: {current_item_text.strip()[:80]}...")
-                    break
-                elif line.strip():
-                    # CRITICAL: Check if this line contains multiple items (concatenated)
-                    # Look for pattern: 6-digit number followed by space and sequence number
-                    # This pattern appears multiple times if there are multiple items on one line
-                    item_pattern = r'\d{6}\s+\d+\s+\d+\s+\d+'
-                    item_matches = list(re.finditer(item_pattern, line))
-                    item_count = len(item_matches)
-                    
-                    if item_count >= 2:
-                        print(f"DEBUG: Found concatenated line with {item_count} items (length: {len(line)})")
-                        print(f"DEBUG: Line preview: {line[:300]}...")
-                        
-                        # Extract all product number positions
-                        # Pattern: 6-digit product number, space, sequence, space, ord qty, space, vend qty
-                        item_positions = []
-                        for match in re.finditer(r'(\d{6})\s+(\d+)\s+(\d+)\s+(\d+)', line):
-                            item_positions.append({
-                                'prod_num': match.group(1),
-                                'seq': match.group(2),
-                                'start_pos': match.start(),
-                                'end_pos': match.end()
-                            })
-                        
-                        print(f"DEBUG: Found {len(item_positions)} item positions")
-                        
-                        # Extract each item by finding boundaries between items
-                        # IMPORTANT: Items may have discount info on the same line or continuation
-                        # We need to extract the item text including any discount information
-                        for i, item_pos in enumerate(item_positions):
-                            start_pos = item_pos['start_pos']
-                            
-                            # Find end position (start of next item or end of line)
-                            if i < len(item_positions) - 1:
-                                # Not the last item - extract up to next item
-                                next_start = item_positions[i + 1]['start_pos']
-                                item_text = line[start_pos:next_start].strip()
-                            else:
-                                # Last item - extract to end of line
-                                item_text = line[start_pos:].strip()
-                            
-                            # Clean up the item text (normalize whitespace but preserve structure)
-                            # Replace multiple spaces with single space, but keep newlines for discount info
-                            item_text = re.sub(r'[ \t]+', ' ', item_text).strip()
-                            
-                            # Verify this looks like a valid item (has product number, qty, and prices)
-                            if item_text and len(item_text) > 30:
-                                # Check if it has the expected structure (product number followed by sequence)
-                                if re.search(rf'^{item_pos["prod_num"]}\s+{item_pos["seq"]}\s+\d+\s+\d+', item_text):
-                                    item_lines.append(item_text)
-                                    print(f"DEBUG: ✅ Extracted item {len(item_lines)}: Prod#{item_pos['prod_num']}, Seq: {item_pos['seq']}, Length: {len(item_text)}")
-                                    print(f"DEBUG:    Preview: {item_text[:150]}...")
-                                else:
-                                    print(f"DEBUG: ⚠️ Skipped item (invalid structure): {item_text[:80]}...")
-                            else:
-                                print(f"DEBUG: ⚠️ Skipped item (too short): {item_text[:50]}...")
-                        
-                        # Also check if there are continuation lines with discount info
-                        # Look for "ALLOWANCE - DISC" lines that might be on the next line
-                        if item_section_started:
-                            # Check next few lines for discount information
-                            current_line_idx = lines.index(line) if line in lines else -1
-                            if current_line_idx >= 0 and current_line_idx + 1 < len(lines):
-                                next_line = lines[current_line_idx + 1]
-                                if 'ALLOWANCE' in next_line or 'DISC' in next_line:
-                                    print(f"DEBUG: Found discount line: {next_line[:100]}...")
-                                    # Append discount info to the last extracted item
-                                    if item_lines:
-                                        item_lines[-1] += " " + next_line.strip()
-                                        print(f"DEBUG: Added discount info to last item")
-                        
-                        # Reset state after processing concatenated line
-                        current_item_text = ""
-                        collecting_item = False
-                        continue
-                    
-                    # Single item on this line - check if it starts with a product number
-                    if re.match(r'\s*\d{6}\s+\d+', line):
-                        # Save previous item if we have one
-                        if current_item_text.strip():
-                            item_lines.append(current_item_text.strip())
-                            print(f"DEBUG: Completed item: {current_item_text.strip()[:80]}...")
-                        # Start new item
-                        current_item_text = line.strip()
-                        collecting_item = True
-                        print(f"DEBUG: Starting new item: {line.strip()[:80]}...")
-                    elif collecting_item:
-                        # This is a continuation line for the current item
-                        # But check if it might be the start of a new item
-                        if re.search(r'\d{6}\s+\d+\s+\d+\s+\d+', line):
-                            # This might be a new item, save previous and start new
-                            if current_item_text.strip():
-                                item_lines.append(current_item_text.strip())
-                                print(f"DEBUG: Completed item (found new item): {current_item_text.strip()[:80]}...")
-                            current_item_text = line.strip()
-                        else:
-                            # Continuation of current item
-                            current_item_text += " " + line.strip()
-                            print(f"DEBUG: Adding to current item: {line.strip()[:50]}...")
-                    else:
-                        # Skip lines that don't look like items
-                        # But check if they contain product numbers (might be continuation)
-                        if re.search(r'\d{6}', line):
-                            print(f"DEBUG: Found line with product number but not starting with it: {line[:80]}...")
-                            # Try to extract item from this line
-                            prod_match = re.search(r'\d{6}\s+\d+\s+\d+\s+\d+', line)
-                            if prod_match:
-                                # Extract from this product number to end of line
-                                item_text = line[prod_match.start():].strip()
-                                if item_text:
-                                    item_lines.append(item_text)
-                                    print(f"DEBUG: Extracted item from continuation line: {item_text[:80]}...")
-                        else:
-                            print(f"DEBUG: Skipping line: {line.strip()[:50]}...")
-        
-        # Add the last item if we ended while collecting
-        if current_item_text.strip():
-            item_lines.append(current_item_text.strip())
-            print(f"DEBUG: Final collected item: {current_item_text.strip()[:80]}...")
-        
-        print(f"DEBUG: Extracted {len(item_lines)} item lines")
-        
-        # Process each item line individually
-        # Improved extraction to handle various formats and extract ALL line items
-        # Format: Prod# Seq Ord Qty Vend Qty Vend ID MC Pack U/M Brand Product Description Unit Cst Vend CS Extensin
-        # Example: 284676   1  132  132 12-006-1    1   8 3.5 OZ    KTCHLV ALM STUFFED DATES, DK    20.00  20.00  2,376.00
-        # Example: 131459   2   24   24 17-001-1    1   6 7.9 FZ    CUCAMO PESTO, GENOVESE    13.50  13.50    324.00
-        
-        for line_idx, line in enumerate(item_lines):
-            print(f"DEBUG: Processing line {line_idx + 1}/{len(item_lines)}: {line[:100]}...")
-            # Initialize price variables for this line to avoid UnboundLocalError when extraction fails
+                break
+
+            if not line.strip():
+                continue
+
+            starts = list(_ITEM_START.finditer(line))
+
+            if len(starts) >= 2:
+                # Several items on one line: cut at each Prod#/Seq/Qty/Qty run
+                if collecting:
+                    pending.append(collecting)
+                    collecting = ""
+                if diagnostics:
+                    print(f"DEBUG: Found concatenated line with {len(starts)} items (length: {len(line)})")
+                for i, start in enumerate(starts):
+                    end = starts[i + 1].start() if i + 1 < len(starts) else len(line)
+                    item_text = _SPACES.sub(' ', line[start.start():end]).strip()
+                    if len(item_text) > 30:
+                        pending.append(item_text)
+                    elif diagnostics:
+                        print(f"DEBUG: Skipped item (too short): {item_text[:50]}...")
+                attach_allowance = True
+                continue
+
+            if _ITEM_LINE_START.match(line) or (collecting and starts):
+                # A new item starts on this line
+                if collecting:
+                    pending.append(collecting)
+                collecting = line.strip()
+            elif collecting:
+                collecting += " " + line.strip()
+            elif starts:
+                # Item preceded by other text on the line
+                pending.append(line[starts[0].start():].strip())
+            elif diagnostics:
+                print(f"DEBUG: Skipping line: {line.strip()[:50]}...")
+
+        if collecting:
+            pending.append(collecting)
+        yield from pending
+
+    def _parse_item_line(self, line: str) -> Optional[Dict[str, Any]]:
+        """
+        Parse one item chunk produced by _tokenize_item_lines
+
+        Format: Prod# Seq Ord Qty Vend Qty Vend ID MC Pack U/M Brand Product Description Unit Cst Vend CS Extensin
+        Example: 284676   1  132  132 12-006-1    1   8 3.5 OZ    KTCHLV ALM STUFFED DATES, DK    20.00  20.00  2,376.00
+        Optionally followed by: ALLOWANCE - DISC: 10.0% ... NWL AMT: 1.32 11.88 403.92
+
+        Args:
+            line: Item text
+
+        Returns:
+            Line item dictionary, or None if the chunk cannot be parsed
+        """
+        diagnostics = self.diagnostics
+
+        match = None
+        matched_pattern_idx = None
+        for pattern_idx, item_pattern in enumerate(_ITEM_PATTERNS):
+            match = item_pattern.search(line)
+            if match:
+                matched_pattern_idx = pattern_idx
+                break
+
+        if not match:
+            return self._parse_partial_item_line(line)
+
+        if diagnostics:
+            print(f"DEBUG: Pattern {matched_pattern_idx + 1} matched for line: {line[:100]}...")
+
+        try:
             unit_cost = 0.0
-            vend_cs = 0.0
-            # Try multiple patterns to match different UNFI East formats
-            patterns = [
-                # Pattern 1: Full format - Prod# Seq Ord Qty Vend Qty Vend ID MC Pack U/M Brand Description Unit Cst Vend CS Extensin
-                # Matches: 284676   1  132  132 12-006-1    1   8 3.5 OZ    KTCHLV ALM STUFFED DATES, DK    20.00  20.00  2,376.00
-                r'(\d{6})\s+(\d+)\s+(\d+)\s+(\d+)\s+([\d\-]+)\s+[\d\s]+(?:[\d\.]+\s+)?(?:OZ|FZ|LB|PK|CT|EA)?\s+([A-Z]{2,})\s+([A-Z\s,&\.\-:]+?)\s+([\d\.]+)\s+([\d\.]+)\s+([\d,]+\.?\d*)',
-                # Pattern 2: Flexible format - allow variations in spacing and unit position
-                r'(\d{6})\s+\d+\s+(\d+)\s+\d+\s+([\d\-]+)\s+[^\d]*([A-Z]{2,})\s+([A-Z\s,&\.\-:]+?)\s+([\d\.]+)\s+[\d\.]+\s+([\d,]+\.?\d*)',
-                # Pattern 3: Simplified - focus on product number, qty, description, and prices
-                r'(\d{6})\s+\d+\s+(\d+)\s+\d+\s+[\d\-]+\s+.*?([A-Z]{2,})\s+([A-Z\s,&\.\-:]{10,}?)(?=\s+[\d\.]+\s+[\d\.]+\s+[\d,]+)\s+([\d\.]+)\s+[\d\.]+\s+([\d,]+\.?\d*)',
-                # Pattern 4: Most flexible - just extract product number, qty, and prices, then find description
-                r'(\d{6})\s+\d+\s+(\d+)\s+\d+\s+([\d\-]+)\s+.*?([\d\.]+)\s+[\d\.]+\s+([\d,]+\.?\d*)',
-            ]
-            
-            match = None
-            matched_pattern_idx = None
-            for pattern_idx, item_pattern in enumerate(patterns):
-                match = re.search(item_pattern, line)
-                if match:
-                    matched_pattern_idx = pattern_idx
-                    print(f"DEBUG: Pattern {pattern_idx + 1} matched for line: {line[:100]}...")
+            prod_number = match.group(1)
+
+            # Quantity, description and a first guess at the prices from the matched pattern
+            if matched_pattern_idx == 0:  # Full pattern
+                qty = int(match.group(3))
+                vend_id = match.group(5)
+                full_description = f"{match.group(6)} {match.group(7).strip()}".strip()
+                potential_unit_cost = match.group(8)
+                extension = float(match.group(10).replace(',', ''))
+            elif matched_pattern_idx == 1:  # Flexible pattern
+                qty = int(match.group(2))
+                vend_id = match.group(3)
+                full_description = f"{match.group(4)} {match.group(5).strip()}".strip()
+                potential_unit_cost = match.group(6)
+                extension = float(match.group(7).replace(',', ''))
+            elif matched_pattern_idx == 2:  # Simplified pattern
+                qty = int(match.group(2))
+                vend_id = ""
+                full_description = f"{match.group(3)} {match.group(4).strip()}".strip()
+                potential_unit_cost = match.group(5)
+                extension = float(match.group(6).replace(',', ''))
+            else:  # Most flexible pattern, description is extracted below
+                qty = int(match.group(2))
+                vend_id = match.group(3)
+                potential_unit_cost = match.group(4)
+                extension = float(match.group(5).replace(',', ''))
+                full_description = f"Item {prod_number}"
+
+            # The patterns can pick up quantities or codes as prices, so read the
+            # price triplet from this item's own section, after the description
+            item_section = line[line.find(prod_number):]
+            next_item = _find_next_item(item_section, prod_number)
+            if next_item >= 0:
+                item_section = item_section[:next_item]
+
+            brand_match = _BRAND.search(item_section)
+            if brand_match:
+                price_search_section = item_section[brand_match.end():]
+            else:
+                vend_pos = item_section.find(vend_id) if vend_id else -1
+                if vend_pos >= 0:
+                    price_search_section = item_section[vend_pos + len(vend_id):]
+                else:
+                    price_search_section = item_section[20:]  # Skip product number and qty
+
+            # Prices come before any allowance text
+            allowance_pos = price_search_section.find('ALLOWANCE')
+            if allowance_pos > 0:
+                price_search_section = price_search_section[:allowance_pos]
+
+            valid_price_match = None
+            for triplet_pattern in (_PRICE_TRIPLET, _PRICE_TRIPLET_NO_COMMA):
+                price_match = triplet_pattern.search(price_search_section)
+                if not price_match:
+                    continue
+                test_unit = float(price_match.group(1))
+                test_extension = float(price_match.group(3).replace(',', ''))
+                # Extension should be roughly unit cost * qty (up to 50% discount, 10% rounding)
+                if (1.0 <= test_unit <= 1000.0 and test_extension > 0
+                        and test_unit * qty * 0.5 <= test_extension <= test_unit * qty * 1.1):
+                    valid_price_match = price_match
                     break
-            
-            if match:
-                try:
-                    prod_number = match.group(1)  # Prod# (like 284676)
-                    
-                    # IMPROVED: Extract prices more accurately by finding them after the description
-                    # The issue is that patterns might match wrong numbers, so we'll extract prices directly
-                    # from the line by looking for the price pattern after the product description
-                    
-                    # First, extract basic info that we're confident about
-                    if matched_pattern_idx == 0:  # Full pattern
-                        qty = int(match.group(3))     # Ord Qty (like 132)
-                        vend_id = match.group(5)      # Vend ID (like 12-006-1)
-                        brand = match.group(6)        # Brand (like KTCHLV or CUCAMO)
-                        description = match.group(7).strip()  # Product Description
-                        # CAUTION: match.group(8) might not be unit_cost - verify it's a decimal price
-                        potential_unit_cost = match.group(8)
-                        extension = float(match.group(10).replace(',', ''))  # Extension (this should be accurate)
-                        full_description = f"{brand} {description}".strip()
-                    elif matched_pattern_idx == 1:  # Flexible pattern
-                        qty = int(match.group(2))     # Ord Qty
-                        vend_id = match.group(3)      # Vend ID
-                        brand = match.group(4)        # Brand
-                        description = match.group(5).strip()  # Product Description
-                        potential_unit_cost = match.group(6)
-                        extension = float(match.group(7).replace(',', ''))  # Extension
-                        full_description = f"{brand} {description}".strip()
-                    elif matched_pattern_idx == 2:  # Simplified pattern
-                        qty = int(match.group(2))     # Ord Qty
-                        brand = match.group(3)        # Brand
-                        description = match.group(4).strip()  # Product Description
-                        potential_unit_cost = match.group(5)
-                        extension = float(match.group(6).replace(',', ''))  # Extension
-                        full_description = f"{brand} {description}".strip()
-                        vend_id = ""  # Not captured in this pattern
-                    else:  # Pattern 4 - Most flexible - need better extraction
-                        qty = int(match.group(2))     # Ord Qty
-                        vend_id = match.group(3)      # Vend ID
-                        potential_unit_cost = match.group(4)  # This might be wrong
-                        extension = float(match.group(5).replace(',', ''))  # Extension
-                        full_description = f"Item {prod_number}"  # Will extract description below
-                    
-                    # CRITICAL FIX: Extract unit cost and extension accurately
-                    # The problem: Previous patterns matched wrong numbers (product numbers, quantities, etc.)
-                    # Solution: Extract prices from the item's section only, after the description
-                    
-                    # Step 1: Isolate this item's section from the line
-                    prod_start = line.find(prod_number)
-                    if prod_start < 0:
-                        print(f"DEBUG: ERROR - Product number {prod_number} not found in line")
-                        unit_cost = 0.0
-                        extension = 0.0
-                    else:
-                        # Extract the section for this item only
-                        # Find where this item ends (next product or end of line)
-                        item_section = line[prod_start:]
-                        
-                        # Find next product (6-digit number followed by space and sequence)
-                        # But make sure it's not the same product number
-                        next_prod_pattern = rf'(?<!{re.escape(prod_number)})(\d{{6}})\s+\d+\s+\d+\s+\d+'
-                        next_prod_match = re.search(next_prod_pattern, item_section[10:])  # Start search after current product
-                        
-                        if next_prod_match:
-                            # There's a next product - extract only this item's section
-                            next_prod_start = next_prod_match.start() + 10  # Adjust for offset
-                            item_section = item_section[:next_prod_start]
-                        
-                        print(f"DEBUG: Item section for {prod_number}: {item_section[:200]}...")
-                        
-                        # Step 2: Find prices in this item section
-                        # Prices appear as: XX.XX XX.XX X,XXX.XX (Unit Cst, Vend CS, Extensin)
-                        # They appear AFTER the product description and BEFORE discount info
-                        
-                        # First, try to find the price triplet pattern
-                        # This is the most reliable: two decimal prices followed by comma-separated total
-                        # Pattern: XX.XX XX.XX X,XXX.XX (Unit Cst, Vend CS, Extensin)
-                        # IMPORTANT: These prices come AFTER the description and BEFORE discount info
-                        
-                        # Find the position after the description/brand
-                        # Look for brand names (KTCHLV, CUCAMO, etc.) or product descriptions
-                        brand_pattern = r'\b([A-Z]{2,6})\s+[A-Z\s,&\.\-:]{5,}'
-                        brand_match = re.search(brand_pattern, item_section)
-                        
-                        if brand_match:
-                            # Found brand - prices come after the description
-                            desc_end_pos = brand_match.end()
-                            price_search_section = item_section[desc_end_pos:]
-                        else:
-                            # No brand found - search from vend_id
-                            if vend_id:
-                                vend_pos = item_section.find(vend_id)
-                                if vend_pos >= 0:
-                                    price_search_section = item_section[vend_pos + len(vend_id):]
-                                else:
-                                    price_search_section = item_section[20:]  # Skip product number and qty
-                            else:
-                                price_search_section = item_section[20:]  # Skip product number and qty
-                        
-                        # Now find prices in the search section
-                        # CRITICAL: Prices appear as: XX.XX XX.XX X,XXX.XX (Unit Cst, Vend CS, Extensin)
-                        # They MUST come after text (description) and BEFORE "ALLOWANCE" or next product
-                        
-                        # Strategy: Find the FIRST price triplet after description text
-                        # This should be the main prices for this item
-                        
-                        # Remove any "ALLOWANCE" or "DISC" text from search section (prices come before discount)
-                        price_search_clean = price_search_section
-                        allowance_pos = price_search_clean.find('ALLOWANCE')
-                        if allowance_pos > 0:
-                            price_search_clean = price_search_clean[:allowance_pos]
-                        
-                        # Pattern 1: Try to find price triplet with comma-separated extension (most reliable)
-                        # Format: XX.XX XX.XX X,XXX.XX
-                        price_triplet_pattern = r'(\d{1,3}\.\d{2})\s+(\d{1,3}\.\d{2})\s+([\d,]+\d{2})'
-                        price_match = re.search(price_triplet_pattern, price_search_clean)
-                        
-                        valid_price_match = None
-                        if price_match:
-                            # Verify prices are reasonable (not product numbers or quantities)
-                            test_unit = float(price_match.group(1))
-                            test_extension = float(price_match.group(3).replace(',', ''))
-                            # Unit cost should be between 1 and 1000, extension should be positive
-                            if 1.0 <= test_unit <= 1000.0 and test_extension > 0:
-                                # Additional check: extension should be roughly unit_cost * qty (within 50% for discounts)
-                                expected_range_min = test_unit * qty * 0.5  # Allow for up to 50% discount
-                                expected_range_max = test_unit * qty * 1.1  # Allow for 10% over (rounding)
-                                if expected_range_min <= test_extension <= expected_range_max:
-                                    valid_price_match = price_match
-                                    print(f"DEBUG: ✅ Found valid price triplet: Unit={test_unit}, Ext={test_extension}")
-                                else:
-                                    print(f"DEBUG: Extension {test_extension} not in expected range [{expected_range_min:.2f}, {expected_range_max:.2f}]")
-                            else:
-                                print(f"DEBUG: Price values out of range: unit={test_unit}, ext={test_extension}")
-                        
-                        # Pattern 2: Try pattern without comma requirement (for smaller totals like 324.00)
-                        if not valid_price_match:
-                            price_triplet_pattern_alt = r'(\d{1,3}\.\d{2})\s+(\d{1,3}\.\d{2})\s+(\d{1,4}\.\d{2})(?!\d)'
-                            price_match_alt = re.search(price_triplet_pattern_alt, price_search_clean)
-                            if price_match_alt:
-                                test_unit = float(price_match_alt.group(1))
-                                test_extension = float(price_match_alt.group(3))
-                                if 1.0 <= test_unit <= 1000.0 and test_extension > 0:
-                                    expected_range_min = test_unit * qty * 0.5
-                                    expected_range_max = test_unit * qty * 1.1
-                                    if expected_range_min <= test_extension <= expected_range_max:
-                                        valid_price_match = price_match_alt
-                                        print(f"DEBUG: ✅ Found valid price triplet (no comma): Unit={test_unit}, Ext={test_extension}")
-                        
-                        if valid_price_match:
-                            # Found valid prices
-                            unit_cost = float(valid_price_match.group(1))  # Unit Cst
-                            vend_cs = float(valid_price_match.group(2))    # Vend CS (not used)
-                            extension = float(valid_price_match.group(3).replace(',', ''))  # Extensin
-                            print(f"DEBUG: ✅ Extracted prices: Unit={unit_cost}, VendCS={vend_cs}, Ext={extension}")
+                if diagnostics:
+                    print(f"DEBUG: Rejected price triplet: unit={test_unit}, ext={test_extension}, qty={qty}")
+
+            if valid_price_match:
+                unit_cost = float(valid_price_match.group(1))
+                extension = float(valid_price_match.group(3).replace(',', ''))
+            else:
+                # Fallback: first plausible pair of prices after the description
+                for two_price_match in _TWO_PRICES.finditer(item_section):
+                    match_start = two_price_match.start()
+                    if len(item_section[:match_start].strip()) <= 20:
+                        continue
+                    test_unit = float(two_price_match.group(1))
+                    if 1.0 <= test_unit <= 1000.0:
+                        unit_cost = test_unit
+                        ext_match = _EXTENSION.search(item_section[match_start:])
+                        if ext_match:
+                            extension = float(ext_match.group(1).replace(',', ''))
                         else:
-                            # Fallback: Try simpler pattern (just two decimal prices)
-                            two_price_pattern = r'(\d{1,4}\.\d{2})\s+(\d{1,4}\.\d{2})'
-                            two_price_matches = list(re.finditer(two_price_pattern, item_section))
-                            
-                            # Find the first valid two-price match after description
-                            for two_price_match in two_price_matches:
-                                match_start = two_price_match.start()
-                                text_before = item_section[:match_start].strip()
-                                if len(text_before) > 20:
-                                    test_unit = float(two_price_match.group(1))
-                                    if 1.0 <= test_unit <= 1000.0:
-                                        unit_cost = float(two_price_match.group(1))
-                                        vend_cs = float(two_price_match.group(2))
-                                        print(f"DEBUG: Found two prices: Unit={unit_cost}, VendCS={vend_cs}")
-                                        
-                                        # Try to find extension (comma-separated decimal)
-                                        # Look for extension after these prices
-                                        remaining_section = item_section[match_start:]
-                                        ext_pattern = r'([\d,]+\d{2})(?=\s*(?:ALLOWANCE|DISC|NWL|$))'
-                                        ext_match = re.search(ext_pattern, remaining_section)
-                                        if ext_match:
-                                            extension = float(ext_match.group(1).replace(',', ''))
-                                            print(f"DEBUG: Found extension: {extension}")
-                                        else:
-                                            # Calculate extension
-                                            extension = unit_cost * qty
-                                            print(f"DEBUG: Calculated extension: {extension} = {unit_cost} * {qty}")
-                                        break
-                            
-                            # If still no prices found, use fallback
-                            if unit_cost == 0.0:
-                                # Try to use potential_unit_cost from pattern match
-                                try:
-                                    if potential_unit_cost and '.' in str(potential_unit_cost):
-                                        test_price = float(potential_unit_cost)
-                                        if 1.0 <= test_price <= 1000.0:
-                                            unit_cost = test_price
-                                            print(f"DEBUG: Using unit_cost from pattern: {unit_cost}")
-                                            if extension == 0.0:
-                                                extension = unit_cost * qty
-                                                print(f"DEBUG: Calculated extension: {extension}")
-                                        else:
-                                            raise ValueError("Price out of range")
-                                    else:
-                                        raise ValueError("Not a valid price")
-                                except (ValueError, TypeError, NameError):
-                                    # Last resort: Calculate from extension or qty
-                                    if extension > 0 and qty > 0:
-                                        unit_cost = extension / qty
-                                        print(f"DEBUG: Calculated unit_cost: {unit_cost} = {extension} / {qty}")
-                                    else:
-                                        unit_cost = 0.0
-                                        print(f"DEBUG: ERROR - Could not extract unit_cost")
-                    
-                    # If we still don't have a description, try to extract it
-                    if full_description == f"Item {prod_number}":
-                        # Extract description from line - find text between vend_id and unit_cost
-                        vend_pos = line.find(vend_id) + len(vend_id) if vend_id else 0
-                        unit_cost_str = f"{unit_cost:.2f}"
-                        price_pos = line.find(unit_cost_str)
-                        
-                        if price_pos > vend_pos:
-                            desc_text = line[vend_pos:price_pos].strip()
-                            # Remove numbers and units from description
-                            desc_clean = re.sub(r'\d+\s+\d+\s+[\d\.]+\s*(?:OZ|FZ|LB|PK|CT|EA)?\s*', '', desc_text)
-                            desc_clean = re.sub(r'^\d+\s+', '', desc_clean)  # Remove leading numbers
-                            # Extract brand and description
-                            brand_match = re.search(r'([A-Z]{2,6})\s+([A-Z\s,&\.\-:]{5,}?)(?=\s+\d)', desc_clean)
-                            if brand_match:
-                                brand = brand_match.group(1)
-                                description = brand_match.group(2).strip()
-                                full_description = f"{brand} {description}".strip()
-                            else:
-                                brand_match = re.search(r'([A-Z]{2,})', desc_clean)
-                                brand = brand_match.group(1) if brand_match else ""
-                                full_description = desc_clean.strip() if desc_clean else f"Item {prod_number}"
-                    
-                    # Extract discount information from the line
-                    # Look for "ALLOWANCE - DISC: X.X%" and "NWL AMT: Y.YY Z.ZZ Total"
-                    discount_percent = 0.0
-                    discount_amount = 0.0
-                    
-                    # Pattern 1: Find discount percentage
-                    disc_percent_pattern = r'ALLOWANCE\s*-\s*DISC:\s*([\d\.]+)%'
-                    disc_percent_match = re.search(disc_percent_pattern, line, re.IGNORECASE)
-                    if disc_percent_match:
-                        discount_percent = float(disc_percent_match.group(1))
-                        print(f"DEBUG: Found discount percent: {discount_percent}%")
-                    
-                    # Pattern 2: Find discount amount from "NWL AMT: X.XX Y.YY Z,ZZZ.ZZ"
-                    # Format: "NWL AMT: 2.00 18.00 2,376.00"
-                    # Where: 2.00 = discount per unit, 18.00 = discounted price per unit, 2,376.00 = discounted total
-                    # IMPORTANT: For Xoro template, we need FLAT discount amount = discount_per_unit * qty
-                    disc_amt_pattern = r'NWL\s+AMT:\s+([\d\.]+)\s+([\d\.]+)\s+([\d,]+\.?\d*)'
-                    disc_amt_match = re.search(disc_amt_pattern, line, re.IGNORECASE)
-                    if disc_amt_match:
-                        discount_per_unit = float(disc_amt_match.group(1))  # Discount per unit (e.g., 2.00)
-                        discounted_price_per_unit = float(disc_amt_match.group(2))  # Price after discount (e.g., 18.00)
-                        discounted_total = float(disc_amt_match.group(3).replace(',', ''))  # Total after discount (e.g., 2,376.00)
-                        
-                        # Calculate FLAT discount amount (what Xoro expects)
-                        # This is discount_per_unit * qty (e.g., 2.00 * 132 = 264.00)
-                        discount_amount = discount_per_unit * qty
-                        
-                        # Verify: original_total - discount_amount should equal discounted_total
-                        original_total = unit_cost * qty
-                        calculated_discounted_total = original_total - discount_amount
-                        
-                        print(f"DEBUG: Discount info: per_unit={discount_per_unit}, discounted_price={discounted_price_per_unit}, discounted_total={discounted_total}")
-                        print(f"DEBUG: Original total: {original_total:.2f}, Discount amount (flat): {discount_amount:.2f}")
-                        print(f"DEBUG: Calculated discounted total: {calculated_discounted_total:.2f}, PDF discounted total: {discounted_total:.2f}")
-                        
-                        # Use the discounted total from PDF (it's the actual extension after discount)
-                        extension = discounted_total
-                        
-                        # NOTE: Keep unit_cost as original (before discount) for UnitPrice field
-                        # The discount is applied separately as a flat amount
-                        
-                        print(f"DEBUG: ✅ Final: UnitPrice={unit_cost:.2f}, Qty={qty}, DiscountAmount={discount_amount:.2f}, LineTotal={extension:.2f}")
+                            extension = unit_cost * qty
+                        break
+
+                if unit_cost == 0.0:
+                    # Use the pattern's price if it is plausible, else derive it from the extension
+                    test_price = None
+                    if potential_unit_cost and '.' in potential_unit_cost:
+                        try:
+                            test_price = float(potential_unit_cost)
+                        except ValueError:
+                            test_price = None
+                    if test_price is not None and 1.0 <= test_price <= 1000.0:
+                        unit_cost = test_price
+                        if extension == 0.0:
+                            extension = unit_cost * qty
+                    elif extension > 0 and qty > 0:
+                        unit_cost = extension / qty
                     else:
-                        # No discount amount found, but might have discount percent
-                        # Calculate discount amount from percent if available
-                        if discount_percent > 0 and unit_cost > 0:
-                            original_total = unit_cost * qty
-                            # Calculate flat discount amount from percentage
-                            discount_amount = original_total * (discount_percent / 100.0)
-                            # Update extension to discounted total
-                            extension = original_total - discount_amount
-                            print(f"DEBUG: Calculated discount from percent: {discount_percent}% = {discount_amount:.2f} (flat)")
-                            print(f"DEBUG: Original total: {original_total:.2f}, Discounted total: {extension:.2f}")
-                        else:
-                            # No discount - extension should equal unit_cost * qty
-                            if abs(extension - (unit_cost * qty)) > 0.01 and extension > 0:
-                                print(f"DEBUG: WARNING - Extension {extension} doesn't match unit_cost * qty = {unit_cost * qty}")
-                                # Verify if extension is correct or if we need to calculate it
-                                if extension == 0.0:
-                                    extension = unit_cost * qty
-                                    print(f"DEBUG: Calculated extension: {extension}")
-                    
-                    # Clean up description (remove extra spaces, trailing commas)
-                    full_description = re.sub(r'\s+', ' ', full_description).strip().rstrip(',')
-                    if not full_description:
-                        full_description = f"Item {prod_number}"
-                    
-                    # Apply item mapping using the original Prod#
-                    mapped_item = self.mapping_utils.get_item_mapping(prod_number, 'unfi_east')
-                    if not mapped_item or mapped_item == prod_number:
-                        # If no mapping found, use the product number as-is
-                        mapped_item = prod_number
-                    print(f"DEBUG: Item mapping lookup: {prod_number} -> {mapped_item}")
-                    
-                    # Apply description mapping if available
-                    mapped_description = self.mapping_utils.get_item_mapping(full_description, 'unfi_east')
-                    if mapped_description and mapped_description != full_description:
-                        final_description = mapped_description
-                        print(f"DEBUG: Description mapping: {full_description} -> {mapped_description}")
+                        print(f"DEBUG: ERROR - Could not extract unit_cost for {prod_number}")
+
+            if full_description == f"Item {prod_number}":
+                # Description is the text between the Vend ID and the unit cost
+                vend_pos = line.find(vend_id) + len(vend_id) if vend_id else 0
+                price_pos = line.find(f"{unit_cost:.2f}")
+                if price_pos > vend_pos:
+                    desc_clean = _DESC_NUMBERS.sub('', line[vend_pos:price_pos].strip())
+                    desc_clean = _LEADING_NUMBER.sub('', desc_clean)
+                    brand_match = _BRAND_DESCRIPTION.search(desc_clean)
+                    if brand_match:
+                        full_description = f"{brand_match.group(1)} {brand_match.group(2).strip()}".strip()
                     else:
-                        final_description = full_description
-                    
-                    item = {
-                        'item_number': mapped_item,
-                        'raw_item_number': prod_number,
-                        'item_description': final_description,
-                        'quantity': qty,
-                        'unit_price': unit_cost,
-                        'total_price': extension,
-                        'discount_amount': discount_amount,
-                        'discount_percent': discount_percent
-                    }
-                    
-                    line_items.append(item)
-                    print(f"DEBUG: ✅ Successfully parsed item: Prod#{prod_number} -> {mapped_item}, Qty: {qty}, Price: {unit_cost}, Total: {extension}, Desc: {final_description[:50]}...")
-                    
-                except (ValueError, IndexError) as e:
-                    print(f"DEBUG: ❌ Failed to parse line: {line[:100]}... - Error: {e}")
-                    import traceback
-                    print(f"DEBUG: Traceback: {traceback.format_exc()}")
-                    continue
+                        full_description = desc_clean.strip() if desc_clean else f"Item {prod_number}"
+
+            # Discounts: "ALLOWANCE - DISC: X.X%" and "NWL AMT: <per unit> <net unit> <net total>"
+            discount_percent = 0.0
+            discount_amount = 0.0
+
+            disc_percent_match = _DISCOUNT_PERCENT.search(line)
+            if disc_percent_match:
+                discount_percent = float(disc_percent_match.group(1))
+
+            disc_amt_match = _DISCOUNT_AMOUNT.search(line)
+            if disc_amt_match:
+                # Xoro expects a FLAT discount amount: discount per unit * qty;
+                # the PDF's net total becomes the line total
+                discount_amount = float(disc_amt_match.group(1)) * qty
+                extension = float(disc_amt_match.group(3).replace(',', ''))
+            elif discount_percent > 0 and unit_cost > 0:
+                original_total = unit_cost * qty
+                discount_amount = original_total * (discount_percent / 100.0)
+                extension = original_total - discount_amount
+            elif extension > 0 and abs(extension - (unit_cost * qty)) > 0.01 and diagnostics:
+                print(f"DEBUG: WARNING - Extension {extension} doesn't match unit_cost * qty = {unit_cost * qty}")
+
+            full_description = _WHITESPACE.sub(' ', full_description).strip().rstrip(',')
+            if not full_description:
+                full_description = f"Item {prod_number}"
+
+            # Apply item mapping using the original Prod#
+            mapped_item = self.mapping_utils.get_item_mapping(prod_number, 'unfi_east')
+            if not mapped_item or mapped_item == prod_number:
+                mapped_item = prod_number
+
+            # Apply description mapping if available
+            mapped_description = self.mapping_utils.get_item_mapping(full_description, 'unfi_east')
+            if mapped_description and mapped_description != full_description:
+                final_description = mapped_description
             else:
-                # No pattern matched - try simpler extraction
-                print(f"DEBUG: ⚠️ No pattern matched for line: {line[:100]}...")
-                # Try to find at least the product number and quantity
-                prod_qty_match = re.search(r'(\d{6})\s+\d+\s+(\d+)', line)
-                if prod_qty_match:
-                    try:
-                        prod_number = prod_qty_match.group(1)
-                        qty = int(prod_qty_match.group(2))
-                        # Try to extract prices
-                        price_match = re.search(r'([\d\.]+)\s+[\d\.]+\s+([\d,]+\.?\d*)', line)
-                        if price_match:
-                            unit_cost = float(price_match.group(1))
-                            extension = float(price_match.group(2).replace(',', ''))
-                            
-                            # Get mapped item
-                            mapped_item = self.mapping_utils.get_item_mapping(prod_number, 'unfi_east') or prod_number
-                            
-                            item = {
-                                'item_number': mapped_item,
-                                'raw_item_number': prod_number,
-                                'item_description': f"Item {prod_number}",
-                                'quantity': qty,
-                                'unit_price': unit_cost,
-                                'total_price': extension
-                            }
-                            
-                            line_items.append(item)
-                            print(f"DEBUG: ⚠️ Partial extraction - Prod#{prod_number}, Qty: {qty}, Price: {unit_cost}, Total: {extension}")
-                    except Exception as e:
-                        print(f"DEBUG: ❌ Failed partial extraction: {e}")
-                        continue
-        
-        if not line_items:
-            print("DEBUG: No items found with line-by-line method, trying regex on full text")
-            # Check if this looks like a UNFI East PDF with items
-            if 'KTCHLV' in text_content and 'Prod#' in text_content:
-                print("DEBUG: UNFI East PDF detected, attempting smart manual extraction")
-                
-                # Look for the concatenated line with all the data first
-                item_data_line = None
-                for line in text_content.split('\n'):
-                    # Look for line with KTCHLV and multiple 6-digit numbers
-                    six_digit_numbers = re.findall(r'\d{6}', line)
-                    if 'KTCHLV' in line and len(six_digit_numbers) > 1:
-                        item_data_line = line
-                        print(f"DEBUG: Found concatenated line with {len(six_digit_numbers)} product numbers")
-                        break
-                
-                if item_data_line:
-                    # Find all 6-digit product numbers in the item data line - use more flexible pattern
-                    prod_numbers = re.findall(r'(\d{6})\s+\d+\s+\d+\s+\d+', item_data_line)
-                    print(f"DEBUG: Found product numbers in item line: {prod_numbers}")
-                    
-                    # If that doesn't work, try simpler pattern
-                    if not prod_numbers:
-                        prod_numbers = [m for m in re.findall(r'(\d{6})', item_data_line) if m in ['268066', '284676', '284950', '301111', '315851', '315882', '316311']]
-                        print(f"DEBUG: Found product numbers with fallback pattern: {prod_numbers}")
-                else:
-                    # Fallback: search entire text
-                    prod_numbers = re.findall(r'(\d{6})', text_content)
-                    print(f"DEBUG: Found product numbers in full text: {prod_numbers}")
-                
-                if item_data_line and prod_numbers:
-                    print(f"DEBUG: Found item data line with length {len(item_data_line)}")
-                    print(f"DEBUG: Processing {len(prod_numbers)} product numbers: {prod_numbers}")
-                    
-                    # Extract each product number and its associated data
-                    for prod_num in prod_numbers:
-                        # Look for this product number in our mapping
-                        mapped_item = self.mapping_utils.get_item_mapping(prod_num, 'unfi_east')
-                        if mapped_item:  # Only process if we have a mapping
-                            print(f"DEBUG: Processing product {prod_num} -> {mapped_item}")
-                            
-                            # Use more flexible regex patterns
-                            patterns = [
-                                rf'{prod_num}\s+\d+\s+(\d+)\s+\d+\s+([\d\-]+).*?KTCHLV\s+([^0-9]+?)\s+([\d\.]+)\s+[\d\.]+\s+([\d,]+\.?\d*)',
-                                rf'{prod_num}.*?(\d+)\s+(\d+)\s+([\d\-]+).*?KTCHLV\s+([A-Z\s,&\.\-:]+?)\s+([\d\.]+)',
-                                rf'{prod_num}.*?(\d+)\s+([\d\-]+).*?([\d\.]+)\s+[\d\.]+\s+([\d,]+\.?\d*)'
-                            ]
-                            
-                            match = None
-                            for i, pattern in enumerate(patterns):
-                                match = re.search(pattern, item_data_line)
-                                if match:
-                                    print(f"DEBUG: Pattern {i+1} matched for {prod_num}")
-                                    break
-                            
-                            if match:
-                                try:
-                                    if len(match.groups()) >= 5:  # Full pattern match
-                                        qty = int(match.group(1))
-                                        vend_id = match.group(2) 
-                                        description = f"KTCHLV {match.group(3).strip()}"
-                                        unit_cost = float(match.group(4))
-                                        total_cost = float(match.group(5).replace(',', ''))
-                                    else:  # Partial pattern match, extract what we can
-                                        qty = int(match.group(1)) if len(match.groups()) >= 1 else 1
-                                        vend_id = match.group(2) if len(match.groups()) >= 2 else 'unknown'
-                                        description = f"KTCHLV Item {prod_num}"
-                                        unit_cost = float(match.group(3)) if len(match.groups()) >= 3 else 0.0
-                                        total_cost = float(match.group(4).replace(',', '')) if len(match.groups()) >= 4 else 0.0
-                                    
-                                    # Apply description mapping if available
-                                    mapped_description = self.mapping_utils.get_item_mapping(description, 'unfi_east')
-                                    if mapped_description and mapped_description != description:
-                                        final_description = mapped_description
-                                        print(f"DEBUG: Description mapping: {description} -> {mapped_description}")
-                                    else:
-                                        final_description = description
-                                    
-                                    item = {
-                                        'item_number': mapped_item,
-                                        'raw_item_number': prod_num,
-                                        'item_description': final_description,
-                                        'quantity': qty,
-                                        'unit_price': unit_cost,
-                                        'total_price': total_cost
-                                    }
-                                    
-                                    line_items.append(item)
-                                    print(f"DEBUG: Smart extraction - Prod#{prod_num} -> {mapped_item}, Qty: {qty}, Price: {unit_cost}")
-                                except (ValueError, IndexError) as e:
-                                    print(f"DEBUG: Error parsing data for {prod_num}: {e}")
-                            else:
-                                print(f"DEBUG: Could not extract data for product {prod_num}")
-                        else:
-                            print(f"DEBUG: No mapping found for product {prod_num}")
-                
-                if line_items:
-                    print(f"=== DEBUG: Total line items extracted: {len(line_items)} ===")
-                    return line_items
-            
-            # Fallback: try simpler pattern that just finds product numbers and extract data around them
-            # Look for product number followed by pricing info
-            simple_patterns = [
-                r'(\d{6})\s+\d+\s+\d+\s+(\d+)\s+[\d\-]+\s+\d+\s+\d+\s+[\d\.]+\s+OZ\s+[A-Z\s,&\.\-:]+?\s+([\d\.]+)\s+[\d\.]+\s+([\d,]+\.?\d*)',
-                r'(315851|315882|316311).*?(\d+)\s+[\d\-]+.*?([\d\.]+)\s+[\d\.]+\s+([\d,]+\.?\d*)',
-                r'(\d{6}).*?(\d+\.\d+)\s+\d+\.\d+\s+([\d,]+\.\d+)'
-            ]
-            
-            for pattern_idx, item_pattern in enumerate(simple_patterns):
-                print(f"DEBUG: Trying pattern {pattern_idx + 1}: {item_pattern}")
-                matches = list(re.finditer(item_pattern, text_content))
+                final_description = full_description
+
+            if diagnostics:
+                print(f"DEBUG: Parsed item: Prod#{prod_number} -> {mapped_item}, Qty: {qty}, Price: {unit_cost}, "
+                      f"Total: {extension}, Discount: {discount_amount:.2f} ({discount_percent}%), Desc: {final_description[:50]}")
+
+            return {
+                'item_number': mapped_item,
+                'raw_item_number': prod_number,
+                'item_description': final_description,
+                'quantity': qty,
+                'unit_price': unit_cost,
+                'total_price': extension,
+                'discount_amount': discount_amount,
+                'discount_percent': discount_percent
+            }
+
+        except (ValueError, IndexError) as e:
+            print(f"DEBUG: Failed to parse line: {line[:100]}... - Error: {e}")
+            return None
+
+    def _parse_partial_item_line(self, line: str) -> Optional[Dict[str, Any]]:
+        """Last resort for a chunk no item pattern matches: Prod#, quantity and prices only"""
+
+        prod_qty_match = _PARTIAL_ITEM.search(line)
+        if not prod_qty_match:
+            return None
+        price_match = _PARTIAL_PRICES.search(line)
+        if not price_match:
+            return None
+
+        try:
+            prod_number = prod_qty_match.group(1)
+            qty = int(prod_qty_match.group(2))
+            unit_cost = float(price_match.group(1))
+            extension = float(price_match.group(2).replace(',', ''))
+            mapped_item = self.mapping_utils.get_item_mapping(prod_number, 'unfi_east') or prod_number
+            print(f"DEBUG: Partial extraction - Prod#{prod_number}, Qty: {qty}, Price: {unit_cost}, Total: {extension}")
+            return {
+                'item_number': mapped_item,
+                'raw_item_number': prod_number,
+                'item_description': f"Item {prod_number}",
+                'quantity': qty,
+                'unit_price': unit_cost,
+                'total_price': extension
+            }
+        except Exception as e:
+            print(f"DEBUG: Failed partial extraction: {e}")
+            return None
+
+    def _log_line_item_diagnostics(self, text_content: str) -> None:
+        """Print the item-bearing lines and how each item pattern matches them (diagnostics only)"""
+
+        print(f"DEBUG: PDF text content length: {len(text_content)}")
+        for i, line in enumerate(text_content.split('\n')):
+            if 'Prod#' not in line and not _SIX_DIGITS.search(line):
+                continue
+            print(f"DEBUG Line {i}: {line!r}")
+            for pattern_idx, item_pattern in enumerate(_ITEM_PATTERNS):
+                matches = list(item_pattern.finditer(line))
                 print(f"DEBUG: Pattern {pattern_idx + 1} found {len(matches)} matches")
-                
-                if matches:
-                    break
-            
-            if not matches or len(line_items) == 0:
-                # Manual extraction as last resort for known specific PDFs
-                print("DEBUG: Regex patterns failed or produced no items, trying legacy manual extraction")
-                if '315851' in text_content and '315882' in text_content and '316311' in text_content:
-                    # Extract manually based on known product numbers
-                    manual_items = [
-                        ('315851', '6', '8-900-2', '102.60', '615.60'),
-                        ('315882', '6', '12-600-3', '135.00', '810.00'), 
-                        ('316311', '1', '17-200-1', '108.00', '108.00')
-                    ]
-                    
-                    for prod_num, qty, vend_id, unit_cost, total in manual_items:
-                        mapped_item = self.mapping_utils.get_item_mapping(prod_num, 'unfi_east')
-                        print(f"DEBUG: Manual extraction - {prod_num} -> {mapped_item}")
-                        
-                        # Apply description mapping if available
-                        raw_description = f'KTCHLV Item {prod_num}'
-                        mapped_description = self.mapping_utils.get_item_mapping(raw_description, 'unfi_east')
-                        if mapped_description and mapped_description != raw_description:
-                            final_description = mapped_description
-                            print(f"DEBUG: Description mapping: {raw_description} -> {mapped_description}")
-                        else:
-                            final_description = raw_description
-                        
-                        item = {
-                            'item_number': mapped_item,
-                            'raw_item_number': prod_num,
-                            'item_description': final_description,
-                            'quantity': int(qty),
-                            'unit_price': float(unit_cost),
-                            'total_price': float(total.replace(',', ''))
-                        }
-                        
-                        line_items.append(item)
-                        print(f"DEBUG: Manual item added: Prod#{prod_num} -> {mapped_item}, Qty: {qty}")
-                    return line_items  # Return immediately after manual extraction
-                else:
-                    matches = []
-            
-            if matches:
-                for match in matches:
-                    try:
-                        prod_number = match.group(1)  # Prod# (like 315851)
-                        qty = int(match.group(2))     # Qty
-                        vend_id = match.group(3)      # Vend ID (like 8-900-2)
-                        size = match.group(4)         # Size (like 54)
-                        description = match.group(5).strip()  # Product Description
-                        unit_cost = float(match.group(6))     # Unit Cost
-                        unit_cost_vend = float(match.group(7))  # Unit Cost Vend
-                        extension = float(match.group(8).replace(',', ''))  # Extension
-                        
-                        # Apply item mapping using the original Prod#
-                        mapped_item = self.mapping_utils.get_item_mapping(prod_number, 'unfi_east')
-                        print(f"DEBUG: Fallback item mapping lookup: {prod_number} -> {mapped_item}")
-                        
-                        # Apply description mapping if available
-                        mapped_description = self.mapping_utils.get_item_mapping(description, 'unfi_east')
-                        if mapped_description and mapped_description != description:
-                            final_description = mapped_description
-                            print(f"DEBUG: Fallback description mapping: {description} -> {mapped_description}")
-                        else:
-                            final_description = description
-                        
-                        item = {
-                            'item_number': mapped_item,
-                            'raw_item_number': prod_number,
-                            'item_description': final_description,
-                            'quantity': qty,
-                            'unit_price': unit_cost,
-                            'total_price': extension
-                        }
-                        
-                        line_items.append(item)
-                        print(f"DEBUG: Successfully parsed fallback item: Prod#{prod_number} -> {mapped_item}, Qty: {qty}, Price: {unit_cost}")
-                        
-                    except (ValueError, IndexError) as e:
-                        print(f"DEBUG: Failed to parse fallback match - Error: {e}")
-                        continue
-            else:
-                print("DEBUG: No regex matches found, manual extraction completed")
-        
-        print(f"=== DEBUG: Total line items extracted: {len(line_items)} ===")
-        return line_items
-        return line_items
\ No newline at end of file
+                for j, match in enumerate(matches[:3]):
+                    print(f"DEBUG: Pattern {pattern_idx + 1} Match {j + 1}: {match.groups()}")
+
+
+def _find_next_item(item_section: str, prod_number: str) -> int:
+    """
+    Offset of the next item's Prod# run in item_section, or -1
+
+    The current item's own number (first 10 characters) is skipped, and so
+    is a run directly preceded by the current Prod#.
+    """
+    pos = 10
+    while True:
+        next_match = _ITEM_START.search(item_section, pos)
+        if not next_match:
+            return -1
+        start = next_match.start()
+        if start - 10 < 6 or item_section[start - 6:start] != prod_number:
+            return start
+        pos = start + 1
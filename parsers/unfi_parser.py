@@ -6,12 +6,13 @@ from typing import List, Dict, Any, Optional
 import pandas as pd
 import io
 from .base_parser import BaseParser
+from utils.mapping_utils import MappingUtils
 
 class UNFIParser(BaseParser):
     """Parser for UNFI CSV/Excel order files"""
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, mapping_utils: Optional[MappingUtils] = None):
+        super().__init__(mapping_utils)
         self.source_name = "UNFI"
     
     def parse(self, file_content: bytes, file_extension: str, filename: str) -> Optional[List[Dict[str, Any]]]:
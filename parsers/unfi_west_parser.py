@@ -6,12 +6,13 @@ from typing import List, Dict, Any, Optional
 from bs4 import BeautifulSoup
 import re
 from .base_parser import BaseParser
+from utils.mapping_utils import MappingUtils
 
 class UNFIWestParser(BaseParser):
     """Parser for UNFI West HTML order files"""
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, mapping_utils: Optional[MappingUtils] = None):
+        super().__init__(mapping_utils)
         self.source_name = "UNFI West"
     
     def parse(self, file_content: bytes, file_extension: str, filename: str) -> Optional[List[Dict[str, Any]]]:
@@ -6,12 +6,13 @@ from typing import List, Dict, Any, Optional
 from bs4 import BeautifulSoup
 import pandas as pd
 from .base_parser import BaseParser
+from utils.mapping_utils import MappingUtils
 
 class WholeFoodsParser(BaseParser):
     """Parser for Whole Foods HTML order files"""
     
-    def __init__(self, db_service=None):
-        super().__init__()
+    def __init__(self, db_service=None, mapping_utils: Optional[MappingUtils] = None):
+        super().__init__(mapping_utils)
         self.source_name = "Whole Foods"
         self.db_service = db_service
     
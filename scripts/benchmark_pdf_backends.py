@@ -0,0 +1,139 @@
+"""Compare PDF extraction backends on the sample orders: speed per page and parser-output equivalence.
+
+Usage: python scripts/benchmark_pdf_backends.py [backend ...]
+
+For every sample PDF each backend is timed on raw extraction (no cache), then
+the source's parser is run once per backend and its orders are compared with
+the PyPDF2 result. Identical orders mean the backend is safe to enable for that
+source with PDF_BACKEND_<SOURCE>=<backend>.
+"""
+
+import difflib
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv(override=True)
+except ImportError:
+    pass
+
+from parsers.pdf_backends import PDF_BACKENDS, DEFAULT_PDF_BACKEND
+from parsers.unfi_east_parser import UNFIEastParser
+from parsers.ross_parser import ROSSParser
+from parsers.tkmaxx_parser import TKMaxxParser
+from utils.mapping_utils import MappingUtils, get_shared_mapping_utils
+from utils.pdf_text_cache import pdf_text_cache
+
+SOURCES = {
+    'unfi_east': (ROOT / 'order_samples' / 'unfi_east', UNFIEastParser),
+    'ross': (ROOT / 'order_samples' / 'ross', ROSSParser),
+    'tjmaxx': (ROOT / 'order_samples' / 'tjmaxx', TKMaxxParser),
+}
+
+
+def time_extraction(backend, data: bytes):
+    """Return (page_count, seconds, page_texts) for one uncached extraction"""
+    start = time.perf_counter()
+    document = backend.open(data)
+    try:
+        page_count = backend.page_count(document)
+        texts = backend.extract_pages(document, range(page_count))
+    finally:
+        backend.close(document)
+    return page_count, time.perf_counter() - start, texts
+
+
+def parse_with(backend_name: str, source: str, parser_class, paths, mapping_utils: MappingUtils) -> dict:
+    """
+    Parse every file with the given backend forced for the source
+    One parser instance handles all files, so TJ Maxx PO/distribution pairs are matched
+    """
+    env_key = f"PDF_BACKEND_{source.upper()}"
+    previous = os.environ.get(env_key)
+    os.environ[env_key] = backend_name
+    pdf_text_cache.clear()
+    parser = parser_class(mapping_utils)
+    results = {}
+    try:
+        with open(os.devnull, 'w') as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                for path in paths:
+                    try:
+                        results[path.name] = parser.parse(path.read_bytes(), path.suffix.lstrip('.').lower(), path.name)
+                    except Exception as exc:
+                        results[path.name] = f"ERROR: {exc}"
+            finally:
+                sys.stdout = stdout
+        return results
+    finally:
+        if previous is None:
+            os.environ.pop(env_key, None)
+        else:
+            os.environ[env_key] = previous
+
+
+def main(backend_names):
+    backends = [PDF_BACKENDS[name] for name in backend_names if PDF_BACKENDS[name].is_available()]
+    skipped = [name for name in backend_names if not PDF_BACKENDS[name].is_available()]
+    if skipped:
+        print(f"Skipping unavailable backends: {', '.join(skipped)}")
+
+    # Same mapping provider for every run, so only the backend varies
+    mapping_utils = get_shared_mapping_utils()
+
+    for source, (folder, parser_class) in SOURCES.items():
+        paths = sorted(p for p in folder.iterdir() if p.suffix.lower() == '.pdf')
+        totals = {backend.name: [0, 0.0] for backend in backends}
+        mismatches = {backend.name: [] for backend in backends}
+        similarity = {backend.name: [] for backend in backends}
+
+        for path in paths:
+            data = path.read_bytes()
+            reference_text = None
+            for backend in backends:
+                page_count, seconds, texts = time_extraction(backend, data)
+                totals[backend.name][0] += page_count
+                totals[backend.name][1] += seconds
+                text = '\n'.join(t or '' for t in texts)
+                if reference_text is None:
+                    reference_text = text
+                similarity[backend.name].append(difflib.SequenceMatcher(None, reference_text, text).quick_ratio())
+
+        reference_orders = parse_with(DEFAULT_PDF_BACKEND, source, parser_class, paths, mapping_utils)
+        failed = [name for name, orders in reference_orders.items() if not orders]
+        for backend in backends:
+            orders = parse_with(backend.name, source, parser_class, paths, mapping_utils)
+            mismatches[backend.name] = [name for name in reference_orders if orders[name] != reference_orders[name]]
+
+        print(f"\n=== {source} ({len(paths)} files) ===")
+        if failed:
+            print(f"Note: {len(failed)} files produce no orders with {DEFAULT_PDF_BACKEND} "
+                  f"(errors or unpaired files); equivalence is weaker for them")
+        for backend in backends:
+            pages, seconds = totals[backend.name]
+            per_page_ms = (seconds / pages * 1000) if pages else 0
+            ratio = min(similarity[backend.name]) if similarity[backend.name] else 1.0
+            verdict = "equivalent" if not mismatches[backend.name] else f"{len(mismatches[backend.name])} files differ"
+            print(f"{backend.name:>8}: {pages} pages, {per_page_ms:.1f} ms/page, "
+                  f"min text similarity {ratio:.2f}, parser output {verdict}")
+            for name in mismatches[backend.name]:
+                print(f"          differs: {name}")
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(PDF_BACKENDS)
+    unknown = [name for name in names if name not in PDF_BACKENDS]
+    if unknown:
+        print(f"Unknown backends: {', '.join(unknown)} (available: {', '.join(PDF_BACKENDS)})")
+        sys.exit(1)
+    if DEFAULT_PDF_BACKEND not in names:
+        names.insert(0, DEFAULT_PDF_BACKEND)
+    main(names)
@@ -0,0 +1,93 @@
+"""Capture query plans for the mapping and order-history access paths, before and after the index migration.
+
+Usage: python scripts/benchmark_query_plans.py [--apply]
+
+Prints the plan and the median run time of each hot query against the
+configured database (EXPLAIN on PostgreSQL, EXPLAIN QUERY PLAN on SQLite).
+With --apply, migrate_order_and_mapping_indexes() is run after the first pass
+and the plans are printed again, so sequential scans can be compared with the
+index scans that replace them. On small tables PostgreSQL may still prefer a
+sequential scan; run it against a production-sized copy for meaningful numbers.
+"""
+
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv(override=True)
+except ImportError:
+    pass
+
+from sqlalchemy import text
+from database.connection import get_database_engine
+from database.migration import migrate_order_and_mapping_indexes
+
+# (label, SQL, parameters) mirroring the queries DatabaseService issues
+ACCESS_PATHS = [
+    ("customer mappings by source",
+     "SELECT raw_customer_id, mapped_customer_name FROM customer_mappings "
+     "WHERE source = :source AND active = TRUE ORDER BY priority",
+     {'source': 'kehe'}),
+    ("store mappings by source",
+     "SELECT raw_store_id, mapped_store_name FROM store_mappings "
+     "WHERE source = :source AND store_type != 'customer'",
+     {'source': 'kehe'}),
+    ("line items of an order page",
+     "SELECT * FROM order_line_items WHERE order_id IN (1, 2, 3, 4, 5)",
+     {}),
+    ("history page, all sources",
+     "SELECT * FROM processed_orders ORDER BY processed_at DESC, id DESC LIMIT 51",
+     {}),
+    ("history page, one source",
+     "SELECT * FROM processed_orders WHERE source = :source ORDER BY processed_at DESC, id DESC LIMIT 51",
+     {'source': 'kehe'}),
+]
+
+
+def explain(conn, sql: str, params: dict) -> str:
+    """Return the query plan as text"""
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == 'sqlite' else "EXPLAIN "
+    rows = conn.execute(text(prefix + sql), params).fetchall()
+    return '\n'.join(str(row[-1]) for row in rows)
+
+
+def time_query(conn, sql: str, params: dict, runs: int = 20) -> float:
+    """Median run time in milliseconds"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        conn.execute(text(sql), params).fetchall()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def report(title: str):
+    print(f"\n=== {title} ===")
+    with get_database_engine().connect() as conn:
+        for label, sql, params in ACCESS_PATHS:
+            try:
+                plan = explain(conn, sql, params)
+                ms = time_query(conn, sql, params)
+            except Exception as exc:
+                conn.rollback()
+                print(f"\n-- {label}: ERROR {exc}")
+                continue
+            print(f"\n-- {label} ({ms:.2f} ms median)")
+            for line in plan.splitlines():
+                print(f"   {line}")
+
+
+if __name__ == "__main__":
+    apply = '--apply' in sys.argv[1:]
+    report("current schema")
+    if apply:
+        success, message = migrate_order_and_mapping_indexes()
+        print(f"\nMigration: {message}")
+        report("after index migration")
@@ -0,0 +1,276 @@
+"""Convert order files to a Xoro import CSV without the Streamlit UI.
+
+Usage:
+    python scripts/convert_orders.py --source unfi_east INPUT [INPUT ...] -o xoro.csv
+        [--summary run.json] [--save [--allow-duplicates]] [--workers N] [--recursive] [--quiet]
+
+INPUT may be a file, a directory (files with the source's extensions) or a
+glob pattern, quoted so the shell does not expand it ("drops/kehe/*.csv").
+With --source auto the source of every file is detected from its content
+(parsers/source_detection.py), so one run can convert a mixed folder; files
+whose source is not recognized are reported as undetected. Files are parsed
+and converted in parallel (utils/order_batch.py) and the Xoro rows of all
+files are written to one CSV, in input order. --save also
+stores the orders in processed_orders / conversion_history, exactly as the
+Process Orders page does. Files whose content was already saved for the same
+source are converted but not saved again (reported as "saved": "duplicate")
+unless --allow-duplicates is given. A JSON run summary with per-file status is written
+next to the CSV (or to --summary).
+
+Mappings are read from the configured database, so DATABASE_URL must be set.
+
+Exit status: 0 when every file converted (TJ Maxx files waiting for their
+PO/Distribution pair count as converted), 1 when any file failed, 2 on bad
+arguments or when no input files were found.
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv(override=True)
+except ImportError:
+    pass
+
+import pandas as pd
+from database.service import get_shared_database_service
+from parsers.registry import ORDER_SOURCES, SUPPORTED_FILE_TYPES, OrderSource, get_order_source
+from parsers.source_detection import detect_order_source
+from utils.order_batch import iter_converted_files
+from utils.pdf_text_cache import content_digest
+
+
+def report(message: str):
+    """Progress output; stderr, so it is not mixed with the parsers' debug output"""
+    print(message, file=sys.stderr)
+
+
+def collect_files(inputs: List[str], source: Optional[OrderSource], recursive: bool = False) -> List[Path]:
+    """
+    Expand files, directories and glob patterns into a list of files
+
+    Files named explicitly are always taken; files found in directories or
+    through patterns only if the source (any source, if None) reads their
+    extension. Duplicates are dropped, keeping the first occurrence.
+    """
+    files = []
+    seen = set()
+
+    def readable_by_source(path: Path) -> bool:
+        if source is None:
+            return path.suffix.lower().lstrip('.') in SUPPORTED_FILE_TYPES
+        return source.accepts(path.name)
+
+    def add(path: Path, explicit: bool):
+        if not path.is_file() or (not explicit and not readable_by_source(path)):
+            return
+        resolved = path.resolve()
+        if resolved not in seen:
+            seen.add(resolved)
+            files.append(path)
+
+    for item in inputs:
+        path = Path(item)
+        if path.is_file():
+            add(path, explicit=True)
+        elif path.is_dir():
+            children = path.rglob('*') if recursive else path.iterdir()
+            for child in sorted(children):
+                add(child, explicit=False)
+        else:
+            matches = sorted(glob.glob(item, recursive=recursive))
+            if not matches:
+                report(f"[WARNING] No files match {item}")
+            for match in matches:
+                add(Path(match), explicit=False)
+    return files
+
+
+def convert_orders(files: List[Path], source: Optional[OrderSource], output: Optional[Path], save: bool = False,
+                   workers: Optional[int] = None, allow_duplicates: bool = False) -> dict:
+    """
+    Parse, convert (and optionally save) order files
+
+    Args:
+        files: Order files, in the order their rows should appear in the CSV
+        source: Source of every file, or None to detect each file's source
+        output: Xoro CSV to write; not written if no file produced rows
+        save: Also save each file's orders to the database
+        workers: Worker pool size (defaults to ORDER_BATCH_MAX_WORKERS)
+        allow_duplicates: Save files whose content is already in the conversion history
+
+    Returns:
+        Run summary (also the content of the JSON summary file)
+    """
+    started = time.perf_counter()
+    started_at = datetime.now().isoformat(timespec='seconds')
+    db_service = get_shared_database_service()
+
+    entries = [
+        {'path': str(path), 'source': source.key if source else None, 'status': 'failed',
+         'orders': 0, 'line_items': 0, 'saved': None, 'error': None}
+        for path in files
+    ]
+    # Source key -> [(index, name, content)], in input order
+    batches: Dict[str, list] = {}
+    for index, path in enumerate(files):
+        try:
+            content = path.read_bytes()
+        except OSError as e:
+            entries[index]['error'] = f"Cannot read file: {e}"
+            report(f"[ERROR] {path.name}: failed ({entries[index]['error']})")
+            continue
+        file_source = source
+        if file_source is None:
+            detection = detect_order_source(path.name, content)
+            file_source = detection.source
+            if file_source is None:
+                entries[index]['status'] = 'undetected'
+                entries[index]['error'] = f"Source not recognized: {detection.reason}"
+                report(f"[ERROR] {path.name}: undetected ({detection.reason})")
+                continue
+            entries[index]['source'] = file_source.key
+        batches.setdefault(file_source.key, []).append((index, path.name, content))
+
+    # Results arrive in input order per source; saving here keeps a single database writer
+    rows_by_index = {}
+    for source_key, readable in batches.items():
+        file_source = ORDER_SOURCES[source_key]
+        parser = file_source.build_parser(db_service)
+        if source is None:
+            report(f"[INFO] {len(readable)} {file_source.display_name} file(s)")
+
+        batch = [(name, content) for _, name, content in readable]
+        file_hashes = [content_digest(content) for _, content in batch]
+        # Content already saved for this source, by an earlier run or earlier in this one
+        previous_conversions = {}
+        if save and not allow_duplicates:
+            previous_conversions = db_service.find_previous_conversions(file_hashes, file_source.display_name)
+        for result in iter_converted_files(batch, parser, file_source.display_name, max_workers=workers):
+            index = readable[result.index][0]
+            entry = entries[index]
+            if result.error is not None:
+                entry['error'] = result.error
+            elif result.parsed_data:
+                entry['status'] = 'converted'
+                entry['orders'] = len({row.get('ThirdPartyRefNo') for row in result.converted_data})
+                entry['line_items'] = len(result.converted_data)
+                rows_by_index[index] = result.converted_data
+                file_hash = file_hashes[result.index]
+                if save and file_hash in previous_conversions:
+                    entry['saved'] = 'duplicate'
+                    entry['note'] = f"Already saved as {previous_conversions[file_hash]['filename']}"
+                elif save:
+                    entry['saved'] = bool(db_service.save_processed_orders(
+                        result.parsed_data, file_source.display_name, result.file_name,
+                        content_hash=file_hash, xoro_rows=result.converted_data
+                    ))
+                    if not entry['saved']:
+                        entry['status'] = 'save_failed'
+                        entry['error'] = "Database save failed"
+                    elif not allow_duplicates:
+                        previous_conversions[file_hash] = {'filename': result.file_name}
+            elif source_key == 'tkmaxx' and result.parse_status == 'pending':
+                entry['status'] = 'pending'
+                entry['note'] = "Waiting for the matching PO/Distribution file"
+            else:
+                entry['status'] = 'no_data'
+                entry['error'] = "Parser returned no data"
+
+            status_label = "[OK]" if entry['status'] in ('converted', 'pending') else "[ERROR]"
+            detail = entry['error'] or f"{entry['orders']} orders, {entry['line_items']} line items"
+            if entry.get('note'):
+                detail = f"{detail}; {entry['note']}" if entry['status'] == 'converted' else entry['note']
+            report(f"{status_label} {result.file_name}: {entry['status']} ({detail})")
+
+    all_converted_data = [row for index in range(len(files)) for row in rows_by_index.get(index, [])]
+    written = None
+    if all_converted_data and output is not None:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        pd.DataFrame(all_converted_data).to_csv(output, index=False)
+        written = str(output)
+
+    totals = {'files': len(files), 'orders': 0, 'line_items': 0}
+    for status in ('converted', 'pending', 'no_data', 'save_failed', 'undetected', 'failed'):
+        totals[status] = sum(1 for entry in entries if entry['status'] == status)
+    totals['orders'] = sum(entry['orders'] for entry in entries)
+    totals['line_items'] = len(all_converted_data)
+
+    return {
+        'source': source.key if source else 'auto',
+        'source_name': source.display_name if source else 'Detected per file',
+        'started_at': started_at,
+        'duration_seconds': round(time.perf_counter() - started, 3),
+        'output': written,
+        'saved_to_database': save,
+        'totals': totals,
+        'files': entries,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Convert order files to a Xoro import CSV")
+    parser.add_argument("inputs", nargs='+', help="Order files, directories or quoted glob patterns")
+    parser.add_argument("--source", required=True,
+                        help=f"Order source: {', '.join(ORDER_SOURCES)} (display names also accepted), "
+                             f"or 'auto' to detect the source of each file")
+    parser.add_argument("-o", "--output", required=True, help="Xoro CSV to write")
+    parser.add_argument("--summary", help="JSON run summary to write (default: <output>.summary.json)")
+    parser.add_argument("--save", action="store_true", help="Save the orders to the database")
+    parser.add_argument("--allow-duplicates", action="store_true",
+                        help="With --save, also save files whose content was already saved for the same source")
+    parser.add_argument("--workers", type=int, help="Files processed in parallel (default: ORDER_BATCH_MAX_WORKERS)")
+    parser.add_argument("--recursive", action="store_true", help="Search directories and ** patterns recursively")
+    parser.add_argument("--quiet", action="store_true", help="Hide the parsers' debug output")
+    args = parser.parse_args(argv)
+
+    source = None
+    if args.source.strip().lower() != 'auto':
+        source = get_order_source(args.source)
+        if source is None:
+            parser.error(f"unknown source '{args.source}'; choose one of {', '.join(ORDER_SOURCES)}")
+
+    files = collect_files(args.inputs, source, recursive=args.recursive)
+    if not files:
+        report("[ERROR] No input files found")
+        return 2
+
+    output = Path(args.output)
+    summary_path = Path(args.summary) if args.summary else output.with_name(output.name + '.summary.json')
+    if source is None:
+        report(f"[INFO] Converting {len(files)} file(s), detecting the source of each")
+    else:
+        report(f"[INFO] Converting {len(files)} {source.display_name} file(s)")
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull if args.quiet else sys.stdout):
+        summary = convert_orders(files, source, output, save=args.save, workers=args.workers,
+                                 allow_duplicates=args.allow_duplicates)
+
+    summary_path.parent.mkdir(parents=True, exist_ok=True)
+    summary_path.write_text(json.dumps(summary, indent=2))
+
+    totals = summary['totals']
+    report(f"[INFO] {totals['converted']} converted, {totals['pending']} pending, "
+           f"{totals['files'] - totals['converted'] - totals['pending']} failed; "
+           f"{totals['orders']} orders, {totals['line_items']} line items in {summary['duration_seconds']}s")
+    report(f"   CSV: {summary['output'] or 'not written (no rows)'}")
+    report(f"   Summary: {summary_path}")
+
+    return 0 if totals['converted'] + totals['pending'] == totals['files'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,402 @@
+"""Watch drop folders and convert new order files to Xoro CSVs as they arrive.
+
+Usage:
+    python scripts/watch_orders.py --watch kehe=/drops/kehe --watch unfi_east=/drops/unfi
+        --outbox /exports/xoro [--ledger FILE] [--save] [--interval 10] [--settle 5]
+        [--workers N] [--retry-failed] [--once] [--quiet]
+
+Each --watch routes one directory to a source from parsers/registry.py
+(key or display name). Every --interval seconds the directories are scanned.
+Files with the source's extensions are picked up once they have not changed
+for --settle seconds, so partially uploaded files are skipped. New files are
+parsed and converted in parallel (utils/order_batch.py). Each one produces
+<outbox>/<source>/<name>_<hash>.csv, and with --save its orders are also saved
+to the database like an upload on the Process Orders page.
+
+Exactly-once processing rests on a ledger of SHA-256 content hashes in a
+SQLite file (default <outbox>/.order_watch_ledger.sqlite3). A file is claimed
+in the ledger before it is processed, so a re-sent copy under a new name, or
+the same file after a restart, is never processed again.
+
+Ledger states:
+    done / failed   final (failed files are retried, once per run, only with
+                    --retry-failed)
+    pending         TJ Maxx file waiting for its PO/Distribution pair; pairing
+                    state lives in memory, so pending files are read again
+                    after a restart
+    processing      claimed by a running watcher. An aborted batch releases
+                    its unfinished claims, so this is only left behind if a
+                    watcher was killed mid-file; such files are not retried
+                    automatically (their orders may already be saved), only
+                    with --retry-failed while no other watcher uses the ledger
+
+Stop with Ctrl+C or SIGTERM; the batch in progress is finished first.
+"""
+
+import argparse
+import contextlib
+import os
+import signal
+import sqlite3
+import sys
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv(override=True)
+except ImportError:
+    pass
+
+import pandas as pd
+from database.service import get_shared_database_service
+from parsers.registry import ORDER_SOURCES, OrderSource, get_order_source
+from utils.order_batch import iter_converted_files
+from utils.pdf_text_cache import content_digest
+
+LEDGER_FILE_NAME = '.order_watch_ledger.sqlite3'
+
+# Ledger states --retry-failed may claim again
+RETRYABLE_STATES = ('pending', 'failed', 'processing')
+
+
+def log(message: str):
+    """Watcher output; stderr, so it is not mixed with the parsers' debug output"""
+    print(message, file=sys.stderr, flush=True)
+
+
+class ProcessedFileLedger:
+    """Durable record of the content hashes the watcher has processed"""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode; claims use explicit BEGIN IMMEDIATE transactions
+        self.connection = sqlite3.connect(str(path), isolation_level=None, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS processed_files (
+                content_hash TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                file_name TEXT NOT NULL,
+                status TEXT NOT NULL,
+                output TEXT,
+                error TEXT,
+                updated_at TEXT NOT NULL
+            )
+        """)
+
+    def status_of(self, content_hash: str) -> Optional[str]:
+        row = self.connection.execute(
+            "SELECT status FROM processed_files WHERE content_hash = ?", (content_hash,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def claim(self, content_hash: str, source: str, file_name: str, retry_failed: bool = False) -> bool:
+        """
+        Mark a hash as processing
+
+        Returns:
+            True if the caller now owns the file: the hash is new or pending,
+            or failed/processing with retry_failed. False if it is already
+            processed (or being processed by another watcher).
+        """
+        claimable = RETRYABLE_STATES if retry_failed else ('pending',)
+        now = datetime.now().isoformat(timespec='seconds')
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            status = self.status_of(content_hash)
+            if status is None:
+                self.connection.execute(
+                    "INSERT INTO processed_files (content_hash, source, file_name, status, updated_at) "
+                    "VALUES (?, ?, ?, 'processing', ?)",
+                    (content_hash, source, file_name, now)
+                )
+            elif status in claimable:
+                self.connection.execute(
+                    "UPDATE processed_files SET status = 'processing', source = ?, file_name = ?, "
+                    "error = NULL, updated_at = ? WHERE content_hash = ?",
+                    (source, file_name, now, content_hash)
+                )
+            else:
+                self.connection.execute("ROLLBACK")
+                return False
+            self.connection.execute("COMMIT")
+            return True
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+
+    def finish(self, content_hash: str, status: str, output: Optional[str] = None, error: Optional[str] = None):
+        """Record the outcome of a claimed file (done, failed or pending)"""
+        self.connection.execute(
+            "UPDATE processed_files SET status = ?, output = ?, error = ?, updated_at = ? WHERE content_hash = ?",
+            (status, output, error, datetime.now().isoformat(timespec='seconds'), content_hash)
+        )
+
+    def release(self, content_hash: str):
+        """Drop a claim without an outcome, so the hash counts as new again"""
+        self.connection.execute("DELETE FROM processed_files WHERE content_hash = ?", (content_hash,))
+
+    def count_processing(self) -> int:
+        """Files claimed but not finished: in progress elsewhere, or left by a watcher that died"""
+        return self.connection.execute("SELECT COUNT(*) FROM processed_files WHERE status = 'processing'").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+
+def write_csv_atomically(rows: List[dict], path: Path):
+    """Write the Xoro rows to a temporary file and move it into place"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(dir=str(path.parent), prefix='.tmp_', suffix='.csv')
+    os.close(handle)
+    try:
+        pd.DataFrame(rows).to_csv(temp_path, index=False)
+        os.replace(temp_path, path)
+    except Exception:
+        with contextlib.suppress(OSError):
+            os.remove(temp_path)
+        raise
+
+
+class OrderFolderWatcher:
+    """Polls drop folders and converts every new file exactly once"""
+
+    def __init__(self, folders: List[Tuple[OrderSource, Path]], outbox: Path, ledger: ProcessedFileLedger,
+                 save: bool = False, workers: Optional[int] = None, settle_seconds: float = 5.0,
+                 retry_failed: bool = False):
+        self.folders = folders
+        self.outbox = outbox
+        self.ledger = ledger
+        self.save = save
+        self.workers = workers
+        self.settle_seconds = settle_seconds
+        self.retry_failed = retry_failed
+        self.db_service = get_shared_database_service()
+        # One parser per source for the watcher's lifetime, so TJ Maxx pairs across polls
+        self.parsers = {}
+        # path -> (size, mtime, hash); avoids re-hashing unchanged files every poll
+        self._seen: Dict[Path, Tuple[int, float, str]] = {}
+        # Hashes handled by this run; pending and retried files are read once per run, not every poll
+        self._attempted = set()
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def _parser_for(self, source: OrderSource):
+        if source.key not in self.parsers:
+            self.parsers[source.key] = source.build_parser(self.db_service)
+        return self.parsers[source.key]
+
+    def scan(self) -> Dict[str, List[Tuple[Path, str]]]:
+        """
+        Find settled files whose content hash the ledger does not hold as final
+
+        Returns:
+            Source key -> [(path, content_hash)], oldest files first
+        """
+        now = datetime.now().timestamp()
+        found: Dict[str, List[Tuple[float, Path, str]]] = {}
+        claimable = RETRYABLE_STATES if self.retry_failed else ('pending',)
+        for source, folder in self.folders:
+            try:
+                entries = list(os.scandir(folder))
+            except OSError as e:
+                log(f"[WARNING] Cannot read {folder}: {e}")
+                continue
+            for entry in entries:
+                if not entry.is_file() or entry.name.startswith('.') or not source.accepts(entry.name):
+                    continue
+                path = Path(entry.path)
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                if now - stat.st_mtime < self.settle_seconds:
+                    continue  # Still being written
+                seen = self._seen.get(path)
+                if seen and seen[:2] == (stat.st_size, stat.st_mtime):
+                    content_hash = seen[2]
+                else:
+                    try:
+                        content_hash = content_digest(path.read_bytes())
+                    except OSError as e:
+                        log(f"[WARNING] Cannot read {path}: {e}")
+                        continue
+                    self._seen[path] = (stat.st_size, stat.st_mtime, content_hash)
+                if content_hash in self._attempted:
+                    continue
+                status = self.ledger.status_of(content_hash)
+                if status is None or status in claimable:
+                    found.setdefault(source.key, []).append((stat.st_mtime, path, content_hash))
+        return {key: [(path, content_hash) for _, path, content_hash in sorted(files)] for key, files in found.items()}
+
+    def process(self, source: OrderSource, files: List[Tuple[Path, str]]) -> int:
+        """
+        Claim, convert and record a batch of files of one source
+
+        If the batch is aborted (e.g. the worker pool fails or Ctrl+C reaches
+        it), claims without an outcome are not left as 'processing': the file
+        whose result was being recorded is marked failed (its orders may be
+        saved already), the others are released to be picked up again.
+
+        Returns:
+            Number of files that produced a Xoro CSV
+        """
+        claimed = set()  # Claimed hashes without an outcome yet
+        recording = None  # Hash whose result is being recorded
+
+        def finish(content_hash: str, status: str, output: Optional[str] = None, error: Optional[str] = None):
+            self.ledger.finish(content_hash, status, output=output, error=error)
+            claimed.discard(content_hash)
+
+        try:
+            batch = []
+            hashes = []
+            for path, content_hash in files:
+                if not self.ledger.claim(content_hash, source.key, path.name, retry_failed=self.retry_failed):
+                    log(f"[INFO] Skipping {path.name}: already processed")
+                    continue
+                claimed.add(content_hash)
+                try:
+                    content = path.read_bytes()
+                except OSError as e:
+                    finish(content_hash, 'failed', error=f"Cannot read file: {e}")
+                    log(f"[ERROR] {path.name}: cannot read file ({e})")
+                    continue
+                if content_digest(content) != content_hash:
+                    # Changed since the scan; release the claim and pick it up on the next poll
+                    self.ledger.release(content_hash)
+                    claimed.discard(content_hash)
+                    continue
+                self._attempted.add(content_hash)
+                batch.append((path.name, content))
+                hashes.append(content_hash)
+
+            converted = 0
+            parser = self._parser_for(source)
+            for result in iter_converted_files(batch, parser, source.display_name, max_workers=self.workers):
+                content_hash = recording = hashes[result.index]
+                try:
+                    if result.error is not None:
+                        raise Exception(result.error)
+                    if not result.parsed_data:
+                        if source.key == 'tkmaxx' and result.parse_status == 'pending':
+                            finish(content_hash, 'pending')
+                            log(f"[INFO] {result.file_name}: waiting for the matching PO/Distribution file")
+                        else:
+                            finish(content_hash, 'failed', error="Parser returned no data")
+                            log(f"[ERROR] {result.file_name}: parser returned no data")
+                        continue
+
+                    output = self.outbox / source.key / f"{Path(result.file_name).stem}_{content_hash[:12]}.csv"
+                    write_csv_atomically(result.converted_data, output)
+                    if self.save and not self.db_service.save_processed_orders(result.parsed_data, source.display_name, result.file_name,
+                                                                               content_hash=content_hash,
+                                                                               xoro_rows=result.converted_data):
+                        raise Exception(f"Database save failed (Xoro CSV written to {output})")
+                    finish(content_hash, 'done', output=str(output))
+                    converted += 1
+                    log(f"[OK] {result.file_name}: {len(result.converted_data)} line items -> {output}")
+                except Exception as e:
+                    finish(content_hash, 'failed', error=str(e))
+                    log(f"[ERROR] {result.file_name}: {e}")
+            return converted
+        finally:
+            if claimed:
+                log(f"[WARNING] {source.display_name} batch aborted; releasing {len(claimed)} unfinished file(s)")
+            for content_hash in claimed:
+                try:
+                    if content_hash == recording:
+                        self.ledger.finish(content_hash, 'failed', error="Aborted while recording the result")
+                    else:
+                        self.ledger.release(content_hash)
+                        self._attempted.discard(content_hash)
+                except Exception as e:
+                    log(f"[ERROR] Could not release ledger entry {content_hash[:12]}: {e}")
+
+    def run_once(self) -> int:
+        """Scan every folder once and process what is new; returns the number of converted files"""
+        converted = 0
+        for source_key, files in self.scan().items():
+            if self._stop.is_set():
+                break
+            converted += self.process(ORDER_SOURCES[source_key], files)
+        return converted
+
+    def run_forever(self, interval: float):
+        """Poll until stop() is called (e.g. from a signal handler)"""
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                log(f"[ERROR] Watch cycle failed: {e}")
+            self._stop.wait(interval)
+
+
+def parse_watch_argument(value: str) -> Tuple[OrderSource, Path]:
+    """SOURCE=DIRECTORY -> (OrderSource, Path)"""
+    if '=' not in value:
+        raise argparse.ArgumentTypeError(f"expected SOURCE=DIRECTORY, got '{value}'")
+    name, directory = value.split('=', 1)
+    source = get_order_source(name)
+    if source is None:
+        raise argparse.ArgumentTypeError(f"unknown source '{name}'; choose one of {', '.join(ORDER_SOURCES)}")
+    path = Path(directory)
+    if not path.is_dir():
+        raise argparse.ArgumentTypeError(f"'{directory}' is not a directory")
+    return source, path
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Convert order files dropped into watched folders")
+    parser.add_argument("--watch", action="append", required=True, type=parse_watch_argument,
+                        metavar="SOURCE=DIRECTORY", help="Folder to watch and the source of its files (repeatable)")
+    parser.add_argument("--outbox", required=True, help="Directory for the Xoro CSVs")
+    parser.add_argument("--ledger", help=f"Ledger file (default: <outbox>/{LEDGER_FILE_NAME})")
+    parser.add_argument("--save", action="store_true", help="Also save the orders to the database")
+    parser.add_argument("--interval", type=float, default=10.0, help="Seconds between scans (default: 10)")
+    parser.add_argument("--settle", type=float, default=5.0,
+                        help="Seconds a file must be unchanged before it is picked up (default: 5)")
+    parser.add_argument("--workers", type=int, help="Files processed in parallel (default: ORDER_BATCH_MAX_WORKERS)")
+    parser.add_argument("--retry-failed", action="store_true", help="Process failed and unfinished files again (once per run)")
+    parser.add_argument("--once", action="store_true", help="Scan once and exit (e.g. from cron)")
+    parser.add_argument("--quiet", action="store_true", help="Hide the parsers' debug output")
+    args = parser.parse_args(argv)
+
+    outbox = Path(args.outbox)
+    ledger = ProcessedFileLedger(Path(args.ledger) if args.ledger else outbox / LEDGER_FILE_NAME)
+    watcher = OrderFolderWatcher(args.watch, outbox, ledger, save=args.save, workers=args.workers,
+                                 settle_seconds=args.settle, retry_failed=args.retry_failed)
+
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signal_number, lambda *_: watcher.stop())
+
+    folders = ', '.join(f"{source.key}={folder}" for source, folder in args.watch)
+    log(f"[INFO] Watching {folders}; Xoro CSVs go to {outbox}")
+    unfinished = ledger.count_processing()
+    if unfinished:
+        log(f"[WARNING] {unfinished} file(s) in the ledger were claimed but never finished; they are "
+            f"skipped unless --retry-failed is given (only use it when no other watcher is running)")
+
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull if args.quiet else sys.stdout):
+            if args.once:
+                watcher.run_once()
+            else:
+                watcher.run_forever(args.interval)
+    finally:
+        ledger.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Test the command-line batch converter (scripts/convert_orders.py)
+
+A mixed folder converted with --source auto must dispatch every file to its
+source's parser, keep the Xoro rows in input order, report unrecognized files
+and give the same CSV whether files are converted one at a time or in parallel.
+--save must not save a file whose content was already saved for its source.
+
+Run with: python test_convert_orders.py  (or python -m pytest test_convert_orders.py)
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import text
+from testing_database import use_test_database, temporary_working_directory
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / 'scripts'))
+import convert_orders
+
+SAMPLES = [
+    ROOT / 'order_samples/vmc/vmc _xo10242_20251120133909_243BE6B8.csv',
+    ROOT / 'order_samples/chex/chex _xo10242_20240906101127_08C92060.pdf',
+    ROOT / 'order_samples/davidson/Davidson _xo10242_20251120133517_C4739329.csv',
+    ROOT / 'order_samples/kehe/KeHE po3268397_65652.csv',
+]
+
+
+def _convert(*args):
+    # Also keeps the default store mapping files the parsers create out of the repo
+    with temporary_working_directory() as work:
+        output = Path(work) / 'xoro.csv'
+        exit_code = convert_orders.main([*args, '-o', str(output), '--quiet'])
+        summary = json.loads((Path(work) / 'xoro.csv.summary.json').read_text())
+        rows = pd.read_csv(output, dtype=str, keep_default_na=False) if output.exists() else None
+        return exit_code, summary, rows
+
+
+def test_auto_detected_mixed_batch():
+    engine = use_test_database()
+
+    exit_code, summary, rows = _convert('--source', 'auto', '--save', '--workers', '2', *map(str, SAMPLES))
+
+    assert exit_code == 1  # The Chex PDF is not recognized
+    assert [(entry['source'], entry['status']) for entry in summary['files']] == [
+        ('vmc', 'converted'), (None, 'undetected'), ('davidson', 'converted'), ('kehe', 'converted')
+    ]
+    assert summary['totals']['undetected'] == 1 and summary['totals']['line_items'] == len(rows)
+
+    # Rows follow the input order, not the order the sources were processed in
+    sources_in_order = list(dict.fromkeys(rows['ThirdPartySource']))
+    assert sources_in_order == ['VMC', 'Davidson', 'KEHE - SPS']
+
+    with engine.connect() as conn:
+        saved = conn.execute(text(
+            "SELECT source, success, content_hash IS NOT NULL FROM conversion_history ORDER BY id"
+        )).fetchall()
+    assert sorted(saved) == [('Davidson', 1, 1), ('KEHE - SPS', 1, 1), ('VMC', 1, 1)]
+
+
+def test_parallel_and_serial_output_match():
+    use_test_database()
+    vmc_folder = str(ROOT / 'order_samples/vmc')
+
+    serial_exit, serial_summary, serial_rows = _convert('--source', 'vmc', '--workers', '1', vmc_folder)
+    parallel_exit, parallel_summary, parallel_rows = _convert('--source', 'VMC', '--workers', '3', vmc_folder)
+
+    # The folder also holds a mapping sheet, which the VMC parser cannot read
+    assert serial_exit == parallel_exit
+    assert [entry['status'] for entry in serial_summary['files']] == \
+           [entry['status'] for entry in parallel_summary['files']]
+    assert serial_summary['totals']['converted'] == 4
+    pd.testing.assert_frame_equal(serial_rows, parallel_rows)
+
+
+def test_saved_files_are_not_saved_again():
+    engine = use_test_database()
+    first, second, third = sorted((ROOT / 'order_samples/vmc').glob('vmc _xo*.csv'))
+    work = tempfile.mkdtemp()
+    try:
+        renamed_copy = os.path.join(work, 'renamed copy.csv')
+        shutil.copy(first, renamed_copy)
+
+        _, summary, _ = _convert('--source', 'vmc', '--save', str(first), str(second))
+        assert [entry['saved'] for entry in summary['files']] == [True, True]
+
+        # Same content under another name, and twice in one run
+        exit_code, summary, rows = _convert('--source', 'vmc', '--save', str(first), renamed_copy, str(third))
+        assert exit_code == 0
+        assert [(entry['status'], entry['saved']) for entry in summary['files']] == [
+            ('converted', 'duplicate'), ('converted', 'duplicate'), ('converted', True)
+        ]
+        assert len(rows) == summary['totals']['line_items'] > 0  # Duplicates are still converted
+
+        _, summary, _ = _convert('--source', 'vmc', '--save', '--allow-duplicates', str(first))
+        assert [entry['saved'] for entry in summary['files']] == [True]
+    finally:
+        shutil.rmtree(work)
+
+    with engine.connect() as conn:
+        saved = conn.execute(text("SELECT filename FROM conversion_history ORDER BY id")).scalars().all()
+    assert saved == [first.name, second.name, third.name, first.name]
+
+
+def test_bad_arguments():
+    use_test_database()
+    work = tempfile.mkdtemp()
+    try:
+        assert convert_orders.main(['--source', 'vmc', os.path.join(work, '*.csv'), '-o', os.path.join(work, 'x.csv')]) == 2
+        try:
+            convert_orders.main(['--source', 'nowhere', work, '-o', os.path.join(work, 'x.csv')])
+        except SystemExit as e:
+            assert e.code == 2
+        else:
+            raise AssertionError("unknown source was accepted")
+    finally:
+        shutil.rmtree(work)
+
+
+if __name__ == "__main__":
+    test_auto_detected_mixed_batch()
+    test_parallel_and_serial_output_match()
+    test_saved_files_are_not_saved_again()
+    test_bad_arguments()
+    print("[OK] Batch converter")
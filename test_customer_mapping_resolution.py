@@ -0,0 +1,88 @@
+"""
+Test candidate-set customer resolution (MappingUtils.resolve_customer_mapping)
+
+For any list of candidate customer IDs it must return the same (candidate,
+customer) as calling get_customer_mapping() on each candidate in order and
+keeping the first that maps, and it must stop pulling candidates from a
+generator once one resolves.
+
+Run with: python test_customer_mapping_resolution.py  (or python -m pytest test_customer_mapping_resolution.py)
+"""
+
+import random
+from testing_database import use_test_database
+from database.connection import get_session
+from database.models import CustomerMapping
+from utils.mapping_utils import MappingUtils
+
+CUSTOMER_MAPPINGS = {
+    'unfi_east': {
+        'RCH': 'UNFI EAST - RICHBURG',
+        '128 HOW': 'UNFI EAST - HOWELL',
+        'CHE-5099': 'UNFI EAST CHESTERFIELD',
+        'York Warehouse': 'UNFI EAST YORK PA',
+        '85948.0': 'PSS-NJ',
+    },
+    'kehe': {
+        '569813430012': 'KL - Kehe',
+        '0569813430019': 'KL - Leading Zero',
+    },
+}
+
+CANDIDATES = {
+    'unfi_east': ['', 'RICH', 'rch', '128 RCH', 'HOW', 'how', 'CHE', 'york', 'York Warehouse',
+                  '85948', '85948.0', 'Atlanta (ATL)', 'ATL', 'MISSING'],
+    'kehe': ['', '569813430012', '0569813430012', '569813430019', '569813430012.0', '999', 'MISSING'],
+}
+
+
+def _seed_customer_mappings():
+    use_test_database()
+    with get_session() as session:
+        for source, mappings in CUSTOMER_MAPPINGS.items():
+            for raw_customer_id, customer_name in mappings.items():
+                session.add(CustomerMapping(source=source, raw_customer_id=raw_customer_id,
+                                            mapped_customer_name=customer_name, active=True, priority=100))
+
+
+def _resolve_one_by_one(mapping_utils, candidates, source):
+    for candidate in candidates:
+        customer = mapping_utils.get_customer_mapping(candidate, source)
+        if customer != 'UNKNOWN':
+            return candidate, customer
+    return None, 'UNKNOWN'
+
+
+def test_same_result_as_single_lookups_in_order():
+    _seed_customer_mappings()
+    mapping_utils = MappingUtils()
+    rng = random.Random(13)
+
+    for source, pool in CANDIDATES.items():
+        # Every candidate on its own, then random lists with misses and duplicates
+        candidate_lists = [[candidate] for candidate in pool]
+        candidate_lists += [rng.choices(pool, k=rng.randint(1, 5)) for _ in range(200)]
+        for candidates in candidate_lists:
+            expected = _resolve_one_by_one(mapping_utils, candidates, source)
+            assert mapping_utils.resolve_customer_mapping(candidates, source) == expected, candidates
+        assert any(_resolve_one_by_one(mapping_utils, [candidate], source)[0] for candidate in pool)
+
+
+def test_candidates_after_the_first_hit_are_not_consumed():
+    _seed_customer_mappings()
+    mapping_utils = MappingUtils()
+    pulled = []
+
+    def candidates():
+        for candidate in ['MISSING', 'ATL', '128 HOW', 'RCH', 'York Warehouse']:
+            pulled.append(candidate)
+            yield candidate
+
+    assert mapping_utils.resolve_customer_mapping(candidates(), 'unfi_east') == ('128 HOW', 'UNFI EAST - HOWELL')
+    assert pulled == ['MISSING', 'ATL', '128 HOW']
+
+
+if __name__ == "__main__":
+    test_same_result_as_single_lookups_in_order()
+    test_candidates_after_the_first_hit_are_not_consumed()
+    print("[OK] Customer mapping resolution")
@@ -0,0 +1,93 @@
+"""
+Test the item mapping lookups
+
+get_item_mapping_with_description() and get_item_mapping_with_case_qty()
+must find mappings whether or not item_mappings has the mapped_description
+column (older databases lack it), and resolve_item_numbers_bulk() must give
+the same answers as resolve_item_number() called line by line.
+
+Run with: python test_item_mapping_lookups.py  (or python -m pytest test_item_mapping_lookups.py)
+"""
+
+import random
+from sqlalchemy import text
+from testing_database import use_test_database
+from database.service import DatabaseService
+
+
+def _insert_mapping(engine, with_description: bool):
+    columns = "source, raw_item, mapped_item, key_type, priority, active, case_qty"
+    values = "'ross', '12345', '17-001-1', 'vendor_item', 100, 1, 6"
+    if with_description:
+        columns += ", mapped_description"
+        values += ", 'Basil Pesto 6/7.9oz'"
+    with engine.begin() as conn:
+        conn.execute(text(f"INSERT INTO item_mappings ({columns}) VALUES ({values})"))
+
+
+def test_lookups_with_mapped_description():
+    engine = use_test_database()
+    _insert_mapping(engine, with_description=True)
+    db_service = DatabaseService()
+
+    assert db_service.get_item_mapping_with_description('12345', 'ross') == {
+        'mapped_item': '17-001-1', 'mapped_description': 'Basil Pesto 6/7.9oz'
+    }
+    assert db_service.get_item_mapping_with_case_qty('12345', 'ROSS') == {
+        'mapped_item': '17-001-1', 'mapped_description': 'Basil Pesto 6/7.9oz', 'case_qty': 6.0
+    }
+    assert db_service.get_item_mapping_with_case_qty('99999', 'ross') is None
+
+
+def test_lookups_without_mapped_description():
+    engine = use_test_database(missing_columns=[('item_mappings', 'mapped_description')])
+    _insert_mapping(engine, with_description=False)
+    db_service = DatabaseService()
+
+    assert db_service.get_item_mapping_with_description('12345', 'ross') == {
+        'mapped_item': '17-001-1', 'mapped_description': ''
+    }
+    assert db_service.get_item_mapping_with_case_qty('12345', 'ross') == {
+        'mapped_item': '17-001-1', 'mapped_description': '', 'case_qty': 6.0
+    }
+    assert db_service.get_item_mappings_dict('ross') == {
+        '12345': {'mapped_item': '17-001-1', 'mapped_description': ''}
+    }
+
+
+def test_bulk_resolution_matches_single_lookups():
+    engine = use_test_database()
+    rng = random.Random(4)
+    key_types = ['vendor_item', 'upc', 'ean', 'gtin', 'sku_alias']
+    raw_values = ['00110', '00220', '00330', '0 0440', '850001234567']
+    with engine.begin() as conn:
+        for mapping_id in range(120):
+            conn.execute(text(
+                "INSERT INTO item_mappings (source, raw_item, mapped_item, key_type, priority, active) "
+                "VALUES (:source, :raw_item, :mapped_item, :key_type, :priority, :active)"
+            ), {
+                'source': rng.choice(['kehe', 'vmc']),
+                'raw_item': rng.choice(raw_values),
+                'mapped_item': f"17-{mapping_id:03d}-1",
+                'key_type': rng.choice(key_types),
+                'priority': rng.choice([10, 50, 100]),
+                'active': rng.random() < 0.8,
+            })
+    db_service = DatabaseService()
+
+    lines = [{}, {'vendor_item': ''}, {'upc': ' 00110 '}, {'gtin': 'missing'}]
+    for _ in range(200):
+        lines.append({key_type: rng.choice(raw_values + ['missing'])
+                      for key_type in rng.sample(key_types, rng.randint(1, 3))})
+
+    for source in ('kehe', 'vmc', 'ross'):
+        expected = [db_service.resolve_item_number(line, source) for line in lines]
+        assert db_service.resolve_item_numbers_bulk(lines, source) == expected
+        assert any(expected) or source == 'ross'
+
+
+if __name__ == "__main__":
+    test_lookups_with_mapped_description()
+    test_lookups_without_mapped_description()
+    test_bulk_resolution_matches_single_lookups()
+    print("[OK] Item mapping lookups")
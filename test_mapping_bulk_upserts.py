@@ -0,0 +1,114 @@
+"""
+Test the bulk mapping upserts
+
+Each batch row must update the existing mapping for its key (the active one,
+else the oldest) or insert a new one, with added/updated counts and 1-based
+row numbers in error messages for every mapping type.
+
+Run with: python test_mapping_bulk_upserts.py  (or python -m pytest test_mapping_bulk_upserts.py)
+"""
+
+from sqlalchemy import text
+from testing_database import use_test_database
+from database.service import DatabaseService
+
+
+def _rows(engine, sql):
+    with engine.connect() as conn:
+        return [tuple(row) for row in conn.execute(text(sql))]
+
+
+def test_item_upsert_updates_active_mapping_and_inserts_new_ones():
+    engine = use_test_database()
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO item_mappings (id, source, raw_item, mapped_item, key_type, priority, active, case_qty) VALUES "
+            "(1, 'kehe', '00110', 'OLD-INACTIVE', 'vendor_item', 100, 0, NULL), "
+            "(2, 'kehe', '00110', 'OLD-ACTIVE', 'vendor_item', 100, 1, 12), "
+            "(3, 'kehe', '00220', 'OLD-2', 'vendor_item', 100, 0, NULL)"
+        ))
+
+    stats = DatabaseService().bulk_upsert_item_mappings([
+        {'source': 'kehe', 'raw_item': '00110', 'mapped_item': 'NEW-1'},
+        {'source': 'kehe', 'raw_item': '00220', 'mapped_item': 'NEW-2', 'active': False},
+        {'source': 'kehe', 'raw_item': '00330', 'mapped_item': 'NEW-3', 'case_qty': 6},
+    ])
+
+    assert stats == {'added': 1, 'updated': 2, 'errors': 0, 'error_details': []}
+    assert _rows(engine, "SELECT id, raw_item, mapped_item, active, case_qty FROM item_mappings ORDER BY id") == [
+        (1, '00110', 'OLD-INACTIVE', 0, None),
+        (2, '00110', 'NEW-1', 1, 12.0),  # case_qty kept when none is supplied
+        (3, '00220', 'NEW-2', 0, None),  # oldest inactive mapping reused
+        (4, '00330', 'NEW-3', 1, 6.0),
+    ]
+
+
+def test_item_upsert_reports_conflicting_active_mapping_by_row():
+    engine = use_test_database()
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO item_mappings (source, raw_item, mapped_item, key_type, priority, active) VALUES "
+            "('kehe', '00110', 'A', 'vendor_item', 100, 1), ('kehe', '00110', 'B', 'vendor_item', 100, 1)"
+        ))
+
+    stats = DatabaseService().bulk_upsert_item_mappings([
+        {'source': 'kehe', 'raw_item': '00990', 'mapped_item': 'OK'},
+        {'source': 'kehe', 'raw_item': '00110', 'mapped_item': 'C'},
+    ])
+
+    assert stats['errors'] == 1
+    assert stats['error_details'][0].startswith("Row 2: Active mapping already exists")
+    assert _rows(engine, "SELECT COUNT(*) FROM item_mappings") == [(2,)]
+
+
+def test_store_upsert_never_overwrites_legacy_customer_rows():
+    engine = use_test_database()
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO store_mappings (id, source, raw_store_id, mapped_store_name, store_type, priority, active) VALUES "
+            "(1, 'wholefoods', '10447', 'Legacy customer', 'customer', 100, 1), "
+            "(2, 'wholefoods', '10005', 'Old store', 'distributor', 100, 1)"
+        ))
+
+    stats = DatabaseService().bulk_upsert_store_mappings([
+        {'source': 'wholefoods', 'raw_store_id': '10447', 'mapped_store_name': 'New store'},
+        {'source': 'wholefoods', 'raw_store_id': '10005', 'mapped_store_name': 'Renamed store'},
+        {'source': 'wholefoods', 'raw_store_id': '', 'mapped_store_name': 'No id'},
+    ])
+
+    assert stats['added'] == 1 and stats['updated'] == 1
+    assert stats['error_details'] == ["Row 3: Missing raw_store_id"]
+    assert _rows(engine, "SELECT id, raw_store_id, mapped_store_name, store_type FROM store_mappings ORDER BY id") == [
+        (1, '10447', 'Legacy customer', 'customer'),
+        (2, '10005', 'Renamed store', 'distributor'),
+        (3, '10447', 'New store', 'distributor'),
+    ]
+
+
+def test_customer_upsert_counts_and_row_numbers():
+    engine = use_test_database()
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO customer_mappings (source, raw_customer_id, mapped_customer_name, customer_type, priority, active) "
+            "VALUES ('kehe', '569813430012', 'Old name', 'store', 100, 1)"
+        ))
+
+    stats = DatabaseService().bulk_upsert_customer_mappings([
+        {'source': 'kehe', 'raw_customer_id': '569813430012', 'mapped_customer_name': 'New name'},
+        {'source': 'kehe', 'raw_customer_id': '', 'mapped_customer_name': 'Missing id'},
+        {'source': 'kehe', 'raw_customer_id': '569813430019', 'mapped_customer_name': 'Added'},
+    ])
+
+    assert stats == {'added': 1, 'updated': 1, 'errors': 1, 'error_details': ["Row 2: Missing required fields"]}
+    assert _rows(engine, "SELECT raw_customer_id, mapped_customer_name FROM customer_mappings ORDER BY id") == [
+        ('569813430012', 'New name'),
+        ('569813430019', 'Added'),
+    ]
+
+
+if __name__ == "__main__":
+    test_item_upsert_updates_active_mapping_and_inserts_new_ones()
+    test_item_upsert_reports_conflicting_active_mapping_by_row()
+    test_store_upsert_never_overwrites_legacy_customer_rows()
+    test_customer_upsert_counts_and_row_numbers()
+    print("[OK] Bulk mapping upserts")
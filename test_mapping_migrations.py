@@ -0,0 +1,64 @@
+"""
+Test the versioned index migrations
+
+The one-active-mapping-per-key migration must report the duplicate keys that
+block it and stay unrecorded until they are cleaned up, while the plain
+index migration is applied regardless.
+
+Run with: python test_mapping_migrations.py  (or python -m pytest test_mapping_migrations.py)
+"""
+
+from sqlalchemy import text
+from testing_database import use_test_database
+from database.migration import (migrate_order_and_mapping_indexes, migrate_unique_active_mappings,
+                                is_migration_applied, INDEX_MIGRATION_VERSION, UNIQUE_MAPPING_MIGRATION_VERSION)
+
+
+def _insert_store_mapping(engine, raw_store_id, active=True):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO store_mappings (source, raw_store_id, mapped_store_name, store_type, priority, active) "
+            "VALUES ('kehe', :raw_store_id, 'KL - Kehe', 'store', 100, :active)"
+        ), {'raw_store_id': raw_store_id, 'active': active})
+
+
+def test_duplicate_active_mappings_block_unique_migration():
+    engine = use_test_database()
+    _insert_store_mapping(engine, '569813430012')
+    _insert_store_mapping(engine, '569813430012')
+    _insert_store_mapping(engine, '569813430019')
+    _insert_store_mapping(engine, '569813430019', active=False)
+
+    success, message = migrate_order_and_mapping_indexes(retry=True)
+    assert success, message
+    assert is_migration_applied(INDEX_MIGRATION_VERSION)
+
+    success, message = migrate_unique_active_mappings()
+    assert not success
+    assert 'store_mappings' in message
+    assert 'kehe/store/569813430012 (2 active)' in message
+    assert '569813430019' not in message
+    assert not is_migration_applied(UNIQUE_MAPPING_MIGRATION_VERSION)
+
+    with engine.begin() as conn:
+        conn.execute(text(
+            "UPDATE store_mappings SET active = FALSE WHERE id = "
+            "(SELECT MAX(id) FROM store_mappings WHERE raw_store_id = '569813430012')"
+        ))
+
+    success, message = migrate_unique_active_mappings()
+    assert success, message
+    assert is_migration_applied(UNIQUE_MAPPING_MIGRATION_VERSION)
+
+    # The index now rejects a second active mapping for the key
+    try:
+        _insert_store_mapping(engine, '569813430012')
+    except Exception:
+        pass
+    else:
+        raise AssertionError("duplicate active store mapping was accepted")
+
+
+if __name__ == "__main__":
+    test_duplicate_active_mappings_block_unique_migration()
+    print("[OK] Unique active mapping migration reports and then clears duplicates")
@@ -0,0 +1,134 @@
+"""
+Test the process-wide mapping snapshot cache (utils/mapping_cache.py)
+
+Snapshots, empty ones included, must be served until the mapping version
+changes or they expire; loader errors must never be cached, including a
+database outage seen through DatabaseService's customer mapping loader.
+
+Run with: python test_mapping_snapshot_cache.py  (or python -m pytest test_mapping_snapshot_cache.py)
+"""
+
+from sqlalchemy import create_engine, text
+
+import database.connection as connection
+import utils.mapping_cache as mapping_cache
+from utils.mapping_cache import MappingSnapshotCache
+from utils.mapping_utils import MappingUtils
+from database.service import DatabaseService
+from testing_database import use_test_database
+
+
+class CountingLoader:
+    def __init__(self, mappings):
+        self.mappings = mappings
+        self.calls = 0
+
+    def __call__(self, source):
+        self.calls += 1
+        if isinstance(self.mappings, Exception):
+            raise self.mappings
+        return dict(self.mappings)
+
+
+def test_snapshot_reused_until_version_changes():
+    cache = MappingSnapshotCache()
+    loader = CountingLoader({'569813430012': 'KL - Kehe'})
+
+    first = cache.get('store', 'kehe', 1, loader)
+    assert cache.get('store', 'kehe', 1, loader) is first
+    assert loader.calls == 1
+    assert first.index.get_lower('569813430012') == 'KL - Kehe'
+
+    loader.mappings = {'569813430012': 'KL - Renamed'}
+    second = cache.get('store', 'kehe', 2, loader)
+    assert loader.calls == 2
+    assert second.mappings == {'569813430012': 'KL - Renamed'}
+
+
+def test_empty_snapshot_is_cached():
+    cache = MappingSnapshotCache()
+    loader = CountingLoader({})
+
+    for _ in range(3):
+        assert cache.get('customer', 'vmc', 1, loader).mappings == {}
+    assert loader.calls == 1
+
+    loader.mappings = {'A1': 'Customer A'}
+    assert cache.get('customer', 'vmc', 2, loader).mappings == {'A1': 'Customer A'}
+
+
+def test_expired_snapshot_is_reloaded():
+    cache = MappingSnapshotCache()
+    loader = CountingLoader({})
+    cache.get('item', 'ross', 1, loader)
+
+    max_age = mapping_cache.SNAPSHOT_MAX_AGE_SECONDS
+    mapping_cache.SNAPSHOT_MAX_AGE_SECONDS = 0
+    try:
+        cache.get('item', 'ross', 1, loader)
+    finally:
+        mapping_cache.SNAPSHOT_MAX_AGE_SECONDS = max_age
+    assert loader.calls == 2
+
+
+def test_loader_errors_are_not_cached():
+    cache = MappingSnapshotCache()
+    loader = CountingLoader(RuntimeError("database unavailable"))
+
+    for _ in range(2):
+        try:
+            cache.get('item', 'kehe', 1, loader)
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("loader error was swallowed")
+    assert loader.calls == 2
+
+    loader.mappings = {'00110': '17-001-1'}
+    assert cache.get('item', 'kehe', 1, loader).mappings == {'00110': '17-001-1'}
+
+
+def test_customer_snapshot_survives_database_outage():
+    engine = use_test_database()
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO customer_mappings (source, raw_customer_id, mapped_customer_name, active, priority) "
+            "VALUES ('vmc', 'A1', 'ACME', 1, 100)"
+        ))
+    mapping_utils = MappingUtils(db_service=DatabaseService())
+    assert mapping_utils.get_customer_mapping('A1', 'vmc') == 'ACME'
+
+    # The database goes away just as the snapshot is due for a reload
+    DatabaseService.bump_mapping_version()
+    connection._engine = create_engine('sqlite:////nonexistent-directory/orders.db')
+    try:
+        assert mapping_utils.get_customer_mapping('A1', 'vmc') == 'UNKNOWN'
+        assert DatabaseService().get_customer_mappings('vmc') == {}
+    finally:
+        connection._engine = engine
+
+    # Back online: the failed load must not have left an empty snapshot behind
+    assert mapping_utils.get_customer_mapping('A1', 'vmc') == 'ACME'
+
+
+def test_invalidate_by_kind_and_source():
+    cache = MappingSnapshotCache()
+    loader = CountingLoader({'x': 'y'})
+    cache.get('store', 'kehe', 1, loader)
+    cache.get('item', 'kehe', 1, loader)
+
+    cache.invalidate(kind='store', source='kehe')
+    cache.get('item', 'kehe', 1, loader)
+    assert loader.calls == 2
+    cache.get('store', 'kehe', 1, loader)
+    assert loader.calls == 3
+
+
+if __name__ == "__main__":
+    test_snapshot_reused_until_version_changes()
+    test_empty_snapshot_is_cached()
+    test_expired_snapshot_is_reloaded()
+    test_loader_errors_are_not_cached()
+    test_customer_snapshot_survives_database_outage()
+    test_invalidate_by_kind_and_source()
+    print("[OK] Mapping snapshot cache")
@@ -0,0 +1,130 @@
+"""
+Test saving processed orders, paging through them and finding repeat uploads
+
+Covers save_processed_orders() (bulk insert of orders and line items),
+get_processed_orders_page() (keyset pagination, newest first) and
+find_previous_conversions() / get_conversion_output() (content hash reuse).
+
+Run with: python test_order_history.py  (or python -m pytest test_order_history.py)
+"""
+
+from sqlalchemy import text
+from testing_database import use_test_database
+from database.service import DatabaseService
+
+
+def _order_lines(prefix, orders, lines_per_order=2):
+    return [
+        {
+            'order_number': f"{prefix}-{order}",
+            'customer_name': f"Customer {order}",
+            'raw_customer_name': f"RAW {order}",
+            'order_date': '2025-09-17',
+            'item_number': f"17-00{line}-1",
+            'raw_item_number': f"0011{line}",
+            'item_description': f"Item {line}",
+            'quantity': str(line + 1),
+            'unit_price': 2.5,
+            'total_price': 2.5 * (line + 1),
+        }
+        for order in range(orders)
+        for line in range(lines_per_order)
+    ]
+
+
+def test_save_processed_orders_groups_lines_by_order():
+    engine = use_test_database()
+    db_service = DatabaseService()
+
+    assert db_service.save_processed_orders(_order_lines('PO', 3), 'KEHE - SPS', 'po.csv')
+
+    orders = db_service.get_processed_orders(source='KEHE - SPS')
+    assert sorted(order['order_number'] for order in orders) == ['PO-0', 'PO-1', 'PO-2']
+    for order in orders:
+        assert order['source_file'] == 'po.csv'
+        assert [(item['item_number'], item['quantity'], item['total_price']) for item in order['line_items']] == [
+            ('17-000-1', 1, 2.5), ('17-001-1', 2, 5.0)
+        ]
+    with engine.connect() as conn:
+        assert conn.execute(text(
+            "SELECT orders_count, line_items_count, success FROM conversion_history"
+        )).fetchall() == [(3, 6, 1)]
+
+    # A bad value fails the whole file: no partial orders, a failed history record
+    bad_lines = _order_lines('BAD', 2)
+    bad_lines[-1]['quantity'] = 'six'
+    assert not db_service.save_processed_orders(bad_lines, 'KEHE - SPS', 'bad.csv')
+    assert len(db_service.get_processed_orders(source='KEHE - SPS')) == 3
+    with engine.connect() as conn:
+        assert conn.execute(text(
+            "SELECT success FROM conversion_history WHERE filename = 'bad.csv'"
+        )).fetchall() == [(0,)]
+
+
+def test_keyset_pages_cover_every_order_once():
+    engine = use_test_database()
+    db_service = DatabaseService()
+    db_service.save_processed_orders(_order_lines('A', 4, 1), 'VMC', 'a.csv')
+    db_service.save_processed_orders(_order_lines('B', 3, 1), 'Davidson', 'b.csv')
+    db_service.save_processed_orders(_order_lines('C', 3, 1), 'VMC', 'c.csv')
+    # Orders of one file share processed_at; make the files' timestamps distinct too
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE processed_orders SET processed_at = '2025-09-17 10:00:00.000000' WHERE source_file = 'a.csv'"))
+        conn.execute(text("UPDATE processed_orders SET processed_at = '2025-09-17 12:00:00.000000' WHERE source_file = 'b.csv'"))
+        conn.execute(text("UPDATE processed_orders SET processed_at = '2025-09-17 11:00:00.000000' WHERE source_file = 'c.csv'"))
+
+    def all_pages(source, page_size):
+        pages, cursor = [], None
+        while True:
+            orders, cursor = db_service.get_processed_orders_page(source=source, page_size=page_size, cursor=cursor)
+            pages.append([order['order_number'] for order in orders])
+            if cursor is None:
+                return pages
+
+    # Newest first; orders saved together come back in reverse insert (id) order
+    assert all_pages(None, 4) == [['B-2', 'B-1', 'B-0', 'C-2'], ['C-1', 'C-0', 'A-3', 'A-2'], ['A-1', 'A-0']]
+    # A last page that is exactly full has no next cursor
+    assert all_pages('VMC', 7) == [['C-2', 'C-1', 'C-0', 'A-3', 'A-2', 'A-1', 'A-0']]
+    assert all_pages('VMC', 3) == [['C-2', 'C-1', 'C-0'], ['A-3', 'A-2', 'A-1'], ['A-0']]
+    assert all_pages('ROSS', 3) == [[]]
+
+
+def test_repeat_upload_reuses_stored_output():
+    use_test_database()
+    db_service = DatabaseService()
+    xoro_rows = [{'ThirdPartyRefNo': 'PO-0', 'ItemNumber': '17-000-1', 'Qty': 1}]
+
+    assert db_service.save_processed_orders(_order_lines('PO', 1, 1), 'ROSS', 'ross.pdf',
+                                            content_hash='a' * 64, xoro_rows=xoro_rows)
+    assert db_service.save_processed_orders(_order_lines('PO', 1, 1), 'ROSS', 'ross copy.pdf',
+                                            content_hash='b' * 64)
+
+    previous = db_service.find_previous_conversions(['a' * 64, 'b' * 64, 'c' * 64], 'ROSS')
+    assert set(previous) == {'a' * 64, 'b' * 64}
+    assert previous['a' * 64]['filename'] == 'ross.pdf' and previous['a' * 64]['has_output']
+    assert not previous['b' * 64]['has_output']
+    # Only conversions of the same source count
+    assert db_service.find_previous_conversions(['a' * 64], 'TJ Maxx') == {}
+
+    assert db_service.get_conversion_output(previous['a' * 64]['id']) == [
+        {'ThirdPartyRefNo': 'PO-0', 'ItemNumber': '17-000-1', 'Qty': '1'}
+    ]
+    assert db_service.get_conversion_output(previous['b' * 64]['id']) is None
+
+
+def test_repeat_upload_lookup_on_database_without_content_hash():
+    use_test_database(missing_columns=[('conversion_history', 'xoro_output'), ('conversion_history', 'content_hash')])
+    db_service = DatabaseService()
+
+    assert db_service.save_processed_orders(_order_lines('PO', 1, 1), 'ROSS', 'ross.pdf',
+                                            content_hash='a' * 64, xoro_rows=[{'Qty': 1}])
+    assert db_service.find_previous_conversions(['a' * 64], 'ROSS') == {}
+    assert [entry['filename'] for entry in db_service.get_conversion_history()] == ['ross.pdf']
+
+
+if __name__ == "__main__":
+    test_save_processed_orders_groups_lines_by_order()
+    test_keyset_pages_cover_every_order_once()
+    test_repeat_upload_reuses_stored_output()
+    test_repeat_upload_lookup_on_database_without_content_hash()
+    print("[OK] Order history")
@@ -0,0 +1,78 @@
+"""
+Parity test of utils/partial_matcher.py against the key-by-key scans it replaced
+
+PartialMatcher.match() must return the value of the first mapping key (in
+mapping order) that occurs inside the name or contains it, and match_word()
+the first key containing the word between \\b boundaries, exactly as a loop
+over the mapping does.
+
+Run with: python test_partial_matcher.py  (or python -m pytest test_partial_matcher.py)
+"""
+
+import csv
+import os
+import random
+import re
+from utils.partial_matcher import PartialMatcher
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def linear_match(mappings, name_lower):
+    for key, value in mappings.items():
+        if key.lower() in name_lower or name_lower in key.lower():
+            return value
+    return None
+
+
+def linear_match_word(mappings, word_lower):
+    for key, value in mappings.items():
+        if word_lower in str(key).lower() and re.search(r'\b' + re.escape(word_lower) + r'\b', str(key).lower()):
+            return value
+    return None
+
+
+def _random_text(rng, alphabet, max_length):
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length)))
+
+
+def test_random_mappings():
+    rng = random.Random(20250917)
+    # A small alphabet makes overlapping and nested keys common
+    alphabet = 'abAB -1'
+    for _ in range(300):
+        mappings = {}
+        for position in range(rng.randint(0, 12)):
+            mappings[_random_text(rng, alphabet, 6)] = f"value {position}"
+        matcher = PartialMatcher(mappings)
+        for _ in range(30):
+            name = _random_text(rng, alphabet, 10).lower()
+            assert matcher.match(name) == linear_match(mappings, name), (mappings, name)
+            if name:
+                assert matcher.match_word(name) == linear_match_word(mappings, name), (mappings, name)
+
+
+def test_whole_foods_store_names():
+    path = os.path.join(ROOT, 'mappings/wholefoods/Xoro Whole Foods Customer Mapping 9-17-25.csv')
+    with open(path, encoding='utf-8-sig') as f:
+        mappings = {row['MappedCustomerName']: row['RawCustomerID'] for row in csv.DictReader(f)}
+    matcher = PartialMatcher(mappings)
+
+    names = set()
+    for key in mappings:
+        key_lower = key.lower()
+        names.add(key_lower)
+        names.update(key_lower.split())
+        names.add(key_lower[3:-3])
+        names.add(key_lower + ' market')
+    names.update(['whole foods', 'no such store', '#', ' '])
+    for name in sorted(names):
+        assert matcher.match(name) == linear_match(mappings, name), name
+        if name:
+            assert matcher.match_word(name) == linear_match_word(mappings, name), name
+
+
+if __name__ == "__main__":
+    test_random_mappings()
+    test_whole_foods_store_names()
+    print("[OK] PartialMatcher matches the linear scans")
@@ -0,0 +1,168 @@
+"""
+Test PDF text extraction (parsers/pdf_text.py) and its cache (utils/pdf_text_cache.py)
+
+The in-memory tier must evict least recently used entries beyond max_chars,
+the disk tier must be read back by a fresh process (PDF_TEXT_CACHE_DIR) and
+never leave temporary files behind, and a cached PDF must not be decoded again.
+Parallel extraction must return the pages in order, exactly as serial
+extraction does, and fall back to serial extraction if the pool fails.
+
+Run with: python test_pdf_text.py  (or python -m pytest test_pdf_text.py)
+"""
+
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from PyPDF2 import PdfReader, PdfWriter
+
+import parsers.pdf_text as pdf_text
+from parsers.pdf_text import extract_pdf_pages
+from parsers.pdf_backends import get_pdf_backend
+from utils.pdf_text_cache import PDFTextCache, pdf_text_cache, content_digest
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_PDF = os.path.join(ROOT, 'order_samples/unfi_east/UNFI East PO4531365.pdf')
+
+# Prints the pages of SAMPLE_PDF as extracted in a new process
+EXTRACT_IN_SUBPROCESS = """
+import json, sys
+from PyPDF2 import PdfReader, PdfWriter
+
+import parsers.pdf_text as pdf_text
+from parsers.pdf_text import extract_pdf_pages
+if sys.argv[2] == 'no-backend':
+    from parsers.pdf_backends import PDF_BACKENDS
+    def _refuse(file_content):
+        raise AssertionError('PDF decoded despite a cached entry')
+    PDF_BACKENDS['pypdf2'].open = _refuse
+with open(sys.argv[1], 'rb') as f:
+    print(json.dumps(extract_pdf_pages(f.read(), 'unfi_east')))
+"""
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = PDFTextCache(max_chars=10, cache_dir=None)
+    cache.put('a', ('aaaa',))
+    cache.put('b', ('bbbb', None))
+    assert cache.get('a') == ('aaaa',)  # 'a' is now the most recently used
+
+    cache.put('c', ('cccc',))
+    assert cache.get('b') is None
+    assert cache.get('a') == ('aaaa',) and cache.get('c') == ('cccc',)
+
+    # An entry larger than the whole cache is not kept at all
+    cache.put('big', ('x' * 11,))
+    assert cache.get('big') is None and cache.get('a') == ('aaaa',)
+
+
+def test_disk_tier_round_trip():
+    cache_dir = tempfile.mkdtemp()
+    try:
+        env = dict(os.environ, PDF_TEXT_CACHE_DIR=cache_dir)
+
+        def extract(mode):
+            result = subprocess.run([sys.executable, '-c', EXTRACT_IN_SUBPROCESS, SAMPLE_PDF, mode],
+                                    cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+            return json.loads(result.stdout.strip().splitlines()[-1])
+
+        first = extract('decode')
+        assert os.listdir(cache_dir) == [
+            f"{get_pdf_backend('unfi_east').name}-{content_digest(open(SAMPLE_PDF, 'rb').read())}.json"
+        ]
+        # A new process reads the entry back instead of decoding the PDF
+        assert extract('no-backend') == first
+
+        # A failed write (here a directory in the entry's place) leaves no temporary file behind
+        os.mkdir(os.path.join(cache_dir, 'unwritable.json'))
+        PDFTextCache(cache_dir=cache_dir).put('unwritable', ('page',))
+        assert len(os.listdir(cache_dir)) == 2
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+def test_cached_pdf_is_not_decoded_again():
+    not_a_pdf = b'%PDF-1.4 truncated'
+    key = f"{get_pdf_backend('unfi_east').name}-{content_digest(not_a_pdf)}"
+    pdf_text_cache.put(key, ('cached page',))
+    try:
+        assert extract_pdf_pages(not_a_pdf, 'unfi_east') == ('cached page',)
+    finally:
+        pdf_text_cache.clear()
+
+
+def _multi_page_pdf() -> bytes:
+    """PDF with at least PDF_PARALLEL_MIN_PAGES pages, taken from the UNFI East samples"""
+    writer = PdfWriter()
+    samples_dir = os.path.join(ROOT, 'order_samples/unfi_east')
+    while len(writer.pages) < pdf_text.PDF_PARALLEL_MIN_PAGES:
+        for name in sorted(os.listdir(samples_dir)):
+            if name.lower().endswith('.pdf'):
+                for page in PdfReader(os.path.join(samples_dir, name)).pages:
+                    writer.add_page(page)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def test_parallel_extraction_matches_serial():
+    content = _multi_page_pdf()
+    max_workers = pdf_text.PDF_PARALLEL_MAX_WORKERS
+    extract_parallel = pdf_text._extract_parallel
+    chunks = []
+
+    def recording_extract_parallel(*args):
+        texts = extract_parallel(*args)
+        chunks.append(texts)
+        return texts
+
+    # Force a pool of several workers even on a single-core machine
+    pdf_text.PDF_PARALLEL_MAX_WORKERS = 3
+    pdf_text._extract_parallel = recording_extract_parallel
+    try:
+        pdf_text_cache.clear()
+        serial = extract_pdf_pages(content, 'unfi_east', parallel=False)
+        pdf_text_cache.clear()
+        parallel = extract_pdf_pages(content, 'unfi_east', parallel=True)
+    finally:
+        pdf_text.PDF_PARALLEL_MAX_WORKERS = max_workers
+        pdf_text._extract_parallel = extract_parallel
+        pdf_text_cache.clear()
+
+    assert len(chunks) == 1, "the pool was not used"
+    assert len(serial) >= pdf_text.PDF_PARALLEL_MIN_PAGES and len(set(serial)) > 1
+    assert parallel == serial
+
+
+def test_parallel_extraction_falls_back_to_serial():
+    content = _multi_page_pdf()
+    max_workers = pdf_text.PDF_PARALLEL_MAX_WORKERS
+    get_pool = pdf_text._get_pool
+
+    def broken_pool():
+        raise RuntimeError("process pool unavailable")
+
+    pdf_text.PDF_PARALLEL_MAX_WORKERS = 3
+    try:
+        pdf_text_cache.clear()
+        serial = extract_pdf_pages(content, 'unfi_east', parallel=False)
+        pdf_text_cache.clear()
+        pdf_text._get_pool = broken_pool
+        assert extract_pdf_pages(content, 'unfi_east', parallel=True) == serial
+    finally:
+        pdf_text.PDF_PARALLEL_MAX_WORKERS = max_workers
+        pdf_text._get_pool = get_pool
+        pdf_text_cache.clear()
+
+
+if __name__ == "__main__":
+    test_memory_tier_evicts_least_recently_used()
+    test_disk_tier_round_trip()
+    test_cached_pdf_is_not_decoded_again()
+    test_parallel_extraction_matches_serial()
+    test_parallel_extraction_falls_back_to_serial()
+    print("[OK] PDF text extraction")
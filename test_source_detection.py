@@ -0,0 +1,108 @@
+"""
+Test order source detection (parsers/source_detection.py)
+
+Every file in order_samples/ must be detected as the source of its folder,
+or left undetected if no source reads it (Chex and Nassau orders, Xoro
+exports, mapping files). PDFs matching the markers of several sources must
+be left undetected rather than guessed.
+
+Run with: python test_source_detection.py  (or python -m pytest test_source_detection.py)
+"""
+
+import os
+from parsers.source_detection import detect_order_source
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'order_samples')
+
+# Sample folder -> expected source key (None: no source reads these orders)
+SAMPLE_FOLDER_SOURCES = {
+    'wholefoods': 'wholefoods',
+    'unfi_east': 'unfi_east',
+    'kehe': 'kehe',
+    'vmc': 'vmc',
+    'davidson': 'davidson',
+    'ross': 'ross',
+    'tjmaxx': 'tkmaxx',
+    'chex': None,
+    'nassau': None,
+}
+
+
+def _expected_source(folder: str, file_name: str):
+    name = file_name.lower()
+    if name.startswith('xoro_orders') or 'mapping' in name or name.endswith('.ini'):
+        return None
+    return SAMPLE_FOLDER_SOURCES[folder]
+
+
+def _one_page_pdf(lines) -> bytes:
+    """Minimal PDF with the given text lines on one page"""
+    stream = "BT /F1 12 Tf 72 720 Td 14 TL " + " ".join(
+        "(" + line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)') + ") Tj T*" for line in lines
+    ) + " ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        "/Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = "%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n{body}\nendobj\n"
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    return pdf.encode('latin-1')
+
+
+def test_sample_files():
+    wrong = []
+    for folder in sorted(os.listdir(SAMPLES_DIR)):
+        folder_path = os.path.join(SAMPLES_DIR, folder)
+        for file_name in sorted(os.listdir(folder_path)):
+            with open(os.path.join(folder_path, file_name), 'rb') as f:
+                detection = detect_order_source(file_name, f.read())
+            detected = detection.source.key if detection.source else None
+            if detected != _expected_source(folder, file_name):
+                wrong.append(f"{folder}/{file_name}: {detected} ({detection.reason})")
+    assert not wrong, "\n".join(wrong)
+
+
+def test_pdf_markers():
+    ross = _one_page_pdf(["ROSS STORES, INC.", "PURCHASE ORDER 0123456"])
+    assert detect_order_source('order.pdf', ross).source.key == 'ross'
+
+    unfi = _one_page_pdf(["UNFI", "Purchase Order 4470123"])
+    assert detect_order_source('order.pdf', unfi).source.key == 'unfi_east'
+
+    # Retailer POs may mention UNFI (e.g. as the vendor); never route them to UNFI East
+    for lines in (["ROSS STORES, INC.", "Vendor: UNFI"], ["TJX Companies", "Ship via UNFI"]):
+        detection = detect_order_source('order.pdf', _one_page_pdf(lines))
+        assert detection.source is None, detection
+        assert 'UNFI East' in detection.reason
+
+    assert detect_order_source('order.pdf', b'not a pdf').source is None
+
+
+def test_sps_partner_in_header_record():
+    header = "PO Number,Record Type,Partner,Vendor Style\n"
+    csv_for = lambda partner: (header + f"PO1,H,{partner},\nPO1,D,,00110\n").encode()
+
+    assert detect_order_source('po1.csv', csv_for('KEHE DISTRIBUTORS')).source.key == 'kehe'
+    assert detect_order_source('po1.csv', csv_for('Davidson Dist')).source.key == 'davidson'
+    # No partner: the file name decides, a conflicting partner wins over it
+    assert detect_order_source('VMC po1.csv', csv_for('')).source.key == 'vmc'
+    assert detect_order_source('KEHE po1.csv', csv_for('Davidson Dist')).source.key == 'davidson'
+    assert detect_order_source('po1.csv', csv_for('')).source is None
+
+
+if __name__ == "__main__":
+    test_sample_files()
+    test_pdf_markers()
+    test_sps_partner_in_header_record()
+    print("[OK] Order source detection")
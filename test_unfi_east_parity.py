@@ -0,0 +1,71 @@
+"""
+Parity test of the single-pass UNFI East line-item tokenizer (parsers/unfi_east_parser.py)
+
+test_unfi_east_parity_expected.json holds what the UNFI East parser returned
+for every PDF in order_samples/unfi_east before its line items were
+tokenized in one compiled pass, with the mappings seeded below. The parser
+must reproduce it exactly.
+
+Run with: python test_unfi_east_parity.py  (or python -m pytest test_unfi_east_parity.py)
+"""
+
+import csv
+import json
+import os
+import pandas as pd
+from testing_database import use_test_database, temporary_working_directory
+from database.connection import get_session
+from database.models import ItemMapping, CustomerMapping
+from parsers.unfi_east_parser import UNFIEastParser
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SAMPLES_DIR = os.path.join(ROOT, 'order_samples/unfi_east')
+MAPPINGS_DIR = os.path.join(ROOT, 'mappings/unfi_east')
+EXPECTED_FILE = os.path.join(ROOT, 'test_unfi_east_parity_expected.json')
+
+
+def _seed_mappings():
+    """UNFI East item and DC customer (IOW code) mappings from the repo"""
+    use_test_database()
+    with get_session() as session:
+        with open(os.path.join(MAPPINGS_DIR, 'Xoro UNFI East Item Mapping 9-16-25 (1).csv'), encoding='utf-8-sig') as f:
+            for row in csv.DictReader(f):
+                session.add(ItemMapping(source='unfi_east', raw_item=row['RawKeyValue'], mapped_item=row['MappedItemNumber'],
+                                        key_type=row['RawKeyType'], priority=int(row['Priority'] or 100), active=True,
+                                        mapped_description=row['MappedDescription']))
+        customers = pd.read_excel(os.path.join(MAPPINGS_DIR, 'Xoro UNFI East DC Customer Mapping 9-17-25.xlsx'), dtype=str)
+        for _, row in customers.iterrows():
+            session.add(CustomerMapping(source='unfi_east', raw_customer_id=row['RawCustomerID'],
+                                        mapped_customer_name=row['MappedCustomerName'],
+                                        customer_type=row['CustomerType'], active=True, priority=100))
+
+
+def parse_samples(parser_class=UNFIEastParser):
+    """Parse every sample PDF with the seeded mappings; orders by file name, dates as strings"""
+    _seed_mappings()
+    parser = parser_class()
+    results = {}
+    # Keeps the default store mapping files the parser may create out of the repo
+    with temporary_working_directory():
+        for name in sorted(os.listdir(SAMPLES_DIR)):
+            if not name.lower().endswith('.pdf'):
+                continue
+            with open(os.path.join(SAMPLES_DIR, name), 'rb') as f:
+                orders = parser.parse(f.read(), 'pdf', name)
+            results[name] = json.loads(json.dumps(orders, default=str))
+    return results
+
+
+def test_parity_with_previous_parser():
+    with open(EXPECTED_FILE) as f:
+        expected = json.load(f)
+
+    results = parse_samples()
+    assert sorted(results) == sorted(expected)
+    different = [name for name in expected if results[name] != expected[name]]
+    assert not different, f"Output changed for: {', '.join(different)}"
+
+
+if __name__ == "__main__":
+    test_parity_with_previous_parser()
+    print("[OK] UNFI East parser matches its previous output")
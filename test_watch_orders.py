@@ -0,0 +1,102 @@
+"""
+Test the drop-folder watcher (scripts/watch_orders.py)
+
+Each file content must be converted exactly once, even when re-sent under a
+new name, and an aborted batch must not leave files claimed as 'processing'.
+
+Run with: python test_watch_orders.py  (or python -m pytest test_watch_orders.py)
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from testing_database import use_test_database
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+import watch_orders
+from parsers.registry import ORDER_SOURCES
+from utils.pdf_text_cache import content_digest
+
+VMC_SAMPLES = sorted(Path(__file__).resolve().parent.glob('order_samples/vmc/vmc _xo10242_*.csv'))
+
+
+def _watcher(drop: Path, outbox: Path):
+    ledger = watch_orders.ProcessedFileLedger(outbox / watch_orders.LEDGER_FILE_NAME)
+    watcher = watch_orders.OrderFolderWatcher([(ORDER_SOURCES['vmc'], drop)], outbox, ledger,
+                                              workers=1, settle_seconds=0)
+    return watcher, ledger
+
+
+def test_files_are_converted_once():
+    use_test_database()
+    work = Path(tempfile.mkdtemp())
+    try:
+        drop, outbox = work / 'drop', work / 'outbox'
+        drop.mkdir()
+        shutil.copy(VMC_SAMPLES[0], drop / 'order1.csv')
+        watcher, ledger = _watcher(drop, outbox)
+
+        assert watcher.run_once() == 1
+        content_hash = content_digest((drop / 'order1.csv').read_bytes())
+        assert ledger.status_of(content_hash) == 'done'
+        assert len(list((outbox / 'vmc').glob('order1_*.csv'))) == 1
+
+        # The same content under another name, in a new run, is not converted again
+        shutil.copy(VMC_SAMPLES[0], drop / 'order1 (copy).csv')
+        ledger.close()
+        watcher, ledger = _watcher(drop, outbox)
+        assert watcher.run_once() == 0
+        assert len(list((outbox / 'vmc').glob('*.csv'))) == 1
+        ledger.close()
+    finally:
+        shutil.rmtree(work)
+
+
+def test_aborted_batch_releases_unfinished_claims():
+    use_test_database()
+    work = Path(tempfile.mkdtemp())
+    converted_files = watch_orders.iter_converted_files
+
+    def interrupted_after_first_file(*args, **kwargs):
+        for result in converted_files(*args, **kwargs):
+            yield result
+            raise KeyboardInterrupt
+
+    try:
+        drop, outbox = work / 'drop', work / 'outbox'
+        drop.mkdir()
+        for number, sample in enumerate(VMC_SAMPLES[:3]):
+            shutil.copy(sample, drop / f"order{number}.csv")
+            os.utime(drop / f"order{number}.csv", (1000 + number, 1000 + number))
+        hashes = [content_digest(sample.read_bytes()) for sample in VMC_SAMPLES[:3]]
+        watcher, ledger = _watcher(drop, outbox)
+
+        watch_orders.iter_converted_files = interrupted_after_first_file
+        try:
+            watcher.run_once()
+        except KeyboardInterrupt:
+            pass
+        else:
+            raise AssertionError("the interruption was swallowed")
+        finally:
+            watch_orders.iter_converted_files = converted_files
+
+        assert [ledger.status_of(content_hash) for content_hash in hashes] == ['done', None, None]
+        assert ledger.count_processing() == 0
+
+        # The released files are picked up by the next scan
+        assert watcher.run_once() == 2
+        assert [ledger.status_of(content_hash) for content_hash in hashes] == ['done', 'done', 'done']
+        ledger.close()
+    finally:
+        watch_orders.iter_converted_files = converted_files
+        shutil.rmtree(work)
+
+
+if __name__ == "__main__":
+    test_files_are_converted_once()
+    test_aborted_batch_releases_unfinished_claims()
+    print("[OK] Folder watcher")
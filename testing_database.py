@@ -0,0 +1,66 @@
+"""
+Throwaway in-memory database for the test scripts (test_*.py)
+
+The application only connects to PostgreSQL (see database/env_config.py), so
+the tests point the lazily created engine of database/connection.py at an
+in-memory SQLite database with the current models' tables instead.
+"""
+
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.pool import StaticPool
+
+import database.connection as connection
+from database.models import Base
+from database.schema import schema_capabilities
+from database.service import DatabaseService
+
+
+def use_test_database(missing_columns=()):
+    """
+    Create a fresh in-memory database and make it the application's database
+
+    Args:
+        missing_columns: (table, column) pairs to drop after creating the
+            tables, to imitate a database from before a migration
+
+    Returns:
+        The SQLAlchemy engine
+    """
+    engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for table_name, column_name in missing_columns:
+            # SQLite refuses to drop an indexed column
+            for index in inspect(conn).get_indexes(table_name):
+                if column_name in index['column_names']:
+                    conn.execute(text(f"DROP INDEX {index['name']}"))
+            conn.execute(text(f"ALTER TABLE {table_name} DROP COLUMN {column_name}"))
+
+    connection._engine = engine
+    schema_capabilities.refresh()
+    DatabaseService.bump_mapping_version()
+    return engine
+
+
+@contextmanager
+def temporary_working_directory():
+    """
+    Run the block in an empty temporary directory
+
+    MappingUtils reads (and creates default) store mapping files under
+    mappings/<source>/ relative to the working directory, so parsers called
+    from a test would otherwise write into the repository.
+    """
+    previous = os.getcwd()
+    work = tempfile.mkdtemp()
+    os.chdir(work)
+    try:
+        yield work
+    finally:
+        os.chdir(previous)
+        shutil.rmtree(work, ignore_errors=True)
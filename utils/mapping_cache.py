@@ -0,0 +1,225 @@
+"""
+Process-wide in-memory cache of database mapping tables
+
+MappingUtils looks mappings up once per line item. Without a cache every lookup
+re-downloads the full store/customer/item mapping table for the source. This
+module keeps one snapshot per (kind, source) and only reloads it when
+DatabaseService.bump_mapping_version() reports a mapping write, or when the
+snapshot is older than SNAPSHOT_MAX_AGE_SECONDS (edits made by another process).
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from utils.partial_matcher import PartialMatcher
+
+# Safety net for mapping edits made by other processes (other workers, scripts)
+SNAPSHOT_MAX_AGE_SECONDS = 300
+
+
+def strip_numeric_suffix(key: str) -> str:
+    """Remove a trailing .0 from numeric strings (e.g. "256821.0" -> "256821")"""
+    key_str = str(key).strip()
+    if key_str.endswith('.0') and key_str[:-2].replace('.', '').isdigit():
+        return key_str[:-2]
+    return key_str
+
+
+def compact_key(key: str) -> str:
+    """Remove spaces and dashes (e.g. "13 025 24" or "13-025-24" -> "1302524")"""
+    return str(key).replace(' ', '').replace('-', '')
+
+
+def code_affixes(key: str) -> set:
+    """
+    All codes that match a customer key by prefix/suffix rules
+
+    A code matches "128 RCH" if it is the first or last word, a prefix
+    followed by a space, or a suffix preceded by a non-alphanumeric character.
+    Used for UNFI East IOW codes such as "RCH" -> "128 RCH".
+    """
+    key_lower = str(key).strip().lower()
+    affixes = set()
+    for i, ch in enumerate(key_lower):
+        if not ch.isalnum() and i + 1 < len(key_lower):
+            affixes.add(key_lower[i + 1:])
+        if ch == ' ' and i > 0:
+            affixes.add(key_lower[:i])
+    if ' ' in key_lower:
+        parts = key_lower.split()
+        if parts:
+            affixes.add(parts[0])
+            affixes.add(parts[-1])
+    return affixes
+
+
+class MappingIndex:
+    """
+    Normalized side indexes over a mapping dict
+
+    Each index maps a normalized key to (position, value), where position is
+    the key's insertion order in the source dict. When several keys normalize
+    to the same value the first one wins, matching the linear scans these
+    indexes replace. Indexes are built lazily on first use.
+    """
+
+    def __init__(self, mappings: Dict[str, str]):
+        self.mappings = mappings
+        self._lower: Optional[Dict[str, Tuple[int, str]]] = None
+        self._compact: Optional[Dict[str, Tuple[int, str]]] = None
+        self._numeric: Optional[Dict[str, Tuple[int, str]]] = None
+        self._affix: Optional[Dict[str, Tuple[int, str]]] = None
+        self._partial: Optional[PartialMatcher] = None
+        self._lock = threading.Lock()
+
+    def _build(self, normalize: Callable[[str], str]) -> Dict[str, Tuple[int, str]]:
+        index: Dict[str, Tuple[int, str]] = {}
+        for position, (key, value) in enumerate(self.mappings.items()):
+            index.setdefault(normalize(key), (position, value))
+        return index
+
+    @property
+    def lower(self) -> Dict[str, Tuple[int, str]]:
+        """Index keyed by str(key).lower()"""
+        if self._lower is None:
+            with self._lock:
+                if self._lower is None:
+                    self._lower = self._build(lambda key: str(key).lower())
+        return self._lower
+
+    @property
+    def compact(self) -> Dict[str, Tuple[int, str]]:
+        """Index keyed by the key with spaces and dashes removed"""
+        if self._compact is None:
+            with self._lock:
+                if self._compact is None:
+                    self._compact = self._build(compact_key)
+        return self._compact
+
+    @property
+    def numeric(self) -> Dict[str, Tuple[int, str]]:
+        """Index keyed by the key with a numeric .0 suffix removed"""
+        if self._numeric is None:
+            with self._lock:
+                if self._numeric is None:
+                    self._numeric = self._build(strip_numeric_suffix)
+        return self._numeric
+
+    @property
+    def affix(self) -> Dict[str, Tuple[int, str]]:
+        """Index keyed by every code_affixes() value of each key"""
+        if self._affix is None:
+            with self._lock:
+                if self._affix is None:
+                    index: Dict[str, Tuple[int, str]] = {}
+                    for position, (key, value) in enumerate(self.mappings.items()):
+                        for affix in code_affixes(key):
+                            index.setdefault(affix, (position, value))
+                    self._affix = index
+        return self._affix
+
+    @property
+    def partial(self) -> PartialMatcher:
+        """Substring matcher over the lower-cased keys"""
+        if self._partial is None:
+            with self._lock:
+                if self._partial is None:
+                    self._partial = PartialMatcher(self.mappings)
+        return self._partial
+
+    def get_lower(self, key: str) -> Optional[str]:
+        """Case-insensitive lookup"""
+        hit = self.lower.get(str(key).lower())
+        return hit[1] if hit else None
+
+    def get_first_lower(self, keys) -> Optional[str]:
+        """Case-insensitive lookup of several keys; the earliest mapping entry wins"""
+        hits = [self.lower[key.lower()] for key in keys if key.lower() in self.lower]
+        return min(hits)[1] if hits else None
+
+    def get_compact(self, key: str) -> Optional[str]:
+        """Lookup ignoring spaces and dashes on both sides"""
+        hit = self.compact.get(compact_key(key))
+        return hit[1] if hit else None
+
+    def get_numeric(self, key: str) -> Optional[str]:
+        """Lookup ignoring a numeric .0 suffix on both sides"""
+        hit = self.numeric.get(strip_numeric_suffix(key))
+        return hit[1] if hit else None
+
+    def get_affix(self, code: str) -> Optional[str]:
+        """Lookup of a code that is a word-like prefix or suffix of a key"""
+        hit = self.affix.get(str(code).lower())
+        return hit[1] if hit else None
+
+
+class MappingSnapshot:
+    """An immutable copy of one mapping table for one source"""
+
+    def __init__(self, kind: str, source: str, mappings: Dict[str, str], version: int):
+        self.kind = kind
+        self.source = source
+        self.mappings = mappings
+        self.index = MappingIndex(mappings)
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+    def is_fresh(self, current_version: int) -> bool:
+        """Check whether this snapshot can still be served"""
+        if self.version != current_version:
+            return False
+        return (time.monotonic() - self.loaded_at) < SNAPSHOT_MAX_AGE_SECONDS
+
+
+class MappingSnapshotCache:
+    """Thread-safe store of mapping snapshots keyed by (kind, source)"""
+
+    def __init__(self):
+        self._snapshots: Dict[Tuple[str, str], MappingSnapshot] = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind: str, source: str, version: int,
+            loader: Callable[[str], Dict[str, str]]) -> MappingSnapshot:
+        """
+        Return the snapshot for kind/source, calling loader(source) on a miss
+
+        Args:
+            kind: Mapping table kind ('store', 'customer' or 'item')
+            source: Order source passed through to the loader
+            version: Current mapping version from DatabaseService
+            loader: Function returning the full mapping dict for the source
+
+        Returns:
+            MappingSnapshot for the source. Loader errors are propagated and
+            never cached. Empty tables are cached like any other, so sources
+            without mappings are not reloaded on every lookup; the version
+            counter and SNAPSHOT_MAX_AGE_SECONDS expire them.
+        """
+        key = (kind, source)
+        snapshot = self._snapshots.get(key)
+        if snapshot is not None and snapshot.is_fresh(version):
+            return snapshot
+
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None and snapshot.is_fresh(version):
+                return snapshot
+
+            snapshot = MappingSnapshot(kind, source, loader(source) or {}, version)
+            self._snapshots[key] = snapshot
+            return snapshot
+
+    def invalidate(self, kind: Optional[str] = None, source: Optional[str] = None) -> None:
+        """Drop cached snapshots, optionally limited to one kind and/or source"""
+        with self._lock:
+            if kind is None and source is None:
+                self._snapshots.clear()
+                return
+            for key in list(self._snapshots):
+                if (kind is None or key[0] == kind) and (source is None or key[1] == source):
+                    del self._snapshots[key]
+
+
+# Shared by every MappingUtils instance in the process
+snapshot_cache = MappingSnapshotCache()
@@ -0,0 +1,251 @@
+"""
+Column-level normalization of uploaded mapping sheets
+
+Turns an uploaded store/customer/item mapping DataFrame into the mappings_data
+payload expected by the DatabaseService bulk upserts. Header aliases are
+resolved once per sheet and every field is cleaned with whole-column pandas
+operations instead of a per-row loop.
+
+Blank cells (NaN) count as missing, so a later alias column or the default is
+used for them.
+"""
+
+import math
+from typing import Callable, Dict, Iterable, List, Tuple
+import pandas as pd
+
+# Header aliases in order of preference, per mapping type
+RAW_ID_ALIASES = {
+    'customer': ['Raw Customer ID', 'RawCustomerID', 'Raw Customer', 'Customer ID', 'Raw ID'],
+    'store': ['Raw Store ID', 'RawStoreID', 'Raw Store', 'Store ID', 'Raw ID'],
+}
+MAPPED_NAME_ALIASES = {
+    'customer': ['Mapped Customer Name', 'MappedCustomerName', 'Customer Name', 'Mapped Name', 'Name'],
+    'store': ['Mapped Store Name', 'MappedStoreName', 'Store Name', 'Mapped Name', 'Name'],
+}
+STORE_TYPE_ALIASES = ['Store Type', 'StoreType', 'Type']
+SOURCE_ALIASES = ['Source', 'source']
+RAW_ITEM_ALIASES = ['Raw Item', 'RawKeyValue', 'Raw Item Number']
+MAPPED_ITEM_ALIASES = ['Mapped Item', 'MappedItemNumber', 'Mapped Item Number']
+DESCRIPTION_ALIASES = ['Item Description', 'MappedDescription', 'Description']
+PRIORITY_ALIASES = ['Priority', 'priority']
+ACTIVE_ALIASES = ['Active', 'active', 'Active Status']
+NOTES_ALIASES = ['Notes', 'notes', 'Note']
+
+TRUE_STRINGS = ('true', '1', 'yes', 'on')
+DEFAULT_PRIORITY = 100
+
+
+def _compact_header(column) -> str:
+    """Header with case, spaces, underscores and dashes removed ("Use Case Qty" -> "usecaseqty")"""
+    return str(column).strip().lower().replace(' ', '').replace('_', '').replace('-', '')
+
+
+def _first_present(df: pd.DataFrame, aliases: Iterable[str]) -> pd.Series:
+    """
+    Per row, the value of the first alias column that is not blank
+
+    Returns:
+        Object Series aligned with df; None where every alias is blank or absent
+    """
+    result = pd.Series([None] * len(df), index=df.index, dtype=object)
+    missing = pd.Series(True, index=df.index)
+    for alias in aliases:
+        if alias not in df.columns:
+            continue
+        column = df[alias]
+        present = column.notna() & (column.map(str) != '')
+        take = missing & present
+        result[take] = column[take].astype(object)
+        missing &= ~take
+        if not missing.any():
+            break
+    return result
+
+
+def _clean_text(values: pd.Series, default: str = '') -> pd.Series:
+    """Blank values become the default, everything else is converted to a stripped string"""
+    return values.where(values.notna(), default).map(str).str.strip()
+
+
+def _is_integral_float(value) -> bool:
+    """True for floats such as 569813000000.0 that hold a whole number"""
+    return isinstance(value, float) and math.isfinite(value) and value == int(value)
+
+
+def _clean_ids(values: pd.Series) -> pd.Series:
+    """
+    Normalize raw IDs to strings: integral floats lose their fraction and a
+    trailing .0 is removed from numeric strings ("569813000000.0" -> "569813000000")
+    """
+    integral = values.map(_is_integral_float)
+    cleaned = _clean_text(values)
+    if integral.any():
+        cleaned[integral] = values[integral].map(lambda v: str(int(v)))
+    numeric_suffix = cleaned.str.endswith('.0') & cleaned.str.replace(r'[.\-]', '', regex=True).str.isdigit()
+    cleaned[numeric_suffix] = cleaned[numeric_suffix].str[:-2]
+    return cleaned
+
+
+def _clean_priority(df: pd.DataFrame) -> pd.Series:
+    """First priority column holding an integer (numbers are truncated), else DEFAULT_PRIORITY"""
+    result = pd.Series(DEFAULT_PRIORITY, index=df.index, dtype='int64')
+    missing = pd.Series(True, index=df.index)
+    for alias in PRIORITY_ALIASES:
+        if alias not in df.columns:
+            continue
+        column = df[alias]
+        if pd.api.types.is_numeric_dtype(column):
+            parsed = pd.to_numeric(column, errors='coerce').astype('float64')
+        else:
+            # Strings must be whole integers, as int() requires
+            text = column.where(column.notna(), '').map(str).str.strip()
+            parsed = pd.to_numeric(text.where(text.str.fullmatch(r'[+-]?\d+'), None), errors='coerce').astype('float64')
+        parsed = parsed.where(parsed.abs() != float('inf'))
+        take = missing & parsed.notna()
+        result[take] = parsed[take].map(int).astype('int64')
+        missing &= ~take
+    return result
+
+
+def _clean_active(df: pd.DataFrame) -> pd.Series:
+    """First non-blank active column, by truthiness (the sheet reader already parses text flags), else True"""
+    result = pd.Series(True, index=df.index, dtype=bool)
+    missing = pd.Series(True, index=df.index)
+    for alias in ACTIVE_ALIASES:
+        if alias not in df.columns:
+            continue
+        column = df[alias]
+        take = missing & column.notna()
+        result[take] = column[take].astype(bool)
+        missing &= ~take
+    return result
+
+
+def _flag_values(column: pd.Series) -> pd.Series:
+    """True where a flag cell is set: True, or text in TRUE_STRINGS"""
+    return column.notna() & column.map(str).str.strip().str.lower().isin(TRUE_STRINGS)
+
+
+def _first_positive(parsed: List[pd.Series], index) -> pd.Series:
+    """Per row, the first value greater than zero across the parsed columns (NaN if none)"""
+    result = pd.Series(float('nan'), index=index)
+    for values in parsed:
+        result = result.where(result.notna(), values.where(values > 0))
+    return result
+
+
+def _clean_case_qty(df: pd.DataFrame) -> pd.Series:
+    """
+    Units per case for each row, or None
+
+    A positive "Case Qty" value wins; otherwise a set "Use Case Qty" flag
+    means 1.0. Exact header matches ("Case Qty", "Case") are consulted before
+    any other header containing "case qty".
+    """
+    # Later headers win when two compact to the same name
+    compact = {_compact_header(column): column for column in df.columns}
+
+    use_case_qty = pd.Series(False, index=df.index)
+    for column in df.columns:
+        header = _compact_header(column)
+        if 'usecase' in header or 'useqty' in header:
+            use_case_qty |= _flag_values(df[column])
+
+    def parse(column_name):
+        column = df[column_name]
+        if pd.api.types.is_numeric_dtype(column):
+            return pd.to_numeric(column, errors='coerce').astype('float64')
+        text = column.where(column.notna(), '').map(str).str.strip()
+        return pd.to_numeric(text, errors='coerce').astype('float64')
+
+    exact = [parse(compact[pattern]) for pattern in ('caseqty', 'case') if pattern in compact]
+    fallback = [
+        parse(column) for column in df.columns
+        if 'caseqty' in _compact_header(column) and 'use' not in _compact_header(column)
+    ]
+
+    # Rows with any readable exact-match value only look at the exact matches
+    has_exact = pd.Series(False, index=df.index)
+    for values in exact:
+        has_exact |= values.notna()
+    case_qty = _first_positive(exact, df.index).where(has_exact, _first_positive(fallback, df.index))
+
+    result = pd.Series([None] * len(df), index=df.index, dtype=object)
+    result[use_case_qty] = 1.0
+    positive = case_qty.notna()
+    result[positive] = case_qty[positive].astype(object)
+    return result
+
+
+def build_mappings_payload(df: pd.DataFrame, processor: str, mapping_type: str,
+                           normalize_source: Callable[[str], str],
+                           include_case_qty: bool = False) -> Tuple[List[Dict], List[str]]:
+    """
+    Normalize an uploaded mapping sheet into bulk-upsert rows
+
+    Args:
+        df: Uploaded sheet
+        processor: Order processor the sheet was uploaded for
+        mapping_type: 'customer', 'store' or 'item'
+        normalize_source: Source name normalizer (DatabaseService.normalize_source_name)
+        include_case_qty: Add a case_qty entry to item rows
+
+    Returns:
+        Tuple of (mappings_data, skipped_rows). Customer and store rows use the
+        store mapping keys (raw_store_id, mapped_store_name, store_type).
+    """
+    if df.empty:
+        return [], []
+
+    priority = _clean_priority(df)
+    active = _clean_active(df)
+    notes = _clean_text(_first_present(df, NOTES_ALIASES))
+
+    if mapping_type in ['customer', 'store']:
+        csv_source = _clean_text(_first_present(df, SOURCE_ALIASES))
+        default_source = normalize_source(processor)
+        normalized_sources = {value: normalize_source(value) for value in csv_source.unique() if value}
+        source = csv_source.map(lambda value: normalized_sources.get(value, default_source))
+
+        raw = _clean_ids(_first_present(df, RAW_ID_ALIASES[mapping_type]))
+        mapped = _clean_text(_first_present(df, MAPPED_NAME_ALIASES[mapping_type]))
+        if mapping_type == 'customer':
+            # Customer uploads are always labeled 'customer' to keep datasets separate
+            store_type = pd.Series('customer', index=df.index)
+        else:
+            store_type = _clean_text(_first_present(df, STORE_TYPE_ALIASES), default='store')
+
+        columns = {
+            'source': source,
+            'raw_store_id': raw,
+            'mapped_store_name': mapped,
+            'store_type': store_type,
+            'priority': priority,
+            'active': active,
+            'notes': notes,
+        }
+        skip_reason = "Missing raw_name or mapped_name"
+    else:
+        raw = _clean_ids(_first_present(df, RAW_ITEM_ALIASES))
+        mapped = _clean_text(_first_present(df, MAPPED_ITEM_ALIASES))
+        columns = {
+            'source': pd.Series(processor, index=df.index),
+            'raw_item': raw,
+            'mapped_item': mapped,
+            'mapped_description': _clean_text(_first_present(df, DESCRIPTION_ALIASES)),
+            'priority': priority,
+            'active': active,
+            'notes': notes,
+        }
+        if include_case_qty:
+            columns['case_qty'] = _clean_case_qty(df)
+        skip_reason = "Missing raw_item or mapped_item"
+
+    valid = (raw != '') & (mapped != '')
+    skipped_rows = [f"Row {index + 1}: {skip_reason}" for index in df.index[~valid]]
+
+    # tolist() hands back plain Python ints/bools/floats (and None) for the database layer
+    values = [series[valid].tolist() for series in columns.values()]
+    mappings_data = [dict(zip(columns, row)) for row in zip(*values)]
+    return mappings_data, skipped_rows
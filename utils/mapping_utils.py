@@ -4,26 +4,58 @@ Utilities for handling customer and store name mappings
 
 import pandas as pd
 import os
-import re
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, List, Tuple
+import threading
+from utils.mapping_cache import snapshot_cache, MappingIndex, MappingSnapshot, strip_numeric_suffix
 
 class MappingUtils:
     """Utilities for mapping customer/store names"""
     
-    def __init__(self, use_database: bool = True):
+    def __init__(self, use_database: bool = True, db_service=None):
         self.mapping_cache = {}
         self.use_database = use_database
         
-        if use_database:
+        if use_database and db_service is not None:
+            self.db_service = db_service
+        elif use_database:
             try:
-                from database.service import DatabaseService
-                self.db_service = DatabaseService()
+                from database.service import get_shared_database_service
+                self.db_service = get_shared_database_service()
             except ImportError:
                 self.use_database = False
                 self.db_service = None
         else:
             self.db_service = None
     
+    def _get_db_snapshot(self, kind: str, source: str) -> MappingSnapshot:
+        """
+        Get a database mapping table through the process-wide snapshot cache
+        
+        Args:
+            kind: 'store', 'customer' or 'item'
+            source: Order source
+            
+        Returns:
+            MappingSnapshot for the source (reloaded only after a mapping write)
+        """
+        loaders = {
+            'store': self.db_service.get_store_mappings,
+            'customer': self.db_service.load_customer_mappings,
+            'item': self.db_service.get_item_mappings,
+        }
+        version = self.db_service.get_mapping_version()
+        return snapshot_cache.get(kind, source, version, loaders[kind])
+    
+    def _get_file_index(self, mapping_key: str) -> MappingIndex:
+        """Get (or build) the normalized index for a file-based mapping dict"""
+        index_key = f"{mapping_key}_index"
+        mapping_dict = self.mapping_cache.get(mapping_key, {})
+        index = self.mapping_cache.get(index_key)
+        if index is None or index.mappings is not mapping_dict:
+            index = MappingIndex(mapping_dict)
+            self.mapping_cache[index_key] = index
+        return index
+    
     def get_store_mapping(self, raw_name: str, source: str) -> str:
         """
         Get mapped store name for a given raw name and source
@@ -44,7 +76,8 @@ class MappingUtils:
         # Try database first if available
         if self.use_database and self.db_service:
             try:
-                mapping_dict = self.db_service.get_store_mappings(source)
+                snapshot = self._get_db_snapshot('store', source)
+                mapping_dict = snapshot.mappings
                 
                 # Try exact match first
                 if raw_name_clean in mapping_dict:
@@ -52,14 +85,14 @@ class MappingUtils:
                 
                 # Try case-insensitive match
                 raw_name_lower = raw_name_clean.lower()
-                for key, value in mapping_dict.items():
-                    if key.lower() == raw_name_lower:
-                        return value
+                value = snapshot.index.get_lower(raw_name_lower)
+                if value is not None:
+                    return value
                 
                 # Try partial match
-                for key, value in mapping_dict.items():
-                    if key.lower() in raw_name_lower or raw_name_lower in key.lower():
-                        return value
+                value = snapshot.index.partial.match(raw_name_lower)
+                if value is not None:
+                    return value
                         
             except Exception:
                 pass  # Fall back to file-based mapping
@@ -71,6 +104,7 @@ class MappingUtils:
         
         # Get mapping
         mapping_dict = self.mapping_cache.get(mapping_key, {})
+        mapping_index = self._get_file_index(mapping_key)
         
         # Try exact match first
         if raw_name_clean in mapping_dict:
@@ -78,14 +112,14 @@ class MappingUtils:
         
         # Try case-insensitive match
         raw_name_lower = raw_name_clean.lower()
-        for key, value in mapping_dict.items():
-            if key.lower() == raw_name_lower:
-                return value
+        value = mapping_index.get_lower(raw_name_lower)
+        if value is not None:
+            return value
         
         # Try partial match
-        for key, value in mapping_dict.items():
-            if key.lower() in raw_name_lower or raw_name_lower in key.lower():
-                return value
+        value = mapping_index.partial.match(raw_name_lower)
+        if value is not None:
+            return value
         
         # Return default for Whole Foods if no mapping found
         if source.lower().replace(' ', '_') in ['wholefoods', 'whole_foods', 'whole foods']:
@@ -105,9 +139,117 @@ class MappingUtils:
             Mapped customer name or 'UNKNOWN' if no mapping found
         """
         
-        if not raw_customer_id or not str(raw_customer_id).strip():
+        raw_customer_id_clean, candidate_ids = self._customer_id_candidates(raw_customer_id, source)
+        if not raw_customer_id_clean:
             return "UNKNOWN"
         
+        # Try database first if available
+        if self.use_database and self.db_service:
+            try:
+                snapshot = self._get_db_snapshot('customer', source)
+                mapping_dict = snapshot.mappings
+                
+                # Debug output for KeHE and UNFI East
+                if source.lower() in ['kehe', 'kehe_sps', 'kehe - sps', 'unfi_east', 'unfi east']:
+                    print(f"DEBUG: Looking up customer mapping for '{raw_customer_id_clean}' (source: {source})")
+                    print(f"DEBUG: Found {len(mapping_dict)} customer mappings")
+                    if len(mapping_dict) > 0:
+                        sample_keys = list(mapping_dict.keys())[:10]
+                        print(f"DEBUG: Sample mapping keys (first 10): {sample_keys}")
+                        # Also show all keys if there aren't too many
+                        if len(mapping_dict) <= 20:
+                            print(f"DEBUG: All mapping keys: {list(mapping_dict.keys())}")
+                    else:
+                        print(f"DEBUG: WARNING - No customer mappings found in database for source '{source}'")
+                
+                value = self._match_customer_id(snapshot, raw_customer_id_clean, candidate_ids, source)
+                if value is not None:
+                    return value
+                        
+            except Exception as e:
+                # Log error for debugging but don't raise
+                print(f"DEBUG: Error in get_customer_mapping for {source}: {e}")
+                import traceback
+                traceback.print_exc()
+                pass
+        
+        # Fallback: return UNKNOWN if no mapping found
+        if source.lower() in ['unfi_east', 'unfi east']:
+            print(f"DEBUG: FAILED to find customer mapping for '{raw_customer_id_clean}' (source: {source})")
+            if self.use_database and self.db_service:
+                try:
+                    mapping_dict = self._get_db_snapshot('customer', source).mappings
+                    if mapping_dict:
+                        print(f"DEBUG: Available keys in database: {sorted(mapping_dict.keys())}")
+                    else:
+                        print(f"DEBUG: No mappings returned from database for source '{source}'")
+                except:
+                    pass
+        return "UNKNOWN"
+    
+    def resolve_customer_mapping(self, candidates: Iterable[str], source: str) -> Tuple[Optional[str], str]:
+        """
+        Map the first of several candidate customer IDs that has a mapping
+        
+        The customer mapping snapshot is fetched once and each candidate is
+        matched against it with the same rules as get_customer_mapping.
+        Candidates are consumed lazily, so a generator that scans a document
+        for codes stops scanning as soon as one resolves.
+        
+        Args:
+            candidates: Raw customer IDs in precedence order (duplicates are skipped)
+            source: Order source
+            
+        Returns:
+            Tuple of (candidate, mapped customer name) for the first candidate
+            that maps, or (None, 'UNKNOWN') if none does
+        """
+        
+        if not (self.use_database and self.db_service):
+            return None, "UNKNOWN"
+        
+        try:
+            snapshot = self._get_db_snapshot('customer', source)
+        except Exception as e:
+            print(f"DEBUG: Error loading customer mappings for {source}: {e}")
+            return None, "UNKNOWN"
+        
+        tried = []
+        for candidate in candidates:
+            if not candidate or candidate in tried:
+                continue
+            tried.append(candidate)
+            
+            raw_customer_id_clean, candidate_ids = self._customer_id_candidates(candidate, source)
+            if not raw_customer_id_clean:
+                continue
+            try:
+                value = self._match_customer_id(snapshot, raw_customer_id_clean, candidate_ids, source)
+            except Exception as e:
+                print(f"DEBUG: Error matching customer candidate '{candidate}' for {source}: {e}")
+                continue
+            if value and value != 'UNKNOWN':
+                print(f"DEBUG: Resolved customer candidate '{candidate}' -> '{value}' ({len(tried)} tried)")
+                return candidate, value
+        
+        print(f"DEBUG: FAILED to find customer mapping for candidates {tried} (source: {source})")
+        if snapshot.mappings:
+            print(f"DEBUG: Available keys in database: {sorted(snapshot.mappings.keys())}")
+        else:
+            print(f"DEBUG: No mappings returned from database for source '{source}'")
+        return None, "UNKNOWN"
+    
+    def _customer_id_candidates(self, raw_customer_id: str, source: str) -> Tuple[str, List[str]]:
+        """
+        Normalize a raw customer ID and list the keys to try for it
+        
+        Returns:
+            Tuple of (cleaned ID, candidate keys); the cleaned ID is '' for an empty input
+        """
+        
+        if not raw_customer_id or not str(raw_customer_id).strip():
+            return "", []
+        
         # Normalize the raw customer ID - remove .0 suffix if present
         raw_customer_id_clean = str(raw_customer_id).strip()
         if raw_customer_id_clean.endswith('.0') and raw_customer_id_clean[:-2].replace('.', '').isdigit():
@@ -158,132 +300,62 @@ class MappingUtils:
                 if len(digits_only) == 13 and digits_only.startswith('0'):
                     add_candidate(digits_only[1:])
         
+        return raw_customer_id_clean, candidate_ids
+    
+    def _match_customer_id(self, snapshot: MappingSnapshot, raw_customer_id_clean: str,
+                           candidate_ids: List[str], source: str) -> Optional[str]:
+        """Match one cleaned customer ID against a customer mapping snapshot, or return None"""
+        
+        mapping_dict = snapshot.mappings
+        normalized_source = source.lower().strip().replace(' ', '_')
         raw_customer_id_lower = raw_customer_id_clean.lower()
         candidate_lowers = [candidate.lower() for candidate in candidate_ids]
         
-        # Try database first if available
-        if self.use_database and self.db_service:
-            try:
-                mapping_dict = self.db_service.get_customer_mappings(source)
-                
-                # Debug output for KeHE and UNFI East
-                if source.lower() in ['kehe', 'kehe_sps', 'kehe - sps', 'unfi_east', 'unfi east']:
-                    print(f"DEBUG: Looking up customer mapping for '{raw_customer_id_clean}' (source: {source})")
-                    print(f"DEBUG: Found {len(mapping_dict)} customer mappings")
-                    if len(mapping_dict) > 0:
-                        sample_keys = list(mapping_dict.keys())[:10]
-                        print(f"DEBUG: Sample mapping keys (first 10): {sample_keys}")
-                        # Also show all keys if there aren't too many
-                        if len(mapping_dict) <= 20:
-                            print(f"DEBUG: All mapping keys: {list(mapping_dict.keys())}")
-                    else:
-                        print(f"DEBUG: WARNING - No customer mappings found in database for source '{source}'")
-                
-                # Try exact match for each candidate first
-                for candidate in candidate_ids:
-                    if candidate in mapping_dict:
-                        print(f"DEBUG: Found exact match for '{candidate}'")
-                        return mapping_dict[candidate]
-                
-                # Try with .0 suffix if the clean version doesn't match (for backward compatibility)
-                for candidate in candidate_ids:
-                    suffix_candidate = candidate + '.0'
-                    if suffix_candidate in mapping_dict:
-                        print(f"DEBUG: Found match with .0 suffix for '{candidate}'")
-                        return mapping_dict[suffix_candidate]
-                
-                # Try case-insensitive exact match
-                for key, value in mapping_dict.items():
-                    key_lower = str(key).lower()
-                    if key_lower in candidate_lowers:
-                        return value
-                
-                # For UNFI East: Try matching the code at the end of the key (e.g., "128 RCH" matches "RCH")
-                # This handles cases where database has "128 RCH" but parser extracts just "RCH"
-                if normalized_source in ['unfi_east', 'unfi east']:
-                    # First, try exact match (case-insensitive)
-                    for key, value in mapping_dict.items():
-                        key_str = str(key).strip()
-                        key_lower = key_str.lower()
-                        if key_lower == raw_customer_id_lower:
-                            print(f"DEBUG: Found exact case-insensitive match: '{raw_customer_id_clean}' = '{key_str}'")
-                            return value
-                    
-                    # Try matching code as suffix/end of key (most common case)
-                    # Examples: "RCH" matches "128 RCH", "HOW" matches "129 HOW", "RCH" matches "RCH"
-                    for key, value in mapping_dict.items():
-                        key_str = str(key).strip()
-                        key_lower = key_str.lower()
-                        
-                        # Check if key ends with the code (with or without space prefix)
-                        if key_lower.endswith(' ' + raw_customer_id_lower):
-                            # Matches "128 RCH" -> "RCH"
-                            print(f"DEBUG: Matched '{raw_customer_id_clean}' to key '{key_str}' (suffix match with space)")
-                            return value
-                        elif key_lower.endswith(raw_customer_id_lower):
-                            # Check if it's a complete word match (not partial like "RCH" matching "RICH")
-                            # Verify it's either an exact match or preceded by space/non-letter
-                            if key_lower == raw_customer_id_lower:
-                                # Already handled above, but keep for safety
-                                continue
-                            elif len(key_lower) > len(raw_customer_id_lower):
-                                # Check if the character before the match is a space or non-letter
-                                char_before = key_lower[-len(raw_customer_id_lower)-1] if len(key_lower) > len(raw_customer_id_lower) else ''
-                                if char_before == ' ' or not char_before.isalnum():
-                                    print(f"DEBUG: Matched '{raw_customer_id_clean}' to key '{key_str}' (suffix match)")
-                                    return value
-                        
-                        # Check if key starts with code followed by space
-                        if key_lower.startswith(raw_customer_id_lower + ' '):
-                            print(f"DEBUG: Matched '{raw_customer_id_clean}' to key '{key_str}' (prefix match)")
-                            return value
-                        
-                        # Extract code from key if it follows pattern "NUMBER CODE" or "CODE NUMBER" (e.g., "128 RCH" -> "RCH")
-                        if ' ' in key_lower:
-                            parts = key_lower.split()
-                            # Check if last part matches
-                            if len(parts) >= 1 and parts[-1] == raw_customer_id_lower:
-                                print(f"DEBUG: Matched '{raw_customer_id_clean}' to key '{key_str}' (extracted code from end)")
-                                return value
-                            # Check if first part matches (for patterns like "RCH 128")
-                            if len(parts) >= 1 and parts[0] == raw_customer_id_lower:
-                                print(f"DEBUG: Matched '{raw_customer_id_clean}' to key '{key_str}' (extracted code from start)")
-                                return value
-                
-                # Try partial match (key contains raw_customer_id or vice versa) - but only for UNFI East
-                # This is a last resort and should be more careful to avoid false matches
-                if source.lower() in ['unfi_east', 'unfi east']:
-                    for key, value in mapping_dict.items():
-                        key_lower = str(key).lower()
-                        # Only match if the raw_customer_id is a complete word in the key
-                        # This prevents "RCH" from matching "RICH" incorrectly
-                        if raw_customer_id_lower in key_lower:
-                            # Check if it's a word boundary match
-                            pattern = r'\b' + re.escape(raw_customer_id_lower) + r'\b'
-                            if re.search(pattern, key_lower):
-                                print(f"DEBUG: Matched '{raw_customer_id_clean}' to key '{key}' (partial word match)")
-                                return value
-                        
-            except Exception as e:
-                # Log error for debugging but don't raise
-                print(f"DEBUG: Error in get_customer_mapping for {source}: {e}")
-                import traceback
-                traceback.print_exc()
-                pass
+        # Try exact match for each candidate first
+        for candidate in candidate_ids:
+            if candidate in mapping_dict:
+                print(f"DEBUG: Found exact match for '{candidate}'")
+                return mapping_dict[candidate]
+        
+        # Try with .0 suffix if the clean version doesn't match (for backward compatibility)
+        for candidate in candidate_ids:
+            suffix_candidate = candidate + '.0'
+            if suffix_candidate in mapping_dict:
+                print(f"DEBUG: Found match with .0 suffix for '{candidate}'")
+                return mapping_dict[suffix_candidate]
+        
+        # Try case-insensitive exact match
+        value = snapshot.index.get_first_lower(candidate_lowers)
+        if value is not None:
+            return value
+        
+        # For UNFI East: Try matching the code at the end of the key (e.g., "128 RCH" matches "RCH")
+        # This handles cases where database has "128 RCH" but parser extracts just "RCH"
+        if normalized_source in ['unfi_east', 'unfi east']:
+            # First, try exact match (case-insensitive)
+            value = snapshot.index.get_lower(raw_customer_id_lower)
+            if value is not None:
+                print(f"DEBUG: Found exact case-insensitive match for '{raw_customer_id_clean}'")
+                return value
+            
+            # Try matching the code as a word-like prefix/suffix of the key
+            # Examples: "RCH" matches "128 RCH", "RCH 128" and "128-RCH", but not "RICH"
+            value = snapshot.index.get_affix(raw_customer_id_lower)
+            if value is not None:
+                print(f"DEBUG: Matched '{raw_customer_id_clean}' by code prefix/suffix")
+                return value
         
-        # Fallback: return UNKNOWN if no mapping found
+        # Try partial match (key contains raw_customer_id or vice versa) - but only for UNFI East
+        # This is a last resort and should be more careful to avoid false matches
         if source.lower() in ['unfi_east', 'unfi east']:
-            print(f"DEBUG: FAILED to find customer mapping for '{raw_customer_id_clean}' (source: {source})")
-            if self.use_database and self.db_service:
-                try:
-                    mapping_dict = self.db_service.get_customer_mappings(source)
-                    if mapping_dict:
-                        print(f"DEBUG: Available keys in database: {sorted(mapping_dict.keys())}")
-                    else:
-                        print(f"DEBUG: No mappings returned from database for source '{source}'")
-                except:
-                    pass
-        return "UNKNOWN"
+            # Only match if the raw_customer_id is a complete word in the key
+            # This prevents "RCH" from matching "RICH" incorrectly
+            value = snapshot.index.partial.match_word(raw_customer_id_lower)
+            if value is not None:
+                print(f"DEBUG: Matched '{raw_customer_id_clean}' (partial word match)")
+                return value
+        
+        return None
     
     def _load_mapping(self, source: str) -> None:
         """Load mapping file for the given source"""
@@ -368,8 +440,9 @@ class MappingUtils:
             if mapping_key not in self.mapping_cache:
                 self._load_mapping(source)
             
-            # Add to cache
+            # Add to cache (and drop its stale lookup index)
             self.mapping_cache[mapping_key][raw_name.strip()] = mapped_name.strip()
+            self.mapping_cache.pop(f"{mapping_key}_index", None)
             
             # Update file
             mapping_file = f"mappings/{source}/store_mapping.xlsx"
@@ -429,7 +502,8 @@ class MappingUtils:
         # Try database first if available
         if self.use_database and self.db_service:
             try:
-                item_mapping_dict = self.db_service.get_item_mappings(source)
+                snapshot = self._get_db_snapshot('item', source)
+                item_mapping_dict = snapshot.mappings
                 
                 # Try exact match first
                 if raw_item_clean in item_mapping_dict:
@@ -437,8 +511,14 @@ class MappingUtils:
                 
                 # Try case-insensitive match
                 raw_item_lower = raw_item_clean.lower()
-                for key, value in item_mapping_dict.items():
-                    if key.lower() == raw_item_lower:
+                value = snapshot.index.get_lower(raw_item_lower)
+                if value is not None:
+                    return value
+                
+                # Try without a float-style .0 suffix (e.g. "256821.0" read from Excel)
+                if strip_numeric_suffix(raw_item_clean) != raw_item_clean:
+                    value = snapshot.index.get_numeric(raw_item_clean)
+                    if value is not None:
                         return value
                 
                 # For Whole Foods: Try variations with spaces/dashes removed
@@ -463,11 +543,10 @@ class MappingUtils:
                         return item_mapping_dict[item_normalized]
                     
                     # Try reverse lookup: check if any key matches when normalized
-                    for key, value in item_mapping_dict.items():
-                        key_normalized = str(key).replace(' ', '').replace('-', '')
-                        if key_normalized == item_normalized:
-                            print(f"DEBUG: Found mapping for '{raw_item_clean}' via normalized match: '{key}' -> '{value}'")
-                            return value
+                    value = snapshot.index.get_compact(item_normalized)
+                    if value is not None:
+                        print(f"DEBUG: Found mapping for '{raw_item_clean}' via normalized match -> '{value}'")
+                        return value
                         
             except Exception as e:
                 print(f"DEBUG: Error in get_item_mapping database lookup: {e}")
@@ -480,6 +559,7 @@ class MappingUtils:
         
         # Get mapping
         item_mapping_dict = self.mapping_cache.get(item_mapping_key, {})
+        item_mapping_index = self._get_file_index(item_mapping_key)
         
         # Try exact match first
         if raw_item_clean in item_mapping_dict:
@@ -487,9 +567,9 @@ class MappingUtils:
         
         # Try case-insensitive match
         raw_item_lower = raw_item_clean.lower()
-        for key, value in item_mapping_dict.items():
-            if key.lower() == raw_item_lower:
-                return value
+        value = item_mapping_index.get_lower(raw_item_lower)
+        if value is not None:
+            return value
         
         # For Whole Foods: Try variations with spaces/dashes removed in file-based mapping too
         if source.lower() in ['wholefoods', 'whole foods', 'whole_foods']:
@@ -506,10 +586,9 @@ class MappingUtils:
                 return item_mapping_dict[item_normalized]
             
             # Try reverse lookup
-            for key, value in item_mapping_dict.items():
-                key_normalized = str(key).replace(' ', '').replace('-', '')
-                if key_normalized == item_normalized:
-                    return value
+            value = item_mapping_index.get_compact(item_normalized)
+            if value is not None:
+                return value
         
         # Return original item if no mapping found
         return raw_item_clean
@@ -579,13 +658,7 @@ class MappingUtils:
             return None
         
         # Clean and prepare lookup attributes
-        lookup_attributes = {}
-        for key, value in item_attributes.items():
-            if value and str(value).strip():
-                # Normalize key names to standard types
-                normalized_key = self._normalize_key_type(key)
-                if normalized_key:
-                    lookup_attributes[normalized_key] = str(value).strip()
+        lookup_attributes = self._clean_lookup_attributes(item_attributes)
         
         if not lookup_attributes:
             return None
@@ -600,6 +673,57 @@ class MappingUtils:
                 pass  # Fall back to legacy method
         
         # Fallback to legacy single-key resolution for backward compatibility
+        return self._resolve_item_number_legacy(lookup_attributes, source)
+    
+    def resolve_item_numbers_bulk(self, item_attributes_list: List[Dict[str, Any]], source: str) -> List[Optional[str]]:
+        """
+        Resolve the item numbers of a whole file in one database round trip.
+        
+        Applies the same rules as resolve_item_number to every entry, but fetches
+        all database candidates with a single query.
+        
+        Args:
+            item_attributes_list: One item_attributes dict per line item
+            source: Source system (e.g., 'kehe', 'vmc', 'davidson')
+            
+        Returns:
+            List aligned with item_attributes_list holding the mapped item or None
+        """
+        
+        if not item_attributes_list or not source:
+            return [None] * len(item_attributes_list or [])
+        
+        lookup_attributes_list = [self._clean_lookup_attributes(attrs) for attrs in item_attributes_list]
+        results: List[Optional[str]] = [None] * len(lookup_attributes_list)
+        
+        # Use database service for priority-based resolution
+        if self.use_database and self.db_service:
+            try:
+                results = self.db_service.resolve_item_numbers_bulk(lookup_attributes_list, source)
+            except Exception:
+                pass  # Fall back to legacy method
+        
+        for i, lookup_attributes in enumerate(lookup_attributes_list):
+            if not results[i] and lookup_attributes:
+                results[i] = self._resolve_item_number_legacy(lookup_attributes, source)
+        
+        return results
+    
+    def _clean_lookup_attributes(self, item_attributes: Dict[str, Any]) -> Dict[str, str]:
+        """Drop empty attributes and normalize key names to standard key types"""
+        
+        lookup_attributes = {}
+        for key, value in (item_attributes or {}).items():
+            if value and str(value).strip():
+                # Normalize key names to standard types
+                normalized_key = self._normalize_key_type(key)
+                if normalized_key:
+                    lookup_attributes[normalized_key] = str(value).strip()
+        return lookup_attributes
+    
+    def _resolve_item_number_legacy(self, lookup_attributes: Dict[str, str], source: str) -> Optional[str]:
+        """Legacy single-key resolution used when the priority lookup finds nothing"""
+        
         # Try vendor_item first, then other common keys
         fallback_order = ['vendor_item', 'upc', 'ean', 'gtin', 'sku_alias']
         
@@ -655,3 +779,21 @@ class MappingUtils:
             return key_lower
         
         return 'vendor_item'  # Default fallback
+
+
+_shared_mapping_utils: Optional[MappingUtils] = None
+_shared_mapping_utils_lock = threading.Lock()
+
+def get_shared_mapping_utils() -> MappingUtils:
+    """
+    Return the process-wide database-backed MappingUtils instance
+    
+    Parsers use this by default so file-based mapping caches and database
+    state are built once per process instead of once per parser.
+    """
+    global _shared_mapping_utils
+    if _shared_mapping_utils is None:
+        with _shared_mapping_utils_lock:
+            if _shared_mapping_utils is None:
+                _shared_mapping_utils = MappingUtils(use_database=True)
+    return _shared_mapping_utils
@@ -0,0 +1,118 @@
+"""
+Parse and convert a batch of order files on a bounded worker pool
+
+Each file is parsed and converted to Xoro rows on a thread pool, so PDF
+decoding and mapping lookups of different files overlap. Results come back
+in upload order, one per file, with errors captured per file; the caller
+persists them itself, which keeps database writes (and Streamlit calls) on a
+single thread.
+
+ORDER_BATCH_MAX_WORKERS sets the pool size (1 processes files one at a time).
+Parsers that keep state between files (supports_concurrent_parsing = False)
+always run one file at a time. With PDF_PARALLEL_EXTRACTION=1 the workers
+decode PDFs in the shared process pool of parsers/pdf_text.py, so the most
+CPU-heavy step is not serialized by the GIL.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from parsers.pdf_text import PDF_PARALLEL_EXTRACTION, prefetch_pdf_pages
+from utils.xoro_template import XoroTemplate
+
+ORDER_BATCH_MAX_WORKERS = int(os.getenv('ORDER_BATCH_MAX_WORKERS', min(4, os.cpu_count() or 1)))
+
+
+class ConvertedFile:
+    """Outcome of parsing and converting one file of a batch"""
+
+    def __init__(self, index: int, file_name: str):
+        self.index = index
+        self.file_name = file_name
+        self.parsed_data: Optional[List[Dict[str, Any]]] = None
+        self.converted_data: List[Dict[str, Any]] = []
+        self.parse_status: Optional[str] = None  # parser.last_parse_status, e.g. 'pending' for TJ Maxx
+        self.error: Optional[str] = None
+
+
+def convert_file(parser, source_name: str, index: int, file_name: str, file_content: bytes) -> ConvertedFile:
+    """
+    Parse one file and convert its orders to Xoro format
+
+    Args:
+        parser: Order parser for the source
+        source_name: Display name of the source (e.g. "UNFI East")
+        index: Position of the file in the batch
+        file_name: Original file name
+        file_content: Raw file content
+
+    Returns:
+        ConvertedFile; error is set instead of raising
+    """
+    result = ConvertedFile(index, file_name)
+    try:
+        file_extension = file_name.lower().split('.')[-1]
+        if file_extension == 'pdf' and PDF_PARALLEL_EXTRACTION and parser.pdf_source:
+            prefetch_pdf_pages(file_content, parser.pdf_source)
+
+        result.parsed_data = parser.parse(file_content, file_extension, file_name)
+        result.parse_status = getattr(parser, 'last_parse_status', None)
+
+        if result.parsed_data:
+            result.converted_data = XoroTemplate().convert_to_xoro(result.parsed_data, source_name)
+    except Exception as e:
+        result.error = str(e)
+    return result
+
+
+def iter_converted_files(files: Sequence[Tuple[str, bytes]], parser, source_name: str,
+                         max_workers: Optional[int] = None,
+                         on_progress: Optional[Callable[[int, int], None]] = None) -> Iterator[ConvertedFile]:
+    """
+    Parse and convert files concurrently, yielding the results in upload order
+
+    Args:
+        files: (file_name, file_content) pairs in upload order
+        parser: Order parser shared by the workers
+        source_name: Display name of the source
+        max_workers: Pool size (defaults to ORDER_BATCH_MAX_WORKERS)
+        on_progress: Called as on_progress(finished, total) on the caller's
+            thread whenever files finish, including files still waiting on an
+            earlier one to be yielded
+
+    Yields:
+        One ConvertedFile per file, in the order of files
+    """
+    total = len(files)
+    workers = min(ORDER_BATCH_MAX_WORKERS if max_workers is None else max_workers, total)
+
+    if workers <= 1 or not parser.supports_concurrent_parsing:
+        for index, (file_name, file_content) in enumerate(files):
+            result = convert_file(parser, source_name, index, file_name, file_content)
+            if on_progress:
+                on_progress(index + 1, total)
+            yield result
+        return
+
+    print(f"DEBUG: Processing {total} files for {source_name} on {workers} workers")
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='order-batch')
+    futures = [
+        pool.submit(convert_file, parser, source_name, index, file_name, file_content)
+        for index, (file_name, file_content) in enumerate(files)
+    ]
+    try:
+        pending = set(futures)
+        next_index = 0
+        while next_index < total:
+            if pending:
+                _, pending = wait(pending, return_when=FIRST_COMPLETED)
+                if on_progress:
+                    on_progress(total - len(pending), total)
+            while next_index < total and futures[next_index].done():
+                yield futures[next_index].result()
+                next_index += 1
+    finally:
+        # Stop queued files if the caller abandons the batch
+        for future in futures:
+            future.cancel()
+        pool.shutdown(wait=True)
@@ -0,0 +1,131 @@
+"""
+Substring matching of free-text names against a mapping table
+
+MappingUtils' last-resort tier maps a raw name to the first mapping key that
+either occurs inside the name or contains it. PartialMatcher answers both
+questions without a per-call scan over every key:
+
+- keys inside the name: an Aho-Corasick automaton over all keys, walked once
+  over the name
+- keys containing the name: one C-level search over all keys joined with a
+  separator; the first hit belongs to the earliest key
+
+Keys are compared lower-cased and "first" always means mapping-table order.
+"""
+
+import re
+from bisect import bisect_right
+from collections import deque
+from typing import Dict, List, Optional
+
+_SEPARATOR = '\x00'
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton reporting the lowest pattern id found in a text"""
+
+    def __init__(self, patterns: List[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Lowest pattern id ending at each node, following fail links
+        self._best: List[Optional[int]] = [None]
+
+        for pattern_id, pattern in enumerate(patterns):
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                next_node = self._goto[node].get(ch)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][ch] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._best.append(None)
+                node = next_node
+            if self._best[node] is None:
+                self._best[node] = pattern_id
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(ch, 0)
+                self._fail[child] = fail if fail != child else 0
+                self._best[child] = self._min(self._best[child], self._best[self._fail[child]])
+
+    @staticmethod
+    def _min(a: Optional[int], b: Optional[int]) -> Optional[int]:
+        if a is None:
+            return b
+        if b is None:
+            return a
+        return min(a, b)
+
+    def first_match(self, text: str) -> Optional[int]:
+        """Return the lowest pattern id occurring anywhere in text, or None"""
+        best = None
+        node = 0
+        goto = self._goto
+        fail = self._fail
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if self._best[node] is not None:
+                best = self._min(best, self._best[node])
+        return best
+
+
+class PartialMatcher:
+    """First-wins bidirectional substring matcher over mapping keys"""
+
+    def __init__(self, mappings: Dict[str, str]):
+        self._values = list(mappings.values())
+        keys_lower = [str(key).lower() for key in mappings]
+
+        # An empty key is "inside" every name
+        self._first_empty = next((i for i, key in enumerate(keys_lower) if not key), None)
+        self._automaton = AhoCorasick(keys_lower)
+
+        self._joined = _SEPARATOR.join(keys_lower)
+        self._starts: List[int] = []
+        offset = 0
+        for key in keys_lower:
+            self._starts.append(offset)
+            offset += len(key) + 1
+
+    def _position_at(self, offset: int) -> int:
+        return bisect_right(self._starts, offset) - 1
+
+    def key_inside(self, name_lower: str) -> Optional[int]:
+        """Position of the first key that occurs inside name_lower"""
+        return AhoCorasick._min(self._first_empty, self._automaton.first_match(name_lower))
+
+    def key_containing(self, name_lower: str) -> Optional[int]:
+        """Position of the first key that contains name_lower"""
+        if not self._starts or _SEPARATOR in name_lower:
+            return None
+        offset = self._joined.find(name_lower)
+        return self._position_at(offset) if offset >= 0 else None
+
+    def match(self, name_lower: str) -> Optional[str]:
+        """
+        Value of the first key where key in name or name in key
+
+        Equivalent to scanning the mapping in order and returning the first
+        value whose lower-cased key passes either containment test.
+        """
+        position = AhoCorasick._min(self.key_inside(name_lower), self.key_containing(name_lower))
+        return self._values[position] if position is not None else None
+
+    def match_word(self, word_lower: str) -> Optional[str]:
+        """Value of the first key containing word_lower as a whole word (regex \\b boundaries)"""
+        if not self._starts or not word_lower or _SEPARATOR in word_lower:
+            return None
+        found = re.search(r'\b' + re.escape(word_lower) + r'\b', self._joined)
+        return self._values[self._position_at(found.start())] if found else None
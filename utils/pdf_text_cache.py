@@ -0,0 +1,131 @@
+"""
+Content-addressed cache of text extracted from PDF files
+
+PDF decoding is the most expensive step for UNFI East, ROSS and TJ Maxx orders,
+and the same PO is often re-processed after a mapping fix. Extracted page texts
+are cached under the SHA-256 of the file bytes, in a size-bounded in-memory LRU
+and optionally in a directory on disk (set PDF_TEXT_CACHE_DIR) so the cache
+survives restarts and is shared between worker processes.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# Upper bound on the characters of text kept in memory (~64 MB of text)
+PDF_TEXT_CACHE_MAX_CHARS = int(os.getenv('PDF_TEXT_CACHE_MAX_CHARS', 64 * 1024 * 1024))
+
+# Optional on-disk tier, disabled unless a directory is configured
+PDF_TEXT_CACHE_DIR = os.getenv('PDF_TEXT_CACHE_DIR', '')
+
+PageTexts = Tuple[Optional[str], ...]
+
+
+def content_digest(file_content: bytes) -> str:
+    """SHA-256 hex digest of the file bytes"""
+    return hashlib.sha256(file_content).hexdigest()
+
+
+def _size_of(pages: PageTexts) -> int:
+    return sum(len(page) for page in pages if page)
+
+
+class PDFTextCache:
+    """
+    Thread-safe LRU of page texts keyed by content digest
+
+    Values are tuples with one entry per page: the extracted text, or None
+    for a page that failed to extract. The in-memory tier evicts least
+    recently used entries once max_chars is exceeded; the disk tier (if a
+    directory is given) keeps one JSON file per entry and is never evicted
+    automatically.
+    """
+
+    def __init__(self, max_chars: int = PDF_TEXT_CACHE_MAX_CHARS, cache_dir: Optional[str] = PDF_TEXT_CACHE_DIR):
+        self.max_chars = max_chars
+        self.cache_dir = cache_dir or None
+        self._entries: 'OrderedDict[str, PageTexts]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[PageTexts]:
+        """Return cached page texts for key, checking memory first and then disk"""
+        with self._lock:
+            pages = self._entries.get(key)
+            if pages is not None:
+                self._entries.move_to_end(key)
+                return pages
+
+        pages = self._read_disk(key)
+        if pages is not None:
+            self._remember(key, pages)
+        return pages
+
+    def put(self, key: str, pages: PageTexts) -> None:
+        """Store page texts for key in memory and, if configured, on disk"""
+        pages = tuple(pages)
+        self._remember(key, pages)
+        self._write_disk(key, pages)
+
+    def clear(self) -> None:
+        """Drop every in-memory entry (the disk tier is left untouched)"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remember(self, key: str, pages: PageTexts) -> None:
+        size = _size_of(pages)
+        if size > self.max_chars:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= _size_of(previous)
+            self._entries[key] = pages
+            self._size += size
+            while self._size > self.max_chars and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= _size_of(evicted)
+
+    def _disk_path(self, key: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[PageTexts]:
+        path = self._disk_path(key)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return tuple(json.load(f)['pages'])
+        except Exception as e:
+            print(f"DEBUG: Ignoring unreadable PDF text cache entry {path}: {e}")
+            return None
+
+    def _write_disk(self, key: str, pages: PageTexts) -> None:
+        path = self._disk_path(key)
+        if not path:
+            return
+        tmp_path = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write to a temp file and rename so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'pages': list(pages)}, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            if tmp_path:
+                with contextlib.suppress(OSError):
+                    os.remove(tmp_path)
+            print(f"DEBUG: Could not write PDF text cache entry {path}: {e}")
+
+
+# Shared by every PDF parser in the process
+pdf_text_cache = PDFTextCache()